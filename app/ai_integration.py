@@ -1,17 +1,49 @@
 from dotenv import load_dotenv
 import json
 import os
-import itertools
+import threading
+import time
 import boto3
 import httpx
+from botocore.config import Config as BotoConfig
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import asyncio
+import random
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+from app.ai_json import (
+    BATCH_TRANSLATION_SCHEMA,
+    NEWS_SCHEMA,
+    TRANSLATION_SCHEMA,
+    json_generation_config,
+    parse_ai_json,
+)
+from app.hedging import HedgePolicy
+from app.key_pool import ApiKeyPool, mask_key, parse_retry_after
+from app.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 
 load_dotenv()
 timeout = httpx.Timeout(240.0, connect=10.0)
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+# Point at a local stand-in with GEMINI_API_BASE=http://127.0.0.1:8091/v1beta
+GEMINI_API_BASE = os.getenv(
+    "GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+# Connection pool for the shared Gemini client
+GEMINI_HTTP2 = os.getenv("GEMINI_HTTP2", "true").lower() in ("1", "true", "yes")
+GEMINI_MAX_CONNECTIONS = int(os.getenv("GEMINI_MAX_CONNECTIONS", 20))
+GEMINI_MAX_KEEPALIVE_CONNECTIONS = int(
+    os.getenv("GEMINI_MAX_KEEPALIVE_CONNECTIONS", 10))
+GEMINI_KEEPALIVE_EXPIRY = float(os.getenv("GEMINI_KEEPALIVE_EXPIRY", 60))
+# Total time budget per Gemini call, retries and backoff included
+GEMINI_INTERACTIVE_DEADLINE = float(os.getenv("GEMINI_INTERACTIVE_DEADLINE", 20))
+GEMINI_BATCH_DEADLINE = float(os.getenv("GEMINI_BATCH_DEADLINE", 600))
+GEMINI_BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", 0.5))
+GEMINI_BACKOFF_MAX = float(os.getenv("GEMINI_BACKOFF_MAX", 8))
 # Load and parse the keys from .env
 GOOGLE_API_KEYS = [
     key.strip() for key in os.getenv("GOOGLE_AI_API_KEYS", "").split(",") if key.strip()
@@ -20,55 +52,329 @@ GOOGLE_API_KEYS = [
 if not GOOGLE_API_KEYS:
     raise Exception("No Gemini API keys found in environment variables!")
 
-# Create a round-robin iterator
-key_cycle = itertools.cycle(GOOGLE_API_KEYS)
+# Per-key rate limits, health tracking and cooldowns (see app/key_pool.py)
+key_pool = ApiKeyPool(GOOGLE_API_KEYS)
+
+
+try:
+    import h2  # noqa: F401  (httpx needs it for HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_http_client = None
+_http_client_loop = None
+
+
+def create_http_client(**kwargs) -> httpx.AsyncClient:
+    """Build a pooled keep-alive client (HTTP/2 when `h2` is installed)."""
+    kwargs.setdefault("timeout", timeout)
+    kwargs.setdefault("http2", GEMINI_HTTP2 and HTTP2_AVAILABLE)
+    kwargs.setdefault("limits", httpx.Limits(
+        max_connections=GEMINI_MAX_CONNECTIONS,
+        max_keepalive_connections=GEMINI_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=GEMINI_KEEPALIVE_EXPIRY,
+    ))
+    return httpx.AsyncClient(**kwargs)
+
+
+async def start_http_client(**kwargs) -> httpx.AsyncClient:
+    """Open the shared client for the running event loop (app lifespan)."""
+    global _http_client, _http_client_loop
+    await close_http_client()
+    _http_client = create_http_client(**kwargs)
+    _http_client_loop = asyncio.get_running_loop()
+    logger.info("Opened shared Gemini HTTP client (http2=%s, max_connections=%d)",
+                kwargs.get("http2", GEMINI_HTTP2 and HTTP2_AVAILABLE), GEMINI_MAX_CONNECTIONS)
+    return _http_client
+
 
+async def close_http_client():
+    global _http_client, _http_client_loop
+    if _http_client is not None:
+        await _http_client.aclose()
+        logger.info("Closed shared Gemini HTTP client")
+    _http_client = None
+    _http_client_loop = None
 
-def get_next_api_key():
-    return next(key_cycle)
 
+@asynccontextmanager
+async def gemini_client():
+    """Yields the shared client, or a short-lived one outside the app's loop.
+
+    The APScheduler thread runs its own event loop via asyncio.run, and a
+    client's pooled connections cannot be shared across loops.
+    """
+    if (_http_client is not None and not _http_client.is_closed
+            and _http_client_loop is asyncio.get_running_loop()):
+        yield _http_client
+    else:
+        async with create_http_client() as client:
+            yield client
+
+
+# Concurrent identical prompts share one gemini_post call
+ai_inflight = SingleFlight("gemini")
 
 AUDIO_DIR = "./static/audio/"
 os.makedirs(AUDIO_DIR, exist_ok=True)
-polly_client = boto3.client("polly", region_name="ap-southeast-2")
+# POLLY_ENDPOINT_URL points Polly at a stand-in (see benchmarks/stubs)
+POLLY_REGION = os.getenv("POLLY_REGION", "ap-southeast-2")
+POLLY_ENDPOINT_URL = os.getenv("POLLY_ENDPOINT_URL") or None
+# boto3 is blocking, so synthesis runs on its own bounded thread pool; the
+# HTTP connection pool is sized to match so threads never wait for a socket
+POLLY_MAX_CONCURRENCY = int(os.getenv("POLLY_MAX_CONCURRENCY", 8))
+polly_client = boto3.client(
+    "polly", region_name=POLLY_REGION, endpoint_url=POLLY_ENDPOINT_URL,
+    config=BotoConfig(
+        max_pool_connections=POLLY_MAX_CONCURRENCY,
+        connect_timeout=float(os.getenv("POLLY_CONNECT_TIMEOUT", 5)),
+        read_timeout=float(os.getenv("POLLY_READ_TIMEOUT", 30)),
+        retries={"mode": "adaptive", "max_attempts": 3},
+    ))
+polly_executor = ThreadPoolExecutor(
+    max_workers=POLLY_MAX_CONCURRENCY, thread_name_prefix="polly")
+# Read size when relaying Polly's AudioStream to a client
+POLLY_STREAM_CHUNK_BYTES = int(os.getenv("POLLY_STREAM_CHUNK_BYTES", 16 * 1024))
+
+
+class GeminiRequestError(Exception):
+    """Gemini rejected the request itself (e.g. HTTP 400); retrying won't help."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class GeminiDeadlineExceeded(httpx.ReadTimeout):
+    """The call's deadline budget ran out before Gemini answered."""
+
+
+# 401/403/429 are about the key, so the next key is tried without backing off
+KEY_SPECIFIC_STATUSES = {401, 403, 429}
+RETRYABLE_STATUSES = {408, 500, 502, 503, 504} | KEY_SPECIFIC_STATUSES
+
+_call_deadline = ContextVar("gemini_call_deadline", default=None)
+_call_hedge = ContextVar("gemini_call_hedge", default=False)
+
+GEMINI_HEDGING = os.getenv("GEMINI_HEDGING", "true").lower() in ("1", "true", "yes")
+# Shared by every hedged call; exposed at /ai/metrics
+hedge_policy = HedgePolicy()
+
+
+@contextmanager
+def call_budget(seconds: float, hedge: bool = False):
+    """Caps the total time of every Gemini call made inside the block.
+
+    Nested budgets can only shorten the deadline. With `hedge=True` the
+    calls are also hedged (see app/hedging.py). Both are carried in
+    ContextVars, so they also apply inside coalesced tasks.
+    """
+    deadline = time.monotonic() + seconds
+    current = _call_deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _call_deadline.set(deadline)
+    hedge_token = _call_hedge.set(hedge or _call_hedge.get())
+    try:
+        yield deadline
+    finally:
+        _call_hedge.reset(hedge_token)
+        _call_deadline.reset(token)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(GEMINI_BACKOFF_MAX, GEMINI_BACKOFF_BASE * 2 ** attempt))
+
+
+async def cancel_on_disconnect(request, coro, poll_interval: float = 0.25):
+    """Runs `coro`, cancelling it if the HTTP client goes away first.
+
+    Raises asyncio.CancelledError when the client disconnected, so nothing
+    downstream keeps spending Gemini quota on an answer nobody will read.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info("Client disconnected; cancelling Gemini call")
+                task.cancel()
+                raise asyncio.CancelledError("client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+async def _post_with_key(api_key: str, payload: dict, model: str, timeout, expires: float):
+    """One generateContent request; reports the outcome to the key pool."""
+    headers = {"Content-Type": "application/json"}
+    api_url = (
+        f"{GEMINI_API_BASE}/models/"
+        f"{model}:generateContent?key={api_key}"
+    )
+    remaining = max(expires - time.monotonic(), 0.001)
+    attempt_timeout = httpx.Timeout(
+        min(timeout.read or remaining, remaining),
+        connect=min(timeout.connect or remaining, remaining))
+    started = time.monotonic()
+    try:
+        async with gemini_client() as client:
+            # httpx timeouts are per read; wait_for bounds the whole attempt
+            resp = await asyncio.wait_for(
+                client.post(api_url, headers=headers, json=payload, timeout=attempt_timeout),
+                remaining)
+            resp.raise_for_status()
+            data = resp.json()
+    except httpx.HTTPStatusError as e:
+        status_code = e.response.status_code
+        if status_code not in RETRYABLE_STATUSES:
+            # The request is at fault, not the key
+            key_pool.release(api_key)
+            raise GeminiRequestError(
+                status_code, f"Gemini API rejected the request: HTTP {status_code}") from e
+        key_pool.report_failure(
+            api_key, status_code=status_code,
+            retry_after=parse_retry_after(e.response.headers.get("Retry-After")),
+            latency=time.monotonic() - started)
+        raise
+    except (httpx.TimeoutException, asyncio.TimeoutError):
+        key_pool.report_failure(
+            api_key, latency=time.monotonic() - started, error="timeout")
+        raise
+    except asyncio.CancelledError:
+        key_pool.release(api_key)
+        raise
+    except Exception as e:
+        key_pool.report_failure(api_key, error=str(e))
+        raise
+    latency = time.monotonic() - started
+    key_pool.report_success(api_key, latency)
+    hedge_policy.tracker.record(latency)
+    return data
+
+
+async def _hedged_post(api_key: str, tried: set, payload: dict, model: str, timeout, expires: float):
+    """Sends a duplicate on another key if the first is slower than usual.
+
+    Whichever request succeeds first wins and the other is cancelled. If
+    one fails the other is still awaited; if both fail the first error is
+    raised.
+    """
+    hedge_policy.start_request()
+    primary = asyncio.ensure_future(
+        _post_with_key(api_key, payload, model, timeout, expires))
+    tasks = [primary]
+    try:
+        delay = min(hedge_policy.delay(), max(expires - time.monotonic(), 0))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or time.monotonic() >= expires:
+            return await primary
+        if not hedge_policy.try_fire():
+            return await primary
+        backup_key, _ = key_pool.try_acquire(exclude=tried)
+        if backup_key is None:
+            hedge_policy.record_no_key()
+            return await primary
+        tried.add(backup_key)
+        logger.info("Hedging slow Gemini call (%.2fs) on key %s",
+                    delay, mask_key(backup_key))
+        backup = asyncio.ensure_future(
+            _post_with_key(backup_key, payload, model, timeout, expires))
+        tasks.append(backup)
+
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in tasks:
+                if task in done and task.exception() is None:
+                    if task is backup:
+                        hedge_policy.record_win()
+                    return task.result()
+        return primary.result()  # both failed: surface the first request's error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
 
 
 async def gemini_post(
     payload: dict,
     max_retries: int = 3,
     timeout=httpx.Timeout(240.0, connect=10.0),
-    model: str = "gemini-2.5-flash"
+    model: str = GEMINI_MODEL,
+    deadline: float = None,
+    hedge: bool = None,
 ):
-    headers = {"Content-Type": "application/json"}
+    """POSTs to generateContent with retries inside a deadline budget.
+
+    `deadline` (seconds) defaults to the enclosing `call_budget`, or
+    GEMINI_BATCH_DEADLINE. Each attempt's timeout is capped by what is left
+    of the budget. 5xx, 429 and timeouts are retried with jittered backoff;
+    other 4xx responses raise GeminiRequestError at once. `hedge` (default:
+    the enclosing `call_budget`) enables hedged attempts.
+    """
+    expires = time.monotonic() + (deadline if deadline is not None else GEMINI_BATCH_DEADLINE)
+    if _call_deadline.get() is not None:
+        expires = min(expires, _call_deadline.get())
+    if hedge is None:
+        hedge = _call_hedge.get()
+    hedge = hedge and GEMINI_HEDGING and len(GOOGLE_API_KEYS) > 1
+    tried = set()
+    out_of_time = False
     for attempt in range(1, max_retries + 1):
-        api_key = get_next_api_key()
-        api_url = (
-            f"https://generativelanguage.googleapis.com/v1beta/models/"
-            f"{model}:generateContent?key={api_key}"
-        )
+        remaining = expires - time.monotonic()
+        if remaining <= 0:
+            out_of_time = True
+            break
         try:
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                resp = await client.post(api_url, headers=headers, json=payload)
-                resp.raise_for_status()
-                return resp.json()
-        except httpx.ReadTimeout:
+            api_key = await asyncio.wait_for(
+                key_pool.acquire(exclude=tried, max_wait=remaining), remaining)
+        except asyncio.TimeoutError:
+            out_of_time = True
+            break
+        tried.add(api_key)
+        key_specific = False
+        try:
+            if hedge:
+                return await _hedged_post(api_key, tried, payload, model, timeout, expires)
+            return await _post_with_key(api_key, payload, model, timeout, expires)
+        except GeminiRequestError as e:
+            logger.error(
+                f"Gemini API rejected the request using key {mask_key(api_key)}: HTTP {e.status_code}")
+            raise
+        except httpx.HTTPStatusError as e:
+            status_code = e.response.status_code
+            key_specific = status_code in KEY_SPECIFIC_STATUSES
+            logger.error(
+                f"Gemini API error on attempt {attempt} using key {mask_key(api_key)}: HTTP {status_code}"
+            )
+        except (httpx.TimeoutException, asyncio.TimeoutError):
             logger.warning(
-                f"Gemini API timed out on attempt {attempt}/{max_retries} using key {api_key[:5]}...{api_key[-3:]}"
+                f"Gemini API timed out on attempt {attempt}/{max_retries} using key {mask_key(api_key)}"
             )
         except Exception as e:
             logger.error(
-                f"Gemini API error on attempt {attempt} using key {api_key[:5]}...{api_key[-3:]}: {e}"
+                f"Gemini API error on attempt {attempt} using key {mask_key(api_key)}: {e}"
             )
-        if attempt < max_retries:
-            await asyncio.sleep(2 ** attempt)
+        if attempt < max_retries and not key_specific:
+            delay = backoff_delay(attempt)
+            if time.monotonic() + delay >= expires:
+                out_of_time = True
+                break
+            await asyncio.sleep(delay)
+    if out_of_time:
+        raise GeminiDeadlineExceeded("Gemini API call exceeded its deadline budget.")
     raise httpx.ReadTimeout(
         "Gemini API failed after several attempts (key rotation used)."
     )
 
 
-async def get_translation(word: str, max_retries=3):
-    headers = {"Content-Type": "application/json"}
-    prompt = f"""
+def build_translation_prompt(word: str) -> str:
+    return f"""
     Translate the following English word or phrase to Māori. For output, return ONLY a raw JSON object with these fields and nothing else:
 
     {{
@@ -87,9 +393,221 @@ async def get_translation(word: str, max_retries=3):
 
     Word or phrase: "{word}"
     """
-    payload = {"contents": [{"parts": [{"text": prompt}]}]}
-    headers = {"Content-Type": "application/json"}
-    return await gemini_post(payload, max_retries=max_retries)
+
+
+async def get_translation(word: str, max_retries=3):
+    prompt = build_translation_prompt(word)
+    payload = {"contents": [{"parts": [{"text": prompt}]}],
+               **json_generation_config(TRANSLATION_SCHEMA)}
+    return await ai_inflight.do(
+        ("translation", word.strip().lower()), gemini_post, payload, max_retries=max_retries)
+
+
+async def stream_gemini(payload: dict, model: str = GEMINI_MODEL, max_retries: int = 3,
+                        deadline: float = None):
+    """Yields response text as Gemini generates it (streamGenerateContent, SSE).
+
+    Failures before the first chunk are retried on another key like
+    gemini_post; once text has been yielded the stream cannot be retried.
+    The deadline budget applies to the whole stream.
+    """
+    expires = time.monotonic() + (deadline if deadline is not None else GEMINI_BATCH_DEADLINE)
+    if _call_deadline.get() is not None:
+        expires = min(expires, _call_deadline.get())
+    tried = set()
+    for attempt in range(1, max_retries + 1):
+        remaining = expires - time.monotonic()
+        if remaining <= 0:
+            break
+        api_key = await asyncio.wait_for(
+            key_pool.acquire(exclude=tried, max_wait=remaining), remaining)
+        tried.add(api_key)
+        api_url = (
+            f"{GEMINI_API_BASE}/models/"
+            f"{model}:streamGenerateContent?alt=sse&key={api_key}"
+        )
+        started = time.monotonic()
+        yielded = False
+        try:
+            async with gemini_client() as client:
+                async with client.stream("POST", api_url, json=payload,
+                                         timeout=httpx.Timeout(remaining, connect=min(10.0, remaining))) as resp:
+                    resp.raise_for_status()
+                    lines = resp.aiter_lines()
+                    while True:
+                        remaining = expires - time.monotonic()
+                        if remaining <= 0:
+                            raise GeminiDeadlineExceeded("Gemini stream exceeded its deadline budget.")
+                        try:
+                            line = await asyncio.wait_for(lines.__anext__(), remaining)
+                        except StopAsyncIteration:
+                            break
+                        if not line.startswith("data:"):
+                            continue
+                        chunk = json.loads(line[5:].strip())
+                        for candidate in chunk.get("candidates") or []:
+                            for part in (candidate.get("content") or {}).get("parts") or []:
+                                if part.get("text"):
+                                    yielded = True
+                                    yield part["text"]
+            key_pool.report_success(api_key, time.monotonic() - started)
+            return
+        except httpx.HTTPStatusError as e:
+            status_code = e.response.status_code
+            if status_code not in RETRYABLE_STATUSES:
+                key_pool.release(api_key)
+                raise GeminiRequestError(
+                    status_code, f"Gemini API rejected the request: HTTP {status_code}") from e
+            key_pool.report_failure(
+                api_key, status_code=status_code,
+                retry_after=parse_retry_after(e.response.headers.get("Retry-After")))
+            logger.error(
+                f"Gemini stream error on attempt {attempt} using key {mask_key(api_key)}: HTTP {status_code}")
+        except (asyncio.CancelledError, GeneratorExit):
+            key_pool.release(api_key)
+            raise
+        except GeminiDeadlineExceeded:
+            key_pool.report_failure(api_key, error="timeout")
+            raise
+        except Exception as e:
+            key_pool.report_failure(api_key, error=str(e))
+            logger.error(
+                f"Gemini stream error on attempt {attempt} using key {mask_key(api_key)}: {e}")
+            if yielded:
+                raise
+        if attempt < max_retries:
+            delay = backoff_delay(attempt)
+            if time.monotonic() + delay >= expires:
+                break
+            await asyncio.sleep(delay)
+    raise GeminiDeadlineExceeded("Gemini stream failed after several attempts.")
+
+
+async def stream_translation(word: str):
+    """Yields (field, value) pairs of the translation as Gemini writes them."""
+    from app.utils import StreamingFieldParser
+
+    payload = {"contents": [{"parts": [{"text": build_translation_prompt(word)}]}],
+               **json_generation_config(TRANSLATION_SCHEMA)}
+    parser = StreamingFieldParser()
+    async for text in stream_gemini(payload):
+        for field, value in parser.feed(text):
+            yield field, value
+
+
+BATCH_TRANSLATION_SIZE = int(os.getenv("GEMINI_BATCH_TRANSLATION_SIZE", 20))
+
+
+def build_batch_translation_prompt(words: list) -> str:
+    """One set of instructions for many words; asks for a JSON array back."""
+    return f"""
+    Translate each of the following English words or phrases to Māori. For output, return ONLY a raw JSON array with one object per input, in the same order, each with these fields and nothing else:
+
+    {{
+    "input": "...",         // the English input exactly as given
+    "translation": "...",   // just the translation no other else
+    "ipa": "...",           // The correct IPA pronunciation for the Māori translation (REQUIRED, even for multi-word phrases - provide IPA for each word if needed)
+    "phonetic": "...",      // A simple English phonetic spelling for the Māori translation (REQUIRED, even for multi-word phrases - show how to pronounce each word)
+    "type": "...",          // e.g., noun, verb, phrase, etc.
+    "domain": "...",        // e.g., greetings, number, weather, etc.
+    "example": "...",       // Example usage in a sentence (in both Māori and English, if possible)
+    "notes": "..."          // Cultural or usage notes (can be blank)
+    }}
+
+    IMPORTANT: Always provide IPA and phonetic pronunciations even for multi-word phrases or compound words.
+
+    If you do not know the answer for a field, use an empty string (""). Do NOT use markdown or any code fences—just output the JSON array.
+
+    Words or phrases: {json.dumps(words, ensure_ascii=False)}
+    """
+
+
+def _iter_json_objects(text: str):
+    """Yields each top-level JSON object found in text, skipping broken ones."""
+    decoder = json.JSONDecoder()
+    pos = text.find("{")
+    while pos != -1:
+        try:
+            obj, end = decoder.raw_decode(text, pos)
+        except ValueError:
+            pos = text.find("{", pos + 1)
+            continue
+        if isinstance(obj, dict):
+            yield obj
+        pos = text.find("{", end)
+
+
+def parse_batch_translation(raw_text: str, words: list) -> dict:
+    """Maps the elements of a batch response back to their input words.
+
+    Every element is validated on its own, so one malformed object only
+    costs that word, not the whole batch. Returns {word: ai_data}.
+    """
+    from app.utils import sanitize_ai_data, sanitize_level
+
+    by_normalized = {w.strip().lower(): w for w in words}
+    try:
+        elements = [e for e in parse_ai_json(raw_text, expect=list, source="translation_batch",
+                                             log_failure=False)
+                    if isinstance(e, dict)]
+    except ValueError:
+        # Salvage whichever objects are intact
+        elements = list(_iter_json_objects(raw_text or ""))
+        if elements:
+            logger.warning("Salvaged %d objects from malformed batch translation JSON", len(elements))
+        else:
+            logger.error("Batch translation response is not valid JSON: %r", (raw_text or "")[:200])
+    parsed = {}
+    for position, element in enumerate(elements):
+        word = by_normalized.get(str(element.get("input") or "").strip().lower())
+        if word is None and "input" not in element and len(elements) == len(words):
+            word = words[position]
+        if word is None or word in parsed:
+            continue
+        ai_data = sanitize_ai_data(element)
+        if not ai_data["translation"]:
+            continue
+        ai_data.pop("input", None)
+        ai_data["level"] = sanitize_level(ai_data.get("level"))
+        parsed[word] = ai_data
+    return parsed
+
+
+async def get_translations_batch(words: list, batch_size: int = BATCH_TRANSLATION_SIZE, max_retries=2):
+    """Translates many words with one Gemini call per `batch_size` words.
+
+    Words whose element is missing or fails validation are retried in a
+    smaller follow-up batch, up to `max_retries` times. Returns
+    {word: sanitized ai_data}; words that never parse are left out.
+    """
+    from app.utils import extract_ai_text
+
+    pending = list(dict.fromkeys(w for w in words if w and w.strip()))
+    results = {}
+    for attempt in range(max_retries + 1):
+        if not pending:
+            break
+        failed = []
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            payload = {"contents": [
+                {"parts": [{"text": build_batch_translation_prompt(chunk)}]}],
+                **json_generation_config(BATCH_TRANSLATION_SCHEMA)}
+            try:
+                key = ("translation_batch", tuple(w.strip().lower() for w in chunk))
+                raw_text = extract_ai_text(await ai_inflight.do(key, gemini_post, payload))
+                parsed = parse_batch_translation(raw_text, chunk)
+            except Exception as e:
+                logger.error("Batch translation of %d words failed: %s",
+                             len(chunk), e)
+                parsed = {}
+            results.update(parsed)
+            failed.extend(w for w in chunk if w not in parsed)
+        if failed:
+            logger.warning("Batch translation attempt %d: %d/%d words did not parse",
+                           attempt + 1, len(failed), len(pending))
+        pending = failed
+    return results
 
 
 async def get_positive_news_from_gemini():
@@ -104,42 +622,88 @@ async def get_positive_news_from_gemini():
         "Return a JSON array of up to 10 POSITIVE news items. Each should have 'title' and 'content' and 'link'. "
         "Output ONLY the JSON array, no markdown or explanation.\n\n"
     )
-    payload = {"contents": [{"parts": [{"text": prompt}]}]}
-    headers = {"Content-Type": "application/json"}
+    payload = {"contents": [{"parts": [{"text": prompt}]}],
+               **json_generation_config(NEWS_SCHEMA)}
+    result = None
     try:
-        result = await gemini_post(payload)
-        # Extract the AI's response text (may include markdown code fences)
+        result = await ai_inflight.do(
+            ("news", "positive"), gemini_post, payload, deadline=GEMINI_BATCH_DEADLINE)
         raw_text = result["candidates"][0]["content"]["parts"][0]["text"]
-        # Remove code fences if present
-        if raw_text.startswith("```json"):
-            raw_text = raw_text.replace("```json", "").strip()
-        if raw_text.startswith("```"):
-            raw_text = raw_text[3:].strip()
-        if raw_text.endswith("```"):
-            raw_text = raw_text[:-3].strip()
-        return json.loads(raw_text)
+        return parse_ai_json(raw_text, expect=list, source="news")
     except Exception as e:
         logger.error("Failed to parse Gemini response: %s", e)
         logger.info("Raw response: %s", result)
         raise
 
 
-async def synthesize_maori_audio_with_polly(
-    maori_text, voice_id="Aria", output_format="mp3", filename_override=None
-):
+def _polly_params(maori_text, voice_id, output_format, sample_rate=None):
+    params = dict(Text=maori_text, VoiceId=voice_id, OutputFormat=output_format, Engine="neural")
+    if sample_rate:
+        params["SampleRate"] = str(sample_rate)
+    return params
+
+
+def _synthesize_to_file(maori_text, voice_id, output_format, audio_path, sample_rate=None):
+    """Blocking part of synthesis: Polly round trip, stream read, file write."""
     response = polly_client.synthesize_speech(
-        Text=maori_text, VoiceId=voice_id, OutputFormat=output_format, Engine="neural"
-    )
+        **_polly_params(maori_text, voice_id, output_format, sample_rate))
     audio_stream = response.get("AudioStream")
     if not audio_stream:
         logger.error("No audio stream returned from Polly: %s", audio_stream)
         raise Exception("No audio stream returned from Polly.")
+    # Write under a temporary name so nobody serves a half-written file
+    temp_path = f"{audio_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(audio_stream.read())
+        os.replace(temp_path, audio_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+async def synthesize_maori_audio_with_polly(
+    maori_text, voice_id="Aria", output_format="mp3", filename_override=None, sample_rate=None
+):
+    """Synthesizes speech on the Polly thread pool; the event loop never blocks.
+
+    At most POLLY_MAX_CONCURRENCY syntheses run at once; further cache
+    misses queue for a thread instead of stalling unrelated requests.
+    """
     filename = filename_override or f"polly_{maori_text.replace(' ', '_').lower()}.mp3"
     audio_path = os.path.join(AUDIO_DIR, filename)
-    with open(audio_path, "wb") as f:
-        f.write(audio_stream.read())
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(
+        polly_executor, _synthesize_to_file, maori_text, voice_id, output_format, audio_path,
+        sample_rate)
     return filename
 
-    # (Use same logic as your other Gemini calls, then parse as JSON)
-    # Return as string or dict as you like (save in DB as needed)
-    # See previous responses for example code
+
+def _start_synthesis(maori_text, voice_id, output_format):
+    response = polly_client.synthesize_speech(
+        **_polly_params(maori_text, voice_id, output_format))
+    audio_stream = response.get("AudioStream")
+    if not audio_stream:
+        logger.error("No audio stream returned from Polly: %s", audio_stream)
+        raise Exception("No audio stream returned from Polly.")
+    return audio_stream
+
+
+async def stream_maori_audio_with_polly(
+    maori_text, voice_id="Aria", output_format="mp3", chunk_size=POLLY_STREAM_CHUNK_BYTES
+):
+    """Yields audio chunks as Polly sends them, without waiting for the whole file.
+
+    The request and each blocking read run on the Polly thread pool.
+    """
+    loop = asyncio.get_running_loop()
+    audio_stream = await loop.run_in_executor(
+        polly_executor, _start_synthesis, maori_text, voice_id, output_format)
+    try:
+        while True:
+            chunk = await loop.run_in_executor(polly_executor, audio_stream.read, chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        audio_stream.close()
@@ -0,0 +1,207 @@
+# app/ai_json.py
+"""Parsing of JSON returned by Gemini.
+
+Gemini is asked for JSON mode with a response schema (see the *_SCHEMA
+constants), which makes fences and prose rare. Whatever still arrives
+malformed goes through `repair_json` (fences, surrounding prose, trailing
+commas, truncated arrays and objects) before we give up on a response we
+already paid for. Outcomes are counted per source for /ai/metrics.
+"""
+import json
+import logging
+import os
+import re
+import threading
+
+try:
+    import orjson
+except ImportError:  # optional: faster parsing when installed
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+GEMINI_JSON_MODE = os.getenv("GEMINI_JSON_MODE", "true").lower() in ("1", "true", "yes")
+
+_STRING = {"type": "STRING"}
+
+TRANSLATION_FIELDS = ["translation", "ipa", "phonetic", "type", "domain", "example", "notes"]
+
+TRANSLATION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {f: _STRING for f in TRANSLATION_FIELDS},
+    "required": ["translation", "ipa", "phonetic"],
+    "propertyOrdering": TRANSLATION_FIELDS,
+}
+
+BATCH_TRANSLATION_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {f: _STRING for f in ["input"] + TRANSLATION_FIELDS},
+        "required": ["input", "translation", "ipa", "phonetic"],
+        "propertyOrdering": ["input"] + TRANSLATION_FIELDS,
+    },
+}
+
+NEWS_FIELDS = ["title", "content", "link", "title_maori", "summary_maori", "image_url"]
+
+NEWS_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {f: _STRING for f in NEWS_FIELDS},
+        "required": ["title", "content", "link"],
+        "propertyOrdering": NEWS_FIELDS,
+    },
+}
+
+
+def json_generation_config(schema: dict) -> dict:
+    """generationConfig asking Gemini for schema-constrained JSON."""
+    if not GEMINI_JSON_MODE:
+        return {}
+    return {"generationConfig": {"responseMimeType": "application/json", "responseSchema": schema}}
+
+
+def loads(text):
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+_OPENING_FENCE_RE = re.compile(r"^```[\w-]*[ \t]*\n?")
+_CLOSING_FENCE_RE = re.compile(r"\n?[ \t]*```$")
+
+
+def strip_fences(text: str) -> str:
+    """Removes a markdown code fence (``` or ```json) around the text.
+    Backticks inside it, e.g. in JSON string values, are kept."""
+    text = _OPENING_FENCE_RE.sub("", (text or "").strip())
+    return _CLOSING_FENCE_RE.sub("", text).strip()
+
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def repair_json(text: str, expect=None) -> str:
+    """Best-effort fix-up of malformed JSON text; returns the repaired text.
+
+    Drops fences and text around the JSON value and trailing commas. A
+    truncated response is cut back to its last complete member or element
+    (a half-written value is never kept) and the open containers are closed.
+    """
+    text = strip_fences(text)
+    opener = {dict: "{", list: "["}.get(expect)
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if opener and text.find(opener) != -1:
+        start = text.find(opener)
+    elif starts:
+        start = min(starts)
+    else:
+        return text
+
+    out = []
+    stack = []
+    in_string = escaped = False
+    safe_len, safe_stack = None, None  # just after the last complete value
+    for ch in text[start:]:
+        if in_string:
+            out.append(ch)
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in _CLOSERS:
+            stack.append(ch)
+        elif ch == ",":
+            safe_len, safe_stack = len(out), list(stack)
+        elif ch in "}]":
+            while out and out[-1] in " \t\r\n":
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()  # trailing comma
+            if not stack:
+                break
+            stack.pop()
+            out.append(ch)
+            if not stack:
+                break
+            safe_len, safe_stack = len(out), list(stack)
+            continue
+        out.append(ch)
+
+    if not stack and not in_string:
+        return "".join(out)
+    if not in_string:
+        # Cut off between values: closing the containers may be enough
+        closed = re.sub(r"[\s,]*$", "", "".join(out)) + "".join(
+            _CLOSERS[c] for c in reversed(stack))
+        try:
+            loads(closed)
+            return closed
+        except ValueError:
+            pass
+    if safe_len is None:
+        return "".join(out)  # nothing complete to keep
+    head = re.sub(r"[\s,]*$", "", "".join(out[:safe_len]))
+    return head + "".join(_CLOSERS[c] for c in reversed(safe_stack))
+
+
+class ParseStats:
+    """Counts parse outcomes (clean, repaired, failed) per source."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def record(self, source: str, outcome: str):
+        with self._lock:
+            counts = self._counts.setdefault(
+                source, {"clean": 0, "repaired": 0, "failed": 0})
+            counts[outcome] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = {source: dict(counts) for source, counts in self._counts.items()}
+        for counts in out.values():
+            total = sum(counts.values())
+            counts["failure_rate"] = round(counts["failed"] / total, 3) if total else 0.0
+        return out
+
+
+parse_stats = ParseStats()
+
+
+def parse_ai_json(text: str, expect=None, source: str = "gemini", log_failure: bool = True):
+    """Parses Gemini's JSON output, repairing it locally if needed.
+
+    `expect` (dict or list) is the required top-level type. Raises
+    ValueError when even the repaired text does not parse; callers with a
+    fallback of their own pass log_failure=False and log the outcome.
+    """
+    value = None
+    try:
+        value = loads(text)
+        outcome = "clean"
+    except (ValueError, TypeError):
+        outcome = "repaired"
+    if outcome == "clean" and expect is not None and not isinstance(value, expect):
+        outcome = "repaired"
+    if outcome == "repaired":
+        try:
+            value = loads(repair_json(text, expect))
+        except (ValueError, TypeError):
+            value = None
+        if value is None or (expect is not None and not isinstance(value, expect)):
+            parse_stats.record(source, "failed")
+            if log_failure:
+                logger.error("AI response for %s is not valid JSON: %r", source, (text or "")[:200])
+            raise ValueError("AI did not return valid JSON")
+        logger.info("Repaired malformed AI JSON for %s", source)
+    parse_stats.record(source, outcome)
+    return value
@@ -0,0 +1,240 @@
+# app/audio.py
+"""Audio variants, text segmentation for TTS and MP3 frame handling.
+
+A variant is the Polly output format plus sample rate; clients pick one by
+query parameters or the Accept and Save-Data headers.
+
+Long texts are synthesized sentence by sentence so segments shared between
+texts are cached once. Polly returns plain MPEG audio frames, so segments
+with the same voice and format can be joined by concatenating their frames
+(after dropping ID3 tags and the Xing/Info header, which would describe
+only the first segment).
+"""
+import os
+import re
+from typing import NamedTuple, Optional
+
+# Polly output format -> (file extension, media type)
+AUDIO_FORMATS = {"mp3": ("mp3", "audio/mpeg"), "ogg_vorbis": ("ogg", "audio/ogg")}
+MEDIA_TYPES = {ext: media_type for ext, media_type in AUDIO_FORMATS.values()}
+# Polly's rates for mp3/ogg; 24 kHz is the neural voices' default
+SAMPLE_RATES = (8000, 16000, 22050, 24000)
+DEFAULT_SAMPLE_RATE = 24000
+# Rate used when the client sends "Save-Data: on" and asks for none
+SAVE_DATA_SAMPLE_RATE = int(os.getenv("TTS_SAVE_DATA_SAMPLE_RATE", 16000))
+
+
+class AudioVariant(NamedTuple):
+    output_format: str = "mp3"
+    sample_rate: Optional[int] = None  # None is Polly's default rate
+
+    @property
+    def ext(self) -> str:
+        return AUDIO_FORMATS[self.output_format][0]
+
+    @property
+    def media_type(self) -> str:
+        return AUDIO_FORMATS[self.output_format][1]
+
+
+DEFAULT_VARIANT = AudioVariant()
+
+
+def _accept_q(accept: str) -> dict:
+    """{media range: q} from an Accept header."""
+    ranges = {}
+    for part in accept.split(","):
+        media_range, *params = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if media_range:
+            ranges[media_range.lower()] = max(q, ranges.get(media_range.lower(), 0.0))
+    return ranges
+
+
+def accepted_formats(accept: Optional[str], wildcards: bool = True) -> dict:
+    """{output_format: q} for the formats the client accepts; with
+    wildcards=False only the ones it names."""
+    if not accept:
+        return {name: 1.0 for name in AUDIO_FORMATS} if wildcards else {}
+    ranges = _accept_q(accept)
+    wildcard = max(ranges.get("*/*", 0.0), ranges.get("audio/*", 0.0)) if wildcards else 0.0
+    names = {"mp3": ("audio/mpeg", "audio/mp3"), "ogg_vorbis": ("audio/ogg", "audio/vorbis")}
+    out = {}
+    for name, media_types in names.items():
+        q = max([ranges[m] for m in media_types if m in ranges] or [wildcard])
+        if q > 0:
+            out[name] = q
+    return out
+
+
+def negotiate_variant(output_format: Optional[str] = None, sample_rate: Optional[int] = None,
+                      accept: Optional[str] = None, save_data: bool = False) -> AudioVariant:
+    """Picks the variant from explicit parameters, then the Accept and
+    Save-Data headers. Raises ValueError for unsupported values."""
+    if output_format is None:
+        formats = accepted_formats(accept)
+        # MP3 unless the client explicitly prefers Ogg
+        output_format = "ogg_vorbis" if formats.get("ogg_vorbis", 0) > formats.get("mp3", 0) else "mp3"
+    if output_format not in AUDIO_FORMATS:
+        raise ValueError(f"Unsupported format '{output_format}' (use {', '.join(AUDIO_FORMATS)})")
+    if sample_rate is None and save_data:
+        sample_rate = SAVE_DATA_SAMPLE_RATE
+    if sample_rate is not None and sample_rate not in SAMPLE_RATES:
+        raise ValueError(f"Unsupported sample rate {sample_rate} (use {', '.join(map(str, SAMPLE_RATES))})")
+    if sample_rate == DEFAULT_SAMPLE_RATE:
+        sample_rate = None
+    return AudioVariant(output_format, sample_rate)
+
+
+def fallback_variants(variant: AudioVariant, accept: Optional[str] = None) -> list:
+    """Other variants that may stand in for a missing one: the same format at
+    other rates (closest first), then other formats the client names in
+    Accept (a bare */* does not prove it can play Ogg)."""
+    def rate(v):
+        return v.sample_rate or DEFAULT_SAMPLE_RATE
+
+    formats = accepted_formats(accept, wildcards=False)
+    order = [variant.output_format] + sorted(
+        (f for f in formats if f != variant.output_format), key=lambda f: -formats[f])
+    out = []
+    for output_format in order:
+        candidates = [AudioVariant(output_format, None if r == DEFAULT_SAMPLE_RATE else r)
+                      for r in SAMPLE_RATES]
+        candidates.sort(key=lambda v: (abs(rate(v) - rate(variant)), -rate(v)))
+        out.extend(v for v in candidates if v != variant)
+    return out
+
+
+# Sentence ends, then phrase breaks for sentences that are still too long
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…])\s+|\n+")
+_PHRASE_BREAK_RE = re.compile(r"(?<=[,;:])\s+")
+
+
+def _pack(pieces, max_chars: int) -> list:
+    """Greedily joins pieces into chunks of at most max_chars."""
+    chunks, current = [], ""
+    for piece in pieces:
+        while len(piece) > max_chars:
+            # A single word longer than the limit is cut as a last resort
+            cut = piece.rfind(" ", 0, max_chars + 1)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(piece[:cut].strip())
+            piece = piece[cut:].strip()
+        if not piece:
+            continue
+        if current and len(current) + 1 + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current} {piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def split_segments(text: str, max_chars: int = 300) -> list:
+    """Splits text into sentences; over-long sentences are split at
+    phrase breaks (, ; :) and then between words."""
+    segments = []
+    for sentence in _SENTENCE_END_RE.split((text or "").strip()):
+        sentence = " ".join(sentence.split())
+        if not sentence:
+            continue
+        if len(sentence) <= max_chars:
+            segments.append(sentence)
+        else:
+            segments.extend(_pack(_PHRASE_BREAK_RE.split(sentence), max_chars))
+    return segments
+
+
+# ---------- MP3 frames ----------
+
+# kbps by [MPEG-1?][bitrate index], Layer III only
+_BITRATES = {
+    True: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    False: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def parse_frame_header(data: bytes, offset: int):
+    """Returns (frame_length, samples, sample_rate) of the Layer III frame at
+    offset, or None if there is no valid frame header there."""
+    if offset + 4 > len(data) or data[offset] != 0xFF or data[offset + 1] & 0xE0 != 0xE0:
+        return None
+    version = (data[offset + 1] >> 3) & 0x03  # 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5
+    layer = (data[offset + 1] >> 1) & 0x03  # 1 = Layer III
+    bitrate_index = data[offset + 2] >> 4
+    rate_index = (data[offset + 2] >> 2) & 0x03
+    padding = (data[offset + 2] >> 1) & 0x01
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = _BITRATES[mpeg1][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    samples = 1152 if mpeg1 else 576
+    length = samples // 8 * bitrate // sample_rate + padding
+    return length, samples, sample_rate
+
+
+def _id3v2_length(data: bytes) -> int:
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = 0
+    for byte in data[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def iter_frames(data: bytes):
+    """Yields (offset, length, samples, sample_rate) for each audio frame,
+    skipping ID3 tags and resynchronising after garbage."""
+    offset = _id3v2_length(data)
+    while offset < len(data):
+        if data[offset:offset + 3] == b"TAG" and len(data) - offset == 128:
+            return  # ID3v1 trailer
+        header = parse_frame_header(data, offset)
+        if header is None or offset + header[0] > len(data):
+            next_sync = data.find(b"\xff", offset + 1)
+            if next_sync == -1:
+                return
+            offset = next_sync
+            continue
+        length, samples, sample_rate = header
+        yield offset, length, samples, sample_rate
+        offset += length
+
+
+def _is_info_frame(frame: bytes) -> bool:
+    return b"Xing" in frame[:64] or b"Info" in frame[:64]
+
+
+def mp3_frames(data: bytes) -> bytes:
+    """Only the audio frames of an MP3 (no tags, no Xing/Info frame)."""
+    out = []
+    for n, (offset, length, _, _) in enumerate(iter_frames(data)):
+        frame = data[offset:offset + length]
+        if n == 0 and _is_info_frame(frame):
+            continue
+        out.append(frame)
+    return b"".join(out)
+
+
+def concat_mp3(parts) -> bytes:
+    """Joins MP3s of the same voice and format into one stream."""
+    return b"".join(mp3_frames(part) for part in parts)
+
+
+def mp3_duration(data: bytes) -> float:
+    """Playing time in seconds, counted from the frames."""
+    return sum(samples / rate for _, _, samples, rate in iter_frames(data))
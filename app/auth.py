@@ -1,31 +1,59 @@
+import hashlib
 import os
 import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from typing import NamedTuple
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 
-from . import models
-from .database import get_db
+from . import crud, hashing, models
+from .database import SessionLocal, get_db
+from .hashing import pwd_context
 from .models import User
 
 SECRET_KEY = os.getenv("SECRET_KEY", "secret_key_example")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
+# Verified tokens are trusted for this long without looking the user up, so
+# a role change or revocation reaches other workers within this time
+AUTH_TOKEN_CACHE_SECONDS = float(os.getenv("AUTH_TOKEN_CACHE_SECONDS", 30))
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 10000))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 30))
+# How often each worker reloads the revoked refresh-token families
+AUTH_DENYLIST_SYNC_SECONDS = int(os.getenv("AUTH_DENYLIST_SYNC_SECONDS", 30))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 logger = logging.getLogger(__name__)
 
+# token -> (TokenUser, valid until); LRU-bounded
+_token_cache = OrderedDict()
+_token_cache_lock = threading.Lock()
+# Revoked token families; access tokens issued from them are refused. Only
+# families revoked within the access-token lifetime need to be kept.
+_revoked_families = set()
+
+
+class TokenUser(NamedTuple):
+    """The authenticated user as carried by a verified access token."""
+    id: int
+    email: str
+    role: str
+
 
 def get_password_hash(password):
+    """Blocking; request handlers use hashing.hash_password instead."""
     return pwd_context.hash(password)
 
 
 def verify_password(plain_password, hashed_password):
+    """Blocking; request handlers use authenticate instead."""
     return pwd_context.verify(plain_password, hashed_password)
 
 
@@ -38,6 +66,116 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+def create_user_access_token(user: User, expires_delta: timedelta = None, family_id: str = None):
+    """Access token with the claims get_current_user needs to skip the DB."""
+    data = {"sub": user.email, "uid": user.id, "role": user.role, "ver": user.token_version or 0}
+    if family_id:
+        data["fam"] = family_id
+    return create_access_token(data=data, expires_delta=expires_delta)
+
+
+def hash_refresh_token(token: str) -> str:
+    # Refresh tokens are random, so a fast hash is enough (unlike passwords)
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_refresh_token(db: Session, user: User, family_id: str = None):
+    """Returns (refresh_token, family_id); only the hash is stored."""
+    family_id = family_id or secrets.token_hex(16)
+    token = secrets.token_urlsafe(32)
+    crud.create_refresh_token(db, user.id, hash_refresh_token(token), family_id,
+                              datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+    return token, family_id
+
+
+def issue_tokens(db: Session, user: User, family_id: str = None) -> dict:
+    refresh_token, family_id = issue_refresh_token(db, user, family_id)
+    return {
+        "access_token": create_user_access_token(user, family_id=family_id),
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+    }
+
+
+def revoke_token_family(db: Session, family_id: str, user_id: int):
+    crud.revoke_refresh_family(db, family_id)
+    _revoked_families.add(family_id)
+    invalidate_user_tokens(user_id)
+
+
+def rotate_refresh_token(db: Session, refresh_token: str) -> dict:
+    """Exchanges a refresh token for new tokens of the same family.
+
+    A token can be used once. If a used token comes back, it was copied:
+    the whole family is revoked and the holder has to log in again.
+    """
+    invalid = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+    entry = crud.get_refresh_token(db, hash_refresh_token(refresh_token))
+    if entry is None or entry.revoked_at is not None or entry.expires_at <= datetime.utcnow():
+        raise invalid
+    if entry.rotated_at is not None or not crud.mark_refresh_token_rotated(db, entry.id):
+        logger.warning("Refresh token reuse for user %s; revoking family %s", entry.user_id, entry.family_id)
+        revoke_token_family(db, entry.family_id, entry.user_id)
+        raise invalid
+    user = db.get(User, entry.user_id)
+    if user is None:
+        raise invalid
+    return issue_tokens(db, user, entry.family_id)
+
+
+def sync_denylist(db: Session = None):
+    """Reloads the revoked families from the database (run periodically)."""
+    global _revoked_families
+    if db is None:
+        with SessionLocal() as db:
+            return sync_denylist(db)
+    since = datetime.utcnow() - timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    _revoked_families = set(crud.revoked_refresh_families(db, since))
+    return len(_revoked_families)
+
+
+def scheduled_denylist_sync():
+    try:
+        with SessionLocal() as db:
+            sync_denylist(db)
+            crud.delete_expired_refresh_tokens(db)
+    except Exception as e:
+        logger.error(f"Token denylist sync failed: {e}")
+
+
+def invalidate_user_tokens(user_id: int):
+    """Drops this worker's cached tokens of a user; other workers notice the
+    new token version once their cache entries expire."""
+    with _token_cache_lock:
+        for token in [t for t, (user, _) in _token_cache.items() if user.id == user_id]:
+            del _token_cache[token]
+
+
+def _cached_token_user(token: str):
+    with _token_cache_lock:
+        cached = _token_cache.get(token)
+        if cached is None:
+            return None
+        if cached[1] <= time.monotonic():
+            del _token_cache[token]
+            return None
+        _token_cache.move_to_end(token)
+        return cached[0]
+
+
+def _cache_token_user(token: str, user: TokenUser, expires_at: float = None):
+    ttl = AUTH_TOKEN_CACHE_SECONDS
+    if expires_at is not None:
+        ttl = min(ttl, expires_at - time.time())
+    if ttl <= 0:
+        return
+    with _token_cache_lock:
+        _token_cache[token] = (user, time.monotonic() + ttl)
+        _token_cache.move_to_end(token)
+        while len(_token_cache) > AUTH_TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+
+
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
@@ -49,7 +187,30 @@ def authenticate_user(db: Session, email: str, password: str):
     return user
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db=Depends(get_db)):
+async def authenticate(db: Session, email: str, password: str):
+    """Like authenticate_user, but verifies on the hashing pool and upgrades
+    hashes made with an outdated bcrypt cost."""
+    user = get_user_by_email(db, email)
+    if not user:
+        return None
+    db.commit()  # release the pooled connection while bcrypt runs
+    valid, new_hash = await hashing.verify_password(password, user.hashed_password)
+    if not valid:
+        return None
+    if new_hash:
+        user.hashed_password = new_hash
+        db.commit()
+        logger.info("Rehashed password for user %s", user.id)
+    return user
+
+
+def get_current_user(token: str = Depends(oauth2_scheme), db=Depends(get_db)) -> TokenUser:
+    """The token's user. Recently verified tokens are answered from memory;
+    otherwise the user is loaded once to check the token version and role."""
+    cached = _cached_token_user(token)
+    if cached is not None:
+        return cached
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -61,20 +222,28 @@ def get_current_user(token: str = Depends(oauth2_scheme), db=Depends(get_db)):
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
+    if "uid" in payload:
+        user = db.get(User, payload["uid"])
+    else:
+        # Tokens issued before uid/ver claims existed
+        user = db.query(User).filter(User.email == email).first()
+    if user is None or payload.get("ver", 0) != (user.token_version or 0):
         raise credentials_exception
-    return user
+    if payload.get("fam") in _revoked_families:
+        raise credentials_exception
+    current_user = TokenUser(user.id, user.email, user.role)
+    _cache_token_user(token, current_user, payload.get("exp"))
+    return current_user
 
 
-def require_admin(current_user: User = Depends(get_current_user)):
+def require_admin(current_user: TokenUser = Depends(get_current_user)):
     if current_user.role != "admin":
         logger.warning("Admin only")
         raise HTTPException(status_code=403, detail="Admin only")
     return current_user
 
 
-def get_admin_user(current_user: User = Depends(get_current_user)):
+def get_admin_user(current_user: TokenUser = Depends(get_current_user)):
     if current_user.role != "admin":
         logger.warning("Admin only")
         raise HTTPException(status_code=403, detail="Admin only")
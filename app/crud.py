@@ -1,11 +1,26 @@
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
+from sqlalchemy import and_, case, func, or_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app import models, schemas
 
+import os
 import random
+import threading
 
 _word_of_day_cache = {"date": None, "word": None}
 
+TRANSLATION_CACHE_TTL_HOURS = float(
+    os.getenv("TRANSLATION_CACHE_TTL_HOURS", 24 * 30))
+TRANSLATION_CACHE_HIT_FLUSH_SECONDS = int(
+    os.getenv("TRANSLATION_CACHE_HIT_FLUSH_SECONDS", 60))
+# Process-local counters for /translate lookups (dictionary, cache, Gemini)
+_translation_cache_stats = {"dictionary_hits": 0, "cache_hits": 0, "misses": 0}
+# Cache-entry hits as {(normalized, model): count}, written in batches so a
+# cache hit never writes to the database
+_translation_hit_buffer = {}
+_translation_hit_lock = threading.Lock()
+
 
 def create_user(db: Session, user: schemas.UserCreate, hashed_pw: str):
     db_user = models.User(
@@ -23,11 +38,61 @@ def set_user_role(db: Session, user_id: int, role: str):
     user = db.query(models.User).get(user_id)
     if user:
         user.role = role
+        # Tokens still carrying the old role stop working
+        user.token_version = (user.token_version or 0) + 1
         db.commit()
         db.refresh(user)
+        from app import auth
+        auth.invalidate_user_tokens(user.id)
     return user
 
 
+def create_refresh_token(db: Session, user_id: int, token_hash: str, family_id: str,
+                         expires_at: datetime):
+    entry = models.RefreshToken(user_id=user_id, token_hash=token_hash,
+                                family_id=family_id, expires_at=expires_at)
+    db.add(entry)
+    db.commit()
+    return entry
+
+
+def get_refresh_token(db: Session, token_hash: str):
+    return db.query(models.RefreshToken).filter_by(token_hash=token_hash).first()
+
+
+def mark_refresh_token_rotated(db: Session, entry_id: int) -> bool:
+    """Atomically marks a token used; False if another request got there first."""
+    count = (db.query(models.RefreshToken)
+             .filter(models.RefreshToken.id == entry_id, models.RefreshToken.rotated_at.is_(None))
+             .update({models.RefreshToken.rotated_at: datetime.utcnow()}, synchronize_session=False))
+    db.commit()
+    return count == 1
+
+
+def revoke_refresh_family(db: Session, family_id: str) -> int:
+    count = (db.query(models.RefreshToken)
+             .filter(models.RefreshToken.family_id == family_id,
+                     models.RefreshToken.revoked_at.is_(None))
+             .update({models.RefreshToken.revoked_at: datetime.utcnow()}, synchronize_session=False))
+    db.commit()
+    return count
+
+
+def revoked_refresh_families(db: Session, since: datetime) -> list:
+    rows = (db.query(models.RefreshToken.family_id)
+            .filter(models.RefreshToken.revoked_at >= since)
+            .distinct().all())
+    return [row.family_id for row in rows]
+
+
+def delete_expired_refresh_tokens(db: Session) -> int:
+    count = (db.query(models.RefreshToken)
+             .filter(models.RefreshToken.expires_at < datetime.utcnow())
+             .delete(synchronize_session=False))
+    db.commit()
+    return count
+
+
 def get_word_by_normalized(db: Session, normalized: str):
     return db.query(models.Word).filter(models.Word.normalized == normalized).first()
 
@@ -143,6 +208,47 @@ def filter_words(db: Session, search_by: str, value: str, offset: int = 0, limit
     return q.order_by(models.Word.text.asc()).offset(offset).limit(limit).all()
 
 
+def link_word_audio(db: Session, cache_keys: dict) -> int:
+    """Store TTS cache keys ({text: key}) on words whose translation or example matches."""
+    if not cache_keys:
+        return 0
+    texts = list(cache_keys)
+    words = db.query(models.Word).filter(or_(
+        models.Word.translation.in_(texts), models.Word.example.in_(texts))).all()
+    for word in words:
+        if word.translation in cache_keys:
+            word.audio_cache_key = cache_keys[word.translation]
+        if word.example in cache_keys:
+            word.example_audio_cache_key = cache_keys[word.example]
+    db.commit()
+    return len(words)
+
+
+def unlink_word_audio(db: Session, cache_keys=None):
+    """Forget TTS cache keys whose files are gone (all keys when None), so
+    audio_url stops pointing at them and the backfill regenerates them."""
+    for column in (models.Word.audio_cache_key, models.Word.example_audio_cache_key):
+        query = db.query(models.Word).filter(column.isnot(None))
+        if cache_keys is not None:
+            query = query.filter(column.in_(list(cache_keys)))
+        query.update({column: None}, synchronize_session=False)
+
+
+def recording_in_use(db: Session, recording_key: str) -> bool:
+    return db.query(models.Word).filter(or_(
+        models.Word.audio_recording_key == recording_key,
+        models.Word.example_recording_key == recording_key,
+    )).first() is not None
+
+
+def words_missing_audio(db: Session, limit: int = 1000):
+    return db.query(models.Word).filter(or_(
+        and_(models.Word.audio_cache_key.is_(None), models.Word.audio_recording_key.is_(None)),
+        and_(models.Word.example_audio_cache_key.is_(None), models.Word.example_recording_key.is_(None),
+             models.Word.example.isnot(None), models.Word.example != ""),
+    )).order_by(models.Word.id.asc()).limit(limit).all()
+
+
 def get_word_of_the_day(db: Session):
     today = date.today()
     if _word_of_day_cache["date"] == today and _word_of_day_cache["word"]:
@@ -154,3 +260,199 @@ def get_word_of_the_day(db: Session):
     _word_of_day_cache["date"] = today
     _word_of_day_cache["word"] = word
     return word
+
+
+def get_cached_translation(db: Session, normalized: str, model: str):
+    """Return an unexpired translation-cache entry and count the hit in
+    memory; flush_translation_cache_hits writes the counts."""
+    entry = (
+        db.query(models.TranslationCacheEntry)
+        .filter_by(normalized=normalized, model=model)
+        .first()
+    )
+    if not entry or (entry.expires_at and entry.expires_at <= datetime.utcnow()):
+        return None
+    with _translation_hit_lock:
+        key = (normalized, model)
+        _translation_hit_buffer[key] = _translation_hit_buffer.get(key, 0) + 1
+    return entry
+
+
+def flush_translation_cache_hits(db: Session) -> int:
+    """Add buffered hits to the entries in SQL; returns the hits written."""
+    global _translation_hit_buffer
+    with _translation_hit_lock:
+        hits, _translation_hit_buffer = _translation_hit_buffer, {}
+    Entry = models.TranslationCacheEntry
+    for (normalized, model), count in hits.items():
+        db.execute(
+            update(Entry)
+            .where(Entry.normalized == normalized, Entry.model == model)
+            .values(hit_count=func.coalesce(Entry.hit_count, 0) + count)
+            .execution_options(synchronize_session=False))
+    db.commit()
+    return sum(hits.values())
+
+
+def _translation_cache_entry(db: Session, normalized: str, model: str):
+    return (
+        db.query(models.TranslationCacheEntry)
+        .filter_by(normalized=normalized, model=model)
+        .first()
+    )
+
+
+def store_cached_translation(db: Session, normalized: str, model: str, payload: dict):
+    """Insert or refresh the cached AI payload for an input and model."""
+    now = datetime.utcnow()
+    values = {"payload": payload, "created_at": now, "hit_count": 0,
+              "expires_at": now + timedelta(hours=TRANSLATION_CACHE_TTL_HOURS)}
+    entry = _translation_cache_entry(db, normalized, model)
+    if entry is None:
+        try:
+            with db.begin_nested():
+                entry = models.TranslationCacheEntry(normalized=normalized, model=model, **values)
+                db.add(entry)
+        except IntegrityError:
+            # Another worker cached the same input first; refresh its row
+            entry = _translation_cache_entry(db, normalized, model)
+    for name, value in values.items():
+        setattr(entry, name, value)
+    db.commit()
+    return entry
+
+
+def purge_translation_cache(db: Session, expired_only: bool = False) -> int:
+    """Delete translation-cache entries; returns the number removed."""
+    q = db.query(models.TranslationCacheEntry)
+    if expired_only:
+        q = q.filter(models.TranslationCacheEntry.expires_at <= datetime.utcnow())
+    deleted = q.delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def record_translation_lookup(source: str):
+    """Count a /translate lookup by where it was answered from."""
+    key = {"dictionary": "dictionary_hits", "cache": "cache_hits"}.get(source, "misses")
+    _translation_cache_stats[key] += 1
+
+
+def get_translation_cache_stats(db: Session) -> dict:
+    stats = dict(_translation_cache_stats)
+    total = sum(stats.values())
+    hits = stats["dictionary_hits"] + stats["cache_hits"]
+    stats["total_lookups"] = total
+    stats["hit_ratio"] = round(hits / total, 4) if total else 0.0
+    stats["cached_entries"] = db.query(models.TranslationCacheEntry).count()
+    stats["ttl_hours"] = TRANSLATION_CACHE_TTL_HOURS
+    return stats
+
+
+# ---------- TTS cache index ----------
+
+def get_tts_cache_stats_row(db: Session):
+    stats = db.get(models.TTSCacheStats, 1)
+    if stats is None:
+        try:
+            with db.begin_nested():
+                db.add(models.TTSCacheStats(id=1, total_files=0, total_bytes=0, total_hits=0,
+                                            evicted_files=0, evicted_bytes=0))
+        except IntegrityError:
+            # Another worker created the row first
+            pass
+        stats = db.get(models.TTSCacheStats, 1)
+    return stats
+
+
+def _update_tts_cache_stats(db: Session, **values):
+    """Applies totals in SQL, e.g. total_bytes=TTSCacheStats.total_bytes + n,
+    so concurrent writers do not overwrite each other's counts."""
+    get_tts_cache_stats_row(db)
+    db.execute(update(models.TTSCacheStats).where(models.TTSCacheStats.id == 1).values(**values))
+
+
+def _decremented(column, amount: int):
+    return case((column < amount, 0), else_=column - amount)
+
+
+def register_tts_cache_entry(db: Session, cache_key: str, voice_id: str, path: str, size_bytes: int):
+    """Insert or refresh an index row and keep the running totals in step."""
+    Stats = models.TTSCacheStats
+    entry = db.query(models.TTSCacheEntry).filter_by(cache_key=cache_key).first()
+    now = datetime.utcnow()
+    if entry:
+        _update_tts_cache_stats(db, total_bytes=Stats.total_bytes + size_bytes - (entry.size_bytes or 0))
+        entry.path, entry.size_bytes, entry.last_accessed_at = path, size_bytes, now
+        if voice_id:
+            entry.voice_id = voice_id
+    else:
+        entry = models.TTSCacheEntry(cache_key=cache_key, voice_id=voice_id, path=path,
+                                     size_bytes=size_bytes, hit_count=0,
+                                     created_at=now, last_accessed_at=now)
+        db.add(entry)
+        _update_tts_cache_stats(db, total_files=Stats.total_files + 1,
+                                total_bytes=Stats.total_bytes + size_bytes)
+    db.commit()
+    return entry
+
+
+def get_tts_cache_entries(db: Session, cache_keys) -> dict:
+    """Index rows for many keys in one query, as {cache_key: entry}."""
+    entries = db.query(models.TTSCacheEntry).filter(
+        models.TTSCacheEntry.cache_key.in_(list(cache_keys))).all()
+    return {entry.cache_key: entry for entry in entries}
+
+
+def record_tts_cache_hits(db: Session, hits: dict):
+    """Apply buffered {cache_key: (count, last_access)}; returns keys not in the index."""
+    if not hits:
+        return []
+    entries = db.query(models.TTSCacheEntry).filter(
+        models.TTSCacheEntry.cache_key.in_(list(hits))).all()
+    found = set()
+    for entry in entries:
+        count, last_access = hits[entry.cache_key]
+        entry.hit_count = (entry.hit_count or 0) + count
+        entry.last_accessed_at = max(entry.last_accessed_at or last_access, last_access)
+        found.add(entry.cache_key)
+    _update_tts_cache_stats(db, total_hits=models.TTSCacheStats.total_hits
+                            + sum(count for count, _ in hits.values()))
+    db.commit()
+    return [key for key in hits if key not in found]
+
+
+def delete_tts_cache_entries(db: Session, entries, evicted: bool = False):
+    """Remove index rows (files are deleted by the caller) and update totals."""
+    Stats = models.TTSCacheStats
+    freed = sum(e.size_bytes or 0 for e in entries)
+    for entry in entries:
+        db.delete(entry)
+    unlink_word_audio(db, [e.cache_key for e in entries])
+    values = {"total_files": _decremented(Stats.total_files, len(entries)),
+              "total_bytes": _decremented(Stats.total_bytes, freed)}
+    if evicted:
+        values.update(evicted_files=Stats.evicted_files + len(entries),
+                      evicted_bytes=Stats.evicted_bytes + freed,
+                      last_eviction_at=datetime.utcnow())
+    _update_tts_cache_stats(db, **values)
+    db.commit()
+    return freed
+
+
+def clear_tts_cache_index(db: Session):
+    db.query(models.TTSCacheEntry).delete()
+    unlink_word_audio(db)
+    _update_tts_cache_stats(db, total_files=0, total_bytes=0)
+    db.commit()
+
+
+def tts_eviction_candidates(db: Session, policy: str = "lru", limit: int = 500):
+    """Least recently used (or least frequently used) entries first."""
+    query = db.query(models.TTSCacheEntry)
+    if policy == "lfu":
+        query = query.order_by(models.TTSCacheEntry.hit_count.asc(),
+                               models.TTSCacheEntry.last_accessed_at.asc())
+    else:
+        query = query.order_by(models.TTSCacheEntry.last_accessed_at.asc())
+    return query.limit(limit).all()
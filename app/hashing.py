@@ -0,0 +1,89 @@
+# app/hashing.py
+"""Password hashing off the event loop.
+
+bcrypt costs a few hundred milliseconds of CPU per hash by design. Run in
+request threads, a burst of logins fills Starlette's thread pool and stalls
+every other sync route, and the GIL is held for part of the work. Hashes
+are therefore computed in a small process pool. Only HASH_MAX_PENDING
+hashes may be queued or running per worker; further requests get a 503
+with Retry-After at once instead of waiting behind the burst.
+"""
+import asyncio
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+# Changing the cost re-hashes each password at its owner's next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", 2))
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", HASH_WORKERS * 8))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+_executor = None
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def get_hash_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+    return _executor
+
+
+def shutdown_hash_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+# The cost is passed to the workers explicitly, so they always use the
+# parent's current setting
+@functools.lru_cache(maxsize=4)
+def _context(rounds: int) -> CryptContext:
+    return pwd_context.copy(bcrypt__rounds=rounds)
+
+
+def _hash(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+
+def _verify_and_update(password: str, hashed: str, rounds: int):
+    return _context(rounds).verify_and_update(password, hashed)
+
+
+async def _run(func, *args):
+    global _pending
+    with _pending_lock:
+        if _pending >= HASH_MAX_PENDING:
+            logger.warning("Password hashing saturated (%d pending)", _pending)
+            raise HTTPException(status_code=503, detail="Too many sign-in attempts right now, please retry",
+                                headers={"Retry-After": "1"})
+        _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_hash_executor(), func, *args)
+    finally:
+        with _pending_lock:
+            _pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _run(_hash, password, BCRYPT_ROUNDS)
+
+
+async def verify_password(password: str, hashed: str):
+    """Returns (valid, new_hash); new_hash is set when the stored hash uses
+    an outdated cost or scheme and should replace it."""
+    if not hashed:
+        return False, None
+    return await _run(_verify_and_update, password, hashed, BCRYPT_ROUNDS)
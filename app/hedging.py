@@ -0,0 +1,103 @@
+# app/hedging.py
+"""Hedged Gemini requests for interactive calls.
+
+If the first attempt has not answered by a percentile of recent latency, a
+duplicate is sent on another API key and the first answer wins. Hedges are
+capped at a fraction of recent requests so they cannot double quota use.
+"""
+import os
+import threading
+from collections import deque
+
+HEDGE_PERCENTILE = float(os.getenv("GEMINI_HEDGE_PERCENTILE", 95))
+HEDGE_MIN_SAMPLES = int(os.getenv("GEMINI_HEDGE_MIN_SAMPLES", 20))
+# Used until enough latencies have been recorded
+HEDGE_DEFAULT_DELAY = float(os.getenv("GEMINI_HEDGE_DEFAULT_DELAY", 3.0))
+HEDGE_MIN_DELAY = float(os.getenv("GEMINI_HEDGE_MIN_DELAY", 0.2))
+# At most this fraction of recent hedge-eligible requests may be hedged
+HEDGE_MAX_RATIO = float(os.getenv("GEMINI_HEDGE_MAX_RATIO", 0.1))
+HEDGE_WINDOW = int(os.getenv("GEMINI_HEDGE_WINDOW", 200))
+
+
+class LatencyTracker:
+    """Recent successful Gemini latencies (seconds), thread-safe."""
+
+    def __init__(self, window: int = HEDGE_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float):
+        with self._lock:
+            self._samples.append(latency)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, p: float):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))
+        return samples[index]
+
+
+class HedgePolicy:
+    def __init__(self, tracker: LatencyTracker = None, percentile: float = HEDGE_PERCENTILE,
+                 max_ratio: float = HEDGE_MAX_RATIO, window: int = HEDGE_WINDOW):
+        self.tracker = tracker if tracker is not None else LatencyTracker(window)
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self._recent = deque(maxlen=window)  # True where the request was hedged
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.fired = 0
+        self.won = 0
+        self.skipped_budget = 0
+        self.skipped_no_key = 0
+
+    def delay(self) -> float:
+        """How long to wait for the first attempt before hedging."""
+        if len(self.tracker) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return max(HEDGE_MIN_DELAY, self.tracker.percentile(self.percentile))
+
+    def start_request(self):
+        with self._lock:
+            self.requests += 1
+            self._recent.append(False)
+
+    def try_fire(self) -> bool:
+        """Claims a hedge if the budget allows; marks the latest request hedged."""
+        with self._lock:
+            allowance = max(1.0, self.max_ratio * len(self._recent))
+            if sum(self._recent) + 1 > allowance:
+                self.skipped_budget += 1
+                return False
+            self.fired += 1
+            if self._recent:
+                self._recent[-1] = True
+            return True
+
+    def record_no_key(self):
+        with self._lock:
+            self.skipped_no_key += 1
+
+    def record_win(self):
+        with self._lock:
+            self.won += 1
+
+    def stats(self) -> dict:
+        delay = self.delay()
+        return {
+            "hedge_eligible_requests": self.requests,
+            "hedges_fired": self.fired,
+            "hedges_won": self.won,
+            "skipped_budget": self.skipped_budget,
+            "skipped_no_key": self.skipped_no_key,
+            "fire_rate": round(self.fired / self.requests, 3) if self.requests else 0.0,
+            "win_rate": round(self.won / self.fired, 3) if self.fired else 0.0,
+            "max_ratio": self.max_ratio,
+            "current_delay_ms": round(delay * 1000, 1),
+            "latency_samples": len(self.tracker),
+        }
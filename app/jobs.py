@@ -0,0 +1,436 @@
+# app/jobs.py
+"""DB-backed background jobs for long-running admin AI work.
+
+Jobs are rows in ``jobs`` with one ``job_items`` row per input. Workers run on
+the application's event loop, claim queued jobs atomically and checkpoint each
+item, so a job interrupted by a restart resumes where it stopped without
+asking the AI twice for the same input.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, update
+
+from app import crud, models, schemas
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 5))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", 30))
+# A running job whose heartbeat is older than this is considered orphaned
+# (worker crashed or the app restarted) and is picked up again.
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", 120))
+
+# Background TTS pre-warming of new words and news titles
+TTS_PREWARM_ENABLED = os.getenv("TTS_PREWARM_ENABLED", "true").lower() in ("1", "true", "yes")
+TTS_PREWARM_CONCURRENCY = int(os.getenv("TTS_PREWARM_CONCURRENCY", 2))
+# Polly calls started per second by one pre-warm job
+TTS_PREWARM_RATE = float(os.getenv("TTS_PREWARM_RATE", 4))
+
+# kind -> async handler(runner)
+HANDLERS = {}
+
+
+def register_handler(kind: str):
+    """Register an async handler for a job kind."""
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def enqueue_job(db, kind: str, inputs: list, params: dict = None, created_by: int = None):
+    """Create a queued job with one item per input and return it."""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = models.Job(
+        kind=kind,
+        status=models.JobStatus.queued,
+        params=params or {},
+        total_items=len(inputs),
+        created_by=created_by,
+    )
+    job.items = [
+        models.JobItem(position=i, input=str(value),
+                       status=models.JobItemStatus.pending)
+        for i, value in enumerate(inputs)
+    ]
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    logger.info("[JOBS] Enqueued job %s (%s, %d items)",
+                job.id, kind, job.total_items)
+    if worker_pool is not None:
+        worker_pool.notify()
+    return job
+
+
+def enqueue_tts_prewarm(db, texts, voice_id: str = "Aria", created_by: int = None):
+    """Queue audio generation for texts (Word translations and examples,
+    news titles) so the first learner to play them hits the cache."""
+    if not TTS_PREWARM_ENABLED:
+        return None
+    from app.router.tts import TTS_MAX_TEXT_LENGTH
+
+    pending = []
+    for text in texts:
+        text = (text or "").strip()
+        if text and len(text) <= TTS_MAX_TEXT_LENGTH and text not in pending:
+            pending.append(text)
+    if not pending:
+        return None
+    return enqueue_job(db, "tts.prewarm", pending, params={"voice_id": voice_id},
+                       created_by=created_by)
+
+
+def job_to_schema(job: models.Job) -> schemas.JobOut:
+    """Build the API view of a job, including per-item progress."""
+    completed = sum(1 for i in job.items if i.status in (
+        models.JobItemStatus.done, models.JobItemStatus.skipped))
+    failed = sum(1 for i in job.items if i.status ==
+                 models.JobItemStatus.failed)
+    out = schemas.JobOut.model_validate(job)
+    out.completed_items = completed
+    out.failed_items = failed
+    return out
+
+
+class JobRunner:
+    """Handle passed to job handlers; wraps item bookkeeping and checkpoints."""
+
+    def __init__(self, db, job: models.Job):
+        self.db = db
+        self.job = job
+
+    @property
+    def params(self) -> dict:
+        return self.job.params or {}
+
+    def pending_items(self):
+        return [i for i in self.job.items if i.status == models.JobItemStatus.pending]
+
+    def checkpoint(self, item: models.JobItem, data):
+        """Persist the AI output of an item before acting on it."""
+        item.checkpoint = data
+        self._touch(item)
+
+    def complete_item(self, item: models.JobItem, result: dict = None):
+        item.status = models.JobItemStatus.done
+        item.result = result
+        self._touch(item)
+
+    def skip_item(self, item: models.JobItem, reason: str):
+        item.status = models.JobItemStatus.skipped
+        item.error = reason
+        self._touch(item)
+
+    def fail_item(self, item: models.JobItem, error: str):
+        item.status = models.JobItemStatus.failed
+        item.error = error
+        self._touch(item)
+
+    def _touch(self, item: models.JobItem):
+        now = datetime.utcnow()
+        item.updated_at = now
+        self.job.heartbeat_at = now
+        self.db.commit()
+
+
+async def run_job(job_id: int, session_factory=None):
+    """Run (or resume) a claimed job to completion."""
+    db = (session_factory or SessionLocal)()
+    try:
+        job = db.query(models.Job).filter_by(id=job_id).first()
+        if not job:
+            logger.warning("[JOBS] Job %s not found", job_id)
+            return None
+        handler = HANDLERS.get(job.kind)
+        if handler is None:
+            job.status = models.JobStatus.failed
+            job.error = f"No handler for job kind '{job.kind}'"
+            job.finished_at = datetime.utcnow()
+            db.commit()
+            return job
+
+        job.status = models.JobStatus.running
+        job.started_at = job.started_at or datetime.utcnow()
+        job.heartbeat_at = datetime.utcnow()
+        db.commit()
+
+        runner = JobRunner(db, job)
+        try:
+            result = await handler(runner)
+            job.status = models.JobStatus.completed
+            job.result = result
+        except Exception as e:
+            logger.error("[JOBS] Job %s (%s) failed: %s", job.id, job.kind, e)
+            db.rollback()
+            job.status = models.JobStatus.failed
+            job.error = str(e)
+        job.finished_at = datetime.utcnow()
+        db.commit()
+        logger.info("[JOBS] Job %s finished with status %s",
+                    job.id, job.status.value)
+        return job
+    finally:
+        db.close()
+
+
+def _claimable(stale_before):
+    return or_(
+        models.Job.status == models.JobStatus.queued,
+        and_(models.Job.status == models.JobStatus.running,
+             models.Job.heartbeat_at < stale_before),
+    )
+
+
+def claim_next_job(db):
+    """Atomically claim the oldest queued (or orphaned running) job."""
+    stale_before = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+    candidates = (
+        db.query(models.Job.id)
+        .filter(_claimable(stale_before))
+        .order_by(models.Job.id.asc())
+        .limit(5)
+        .all()
+    )
+    for (job_id,) in candidates:
+        claimed = db.execute(
+            update(models.Job)
+            .where(models.Job.id == job_id)
+            .where(_claimable(stale_before))
+            .values(status=models.JobStatus.running, heartbeat_at=datetime.utcnow())
+        )
+        db.commit()
+        if claimed.rowcount == 1:
+            return job_id
+    return None
+
+
+class JobWorkerPool:
+    """In-process pool of asyncio workers that drain the job table."""
+
+    def __init__(self, size: int = JOB_WORKERS, session_factory=None):
+        self.size = size
+        self.session_factory = session_factory or SessionLocal
+        self._tasks = []
+        self._wakeup = None
+        self._loop = None
+        self._running = False
+
+    async def start(self):
+        if self._running or self.size <= 0:
+            return
+        self._running = True
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(n))
+                       for n in range(self.size)]
+        logger.info("[JOBS] Started %d job workers", self.size)
+
+    async def stop(self):
+        self._running = False
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("[JOBS] Job workers stopped")
+
+    def notify(self):
+        """Wakes idle workers. Safe to call from any thread: jobs are also
+        enqueued from sync routes and from the scheduler's threads."""
+        if self._wakeup is None:
+            return
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._wakeup.set()
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _heartbeat(self, job_id: int):
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            db = self.session_factory()
+            try:
+                db.execute(update(models.Job).where(models.Job.id == job_id)
+                           .values(heartbeat_at=datetime.utcnow()))
+                db.commit()
+            finally:
+                db.close()
+
+    async def _worker(self, n: int):
+        while self._running:
+            db = self.session_factory()
+            try:
+                job_id = claim_next_job(db)
+            except Exception as e:
+                logger.error("[JOBS] Worker %d failed to claim a job: %s", n, e)
+                job_id = None
+            finally:
+                db.close()
+
+            if job_id is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heartbeat = asyncio.create_task(self._heartbeat(job_id))
+            try:
+                await run_job(job_id, self.session_factory)
+            except Exception as e:
+                logger.error("[JOBS] Worker %d crashed on job %s: %s",
+                             n, job_id, e)
+            finally:
+                heartbeat.cancel()
+
+
+worker_pool = None
+
+
+def get_worker_pool() -> JobWorkerPool:
+    global worker_pool
+    if worker_pool is None:
+        worker_pool = JobWorkerPool()
+    return worker_pool
+
+
+# ---------- Handlers ----------
+
+
+@register_handler("words.batch_add")
+async def batch_add_words_job(runner: JobRunner):
+    """Translate and store words in batches; AI output is checkpointed per item."""
+    from app import ai_integration
+
+    db = runner.db
+    pending = []
+    for item in runner.pending_items():
+        if crud.get_word_by_normalized(db, item.input.strip().lower()):
+            runner.skip_item(item, "exists")
+            continue
+        pending.append(item)
+
+    batch_size = ai_integration.BATCH_TRANSLATION_SIZE
+    for start in range(0, len(pending), batch_size):
+        chunk = pending[start:start + batch_size]
+        missing = [i.input for i in chunk if i.checkpoint is None]
+        if missing:
+            db.commit()  # release the pooled connection during the AI call
+            translations = await ai_integration.get_translations_batch(missing)
+            for item in chunk:
+                if item.checkpoint is None and item.input in translations:
+                    runner.checkpoint(item, translations[item.input])
+        for item in chunk:
+            if item.checkpoint is None:
+                runner.fail_item(item, "AI did not return a usable translation")
+                continue
+            # Added since the job started, or earlier in this job
+            if crud.get_word_by_normalized(db, item.input.strip().lower()):
+                runner.skip_item(item, "exists")
+                continue
+            try:
+                ai_data = dict(item.checkpoint)
+                db_word = crud.create_word(
+                    db, item.input, ai_data, ai_data.get("level") or "beginner")
+                runner.complete_item(item, {"word_id": db_word.id})
+            except Exception as e:
+                db.rollback()
+                logger.error("[JOBS] Error adding word '%s': %s", item.input, e)
+                runner.fail_item(item, str(e))
+
+    items = runner.job.items
+    added_ids = [i.result["word_id"] for i in items
+                 if i.status == models.JobItemStatus.done and i.result]
+    words = db.query(models.Word).filter(models.Word.id.in_(added_ids)).all()
+    enqueue_tts_prewarm(db, [t for w in words for t in (w.translation, w.example)],
+                        created_by=runner.job.created_by)
+    return {
+        "added": [i.input for i in items if i.status == models.JobItemStatus.done],
+        "skipped": [i.input for i in items if i.status == models.JobItemStatus.skipped],
+        "failed": [i.input for i in items if i.status == models.JobItemStatus.failed],
+    }
+
+
+@register_handler("news.refresh")
+async def news_refresh_job(runner: JobRunner):
+    """Fetch positive news once, checkpoint it, then store new stories."""
+    from app import ai_integration
+    from app.utils import refresh_news_in_db
+
+    added = 0
+    for item in runner.pending_items():
+        news_array = item.checkpoint
+        if news_array is None:
+            news_array = await ai_integration.get_positive_news_from_gemini()
+            runner.checkpoint(item, news_array or [])
+        # Duplicate source URLs are skipped, so re-running this is safe
+        added = await refresh_news_in_db(runner.db, news_array or [])
+        runner.complete_item(item, {"added": added})
+    return {"added": added}
+
+
+class RatePacer:
+    """Spaces out call starts to at most `rate` per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            delay = self._next - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next = max(self._next, loop.time()) + self.interval
+
+
+@register_handler("tts.prewarm")
+async def tts_prewarm_job(runner: JobRunner):
+    """Synthesize audio into the TTS cache and link it to matching words."""
+    from app.router import tts
+
+    voice_id = runner.params.get("voice_id", "Aria")
+    semaphore = asyncio.Semaphore(TTS_PREWARM_CONCURRENCY)
+    pacer = RatePacer(TTS_PREWARM_RATE)
+
+    async def warm(item):
+        cache_key = tts.generate_cache_key(item.input, voice_id)
+        cached = bool(tts.get_cached_audio_path(cache_key))
+        if not cached:
+            async with semaphore:
+                await pacer.wait()
+                try:
+                    # Shares the synthesis with a learner requesting the same audio
+                    await tts.ensure_cached_audio(item.input, voice_id, cache_key)
+                except Exception as e:
+                    logger.warning("[JOBS] Pre-warm failed for '%s': %s", item.input, e)
+                    runner.fail_item(item, str(e))
+                    return
+        runner.complete_item(item, {"cache_key": cache_key, "cached": cached})
+
+    await asyncio.gather(*(warm(item) for item in runner.pending_items()))
+
+    keys = {i.input: i.result["cache_key"] for i in runner.job.items
+            if i.status == models.JobItemStatus.done}
+    linked = crud.link_word_audio(runner.db, keys)
+    items = runner.job.items
+    return {
+        "generated": sum(1 for i in items if i.status == models.JobItemStatus.done
+                         and not i.result.get("cached")),
+        "already_cached": sum(1 for i in items if i.status == models.JobItemStatus.done
+                              and i.result.get("cached")),
+        "failed": sum(1 for i in items if i.status == models.JobItemStatus.failed),
+        "linked_words": linked,
+    }
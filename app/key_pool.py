@@ -0,0 +1,221 @@
+# app/key_pool.py
+"""Health-aware pool of Gemini API keys.
+
+Replaces a blind round-robin: every key has a token bucket (per-key rate
+limit), decaying error-rate and latency averages, a cooldown after 429s
+(honouring Retry-After) and a circuit breaker that opens after repeated
+failures. `acquire` always hands out the healthiest key that is available.
+
+State is guarded by a threading.Lock and no lock is held across an await, so
+the pool is safe to share between the event loop and the APScheduler thread.
+"""
+import asyncio
+import os
+import threading
+import time
+
+KEY_RPM = float(os.getenv("GEMINI_KEY_RPM", 60))
+KEY_BURST = float(os.getenv("GEMINI_KEY_BURST", 10))
+KEY_COOLDOWN_SECONDS = float(os.getenv("GEMINI_KEY_COOLDOWN_SECONDS", 30))
+KEY_FAILURE_THRESHOLD = int(os.getenv("GEMINI_KEY_FAILURE_THRESHOLD", 3))
+KEY_BREAKER_SECONDS = float(os.getenv("GEMINI_KEY_BREAKER_SECONDS", 60))
+# 401/403 usually means a revoked or quota-less key; keep it out for longer
+KEY_AUTH_COOLDOWN_SECONDS = float(
+    os.getenv("GEMINI_KEY_AUTH_COOLDOWN_SECONDS", 600))
+# Weight of the newest sample in the error-rate and latency averages
+EWMA_ALPHA = 0.2
+
+
+def mask_key(key: str) -> str:
+    return f"{key[:5]}...{key[-3:]}"
+
+
+class KeyState:
+    def __init__(self, key: str, burst: float, now: float):
+        self.key = key
+        self.tokens = burst
+        self.refilled_at = now
+        self.in_flight = 0
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self.consecutive_failures = 0
+        self.error_rate = 0.0
+        self.latency_ewma = None
+        self.cooldown_until = 0.0
+        self.circuit = "closed"  # closed, open, half_open
+        self.last_error = None
+        self.last_used = None
+
+
+class ApiKeyPool:
+    def __init__(self, keys, rpm: float = KEY_RPM, burst: float = KEY_BURST,
+                 clock=time.monotonic):
+        if not keys:
+            raise ValueError("ApiKeyPool needs at least one key")
+        self.rate = rpm / 60.0
+        self.burst = max(burst, 1.0)
+        self.clock = clock
+        self._lock = threading.Lock()
+        now = clock()
+        self._keys = {k: KeyState(k, self.burst, now) for k in keys}
+
+    # ---------- selection ----------
+
+    def _refill(self, state: KeyState, now: float):
+        elapsed = now - state.refilled_at
+        state.tokens = min(self.burst, state.tokens + elapsed * self.rate)
+        state.refilled_at = now
+
+    def _available_at(self, state: KeyState, now: float) -> float:
+        if state.circuit == "open" and now >= state.cooldown_until:
+            state.circuit = "half_open"
+        if state.circuit == "half_open" and state.in_flight:
+            return now + 1.0  # one trial request at a time
+        ready = max(now, state.cooldown_until)
+        if state.tokens < 1:
+            ready = max(ready, now + (1 - state.tokens) / self.rate)
+        return ready
+
+    def _score(self, state: KeyState) -> float:
+        """Lower is healthier: expected latency inflated by errors and load."""
+        latency = state.latency_ewma if state.latency_ewma is not None else 1.0
+        return latency * (1 + 4 * state.error_rate) * (1 + state.in_flight)
+
+    def try_acquire(self, exclude=()):
+        """Returns (key, 0) for the healthiest available key, or (None, wait)."""
+        with self._lock:
+            now = self.clock()
+            best, best_score, soonest = None, None, None
+            for state in self._keys.values():
+                if state.key in exclude:
+                    continue
+                self._refill(state, now)
+                ready = self._available_at(state, now)
+                if ready > now:
+                    soonest = ready if soonest is None else min(soonest, ready)
+                    continue
+                score = self._score(state)
+                if best is None or score < best_score:
+                    best, best_score = state, score
+            if best is None:
+                if soonest is None:  # every key excluded
+                    return None, 0.0
+                return None, soonest - now
+            best.tokens -= 1
+            best.in_flight += 1
+            best.requests += 1
+            best.last_used = now
+            return best.key, 0.0
+
+    async def acquire(self, exclude=(), max_wait: float = None) -> str:
+        """Waits (without blocking the loop) until a key is available.
+
+        When every non-excluded key is cooling down longer than `max_wait`,
+        excluded keys are considered too; the call never returns None.
+        """
+        waited = 0.0
+        while True:
+            key, wait = self.try_acquire(exclude)
+            if key:
+                return key
+            if exclude and (wait == 0.0 or (max_wait is not None and waited + wait > max_wait)):
+                exclude = ()
+                continue
+            wait = min(wait, 5.0)
+            await asyncio.sleep(wait)
+            waited += wait
+
+    # ---------- feedback ----------
+
+    def report_success(self, key: str, latency: float):
+        with self._lock:
+            state = self._keys.get(key)
+            if state is None:
+                return
+            state.in_flight = max(0, state.in_flight - 1)
+            state.successes += 1
+            state.consecutive_failures = 0
+            state.error_rate *= (1 - EWMA_ALPHA)
+            state.latency_ewma = latency if state.latency_ewma is None else (
+                EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * state.latency_ewma)
+            state.circuit = "closed"
+
+    def report_failure(self, key: str, status_code: int = None, retry_after: float = None,
+                       latency: float = None, error: str = None):
+        with self._lock:
+            state = self._keys.get(key)
+            if state is None:
+                return
+            now = self.clock()
+            state.in_flight = max(0, state.in_flight - 1)
+            state.failures += 1
+            state.consecutive_failures += 1
+            state.error_rate = EWMA_ALPHA + (1 - EWMA_ALPHA) * state.error_rate
+            state.last_error = error or (f"HTTP {status_code}" if status_code else None)
+            if latency is not None:
+                state.latency_ewma = latency if state.latency_ewma is None else (
+                    EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * state.latency_ewma)
+
+            if status_code == 429:
+                state.rate_limited += 1
+                state.tokens = min(state.tokens, 0)
+                backoff = retry_after if retry_after is not None else (
+                    KEY_COOLDOWN_SECONDS * 2 ** min(state.consecutive_failures - 1, 4))
+                state.cooldown_until = max(state.cooldown_until, now + backoff)
+            elif status_code in (401, 403):
+                state.cooldown_until = now + KEY_AUTH_COOLDOWN_SECONDS
+                state.circuit = "open"
+            elif state.circuit == "half_open" or state.consecutive_failures >= KEY_FAILURE_THRESHOLD:
+                state.circuit = "open"
+                state.cooldown_until = max(state.cooldown_until, now + KEY_BREAKER_SECONDS)
+
+    def release(self, key: str):
+        """Give back a key whose request was cancelled before it finished."""
+        with self._lock:
+            state = self._keys.get(key)
+            if state is not None:
+                state.in_flight = max(0, state.in_flight - 1)
+
+    # ---------- reporting ----------
+
+    def snapshot(self) -> list:
+        with self._lock:
+            now = self.clock()
+            out = []
+            for state in self._keys.values():
+                self._refill(state, now)
+                out.append({
+                    "key": mask_key(state.key),
+                    "circuit": state.circuit,
+                    "available": self._available_at(state, now) <= now,
+                    "cooldown_remaining_s": round(max(0.0, state.cooldown_until - now), 1),
+                    "tokens": round(state.tokens, 2),
+                    "in_flight": state.in_flight,
+                    "requests": state.requests,
+                    "successes": state.successes,
+                    "failures": state.failures,
+                    "rate_limited": state.rate_limited,
+                    "error_rate": round(state.error_rate, 3),
+                    "latency_ms": round(state.latency_ewma * 1000, 1) if state.latency_ewma is not None else None,
+                    "last_error": state.last_error,
+                })
+            return out
+
+
+def parse_retry_after(value) -> float:
+    """Seconds from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        from email.utils import parsedate_to_datetime
+        from datetime import datetime, timezone
+        when = parsedate_to_datetime(value)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    except Exception:
+        return None
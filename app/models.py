@@ -24,6 +24,22 @@ class User(Base):
     hashed_password = Column(String)
     role = Column(String, default="learner")  # "admin" or "learner"
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Bumped to invalidate the user's access tokens (e.g. on a role change)
+    token_version = Column(Integer, default=0)
+
+
+class RefreshToken(Base):
+    """A refresh token, stored as its SHA-256. Each login starts a family;
+    every refresh replaces the token with a new one in the same family."""
+    __tablename__ = "refresh_tokens"
+    id = Column(Integer, primary_key=True, index=True)
+    token_hash = Column(String(64), unique=True, index=True, nullable=False)
+    family_id = Column(String(32), index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    rotated_at = Column(DateTime)  # used once; presenting it again revokes the family
+    revoked_at = Column(DateTime, index=True)
 
 
 class Word(Base):
@@ -37,9 +53,63 @@ class Word(Base):
     type = Column(String)  # e.g., noun, verb, etc.
     domain = Column(String)  # e.g., greetings, food
     example = Column(Text)  # Example sentence
-    # Lowercased version for dedup/search
-    normalized = Column(String, index=True)
+    # Lowercased version for dedup/search; unique, so concurrent adds of
+    # "Kia ora" and "kia ora" cannot both be inserted
+    normalized = Column(String, unique=True, index=True)
     notes = Column(Text)  # Cultural/usage notes
+    # TTS cache keys of pre-generated audio for the translation and example
+    audio_cache_key = Column(String)
+    example_audio_cache_key = Column(String)
+    # Uploaded native-speaker recordings; preferred over the Polly audio
+    audio_recording_key = Column(String)
+    example_recording_key = Column(String)
+
+    @property
+    def audio_url(self):
+        key = self.audio_recording_key or self.audio_cache_key
+        return f"/tts/tts/audio/{key}" if key else None
+
+    @property
+    def example_audio_url(self):
+        key = self.example_recording_key or self.example_audio_cache_key
+        return f"/tts/tts/audio/{key}" if key else None
+
+
+class TranslationCacheEntry(Base):
+    __tablename__ = "translation_cache"
+    id = Column(Integer, primary_key=True, index=True)
+    normalized = Column(String, index=True)  # Lowercased, stripped input
+    model = Column(String)  # Gemini model that produced the payload
+    payload = Column(JSON)  # Full sanitized AI payload
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, index=True)
+    __table_args__ = (UniqueConstraint(
+        "normalized", "model", name="uq_translation_cache_input_model"),)
+
+
+class TTSCacheEntry(Base):
+    __tablename__ = "tts_cache_entries"
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String, unique=True, index=True)
+    voice_id = Column(String)
+    path = Column(String)  # Relative to the TTS cache directory
+    size_bytes = Column(Integer, default=0)
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_accessed_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class TTSCacheStats(Base):
+    """Single row (id=1) of running totals, so cache info is O(1)."""
+    __tablename__ = "tts_cache_stats"
+    id = Column(Integer, primary_key=True)
+    total_files = Column(Integer, default=0)
+    total_bytes = Column(Integer, default=0)
+    total_hits = Column(Integer, default=0)
+    evicted_files = Column(Integer, default=0)
+    evicted_bytes = Column(Integer, default=0)
+    last_eviction_at = Column(DateTime)
 
 
 class ProgressStatus(enum.Enum):
@@ -72,3 +142,54 @@ class NewsItem(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     __table_args__ = (UniqueConstraint(
         "source_url", name="uq_news_source_url"),)
+
+
+class JobStatus(enum.Enum):
+    queued = "queued"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+
+
+class JobItemStatus(enum.Enum):
+    pending = "pending"
+    done = "done"
+    skipped = "skipped"
+    failed = "failed"
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, index=True)  # e.g., "words.batch_add", "news.refresh"
+    status = Column(Enum(JobStatus), default=JobStatus.queued, index=True)
+    params = Column(JSON)
+    result = Column(JSON)
+    error = Column(Text)
+    total_items = Column(Integer, default=0)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    # Refreshed while a worker owns the job; stale heartbeats are re-queued
+    heartbeat_at = Column(DateTime)
+    items = relationship(
+        "JobItem", back_populates="job", order_by="JobItem.position",
+        cascade="all, delete-orphan")
+
+
+class JobItem(Base):
+    __tablename__ = "job_items"
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("jobs.id"), index=True)
+    position = Column(Integer)
+    input = Column(Text)
+    status = Column(Enum(JobItemStatus), default=JobItemStatus.pending)
+    # AI output saved before side effects, so a resumed job never re-asks the AI
+    checkpoint = Column(JSON)
+    result = Column(JSON)
+    error = Column(Text)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    job = relationship("Job", back_populates="items")
+    __table_args__ = (UniqueConstraint(
+        "job_id", "position", name="uq_job_items_position"),)
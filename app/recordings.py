@@ -0,0 +1,174 @@
+# app/recordings.py
+"""Native-speaker recordings uploaded by admins.
+
+Uploads are streamed to a temporary file chunk by chunk, so a large
+recording never sits in memory. Transcoding (silence trimming, loudness
+normalization, encoding to the delivery formats) is CPU-bound and runs in
+a small process pool, away from the event loop and the GIL. The results
+are content-addressed (the key is a hash of the upload), stored beside
+the TTS cache and linked from Word, where they take precedence over the
+Polly audio.
+
+ffmpeg is optional: without it, MP3 uploads are accepted as they are
+(tags stripped) and other formats are rejected.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from app import audio
+
+logger = logging.getLogger(__name__)
+
+RECORDING_MAX_MB = float(os.getenv("RECORDING_MAX_MB", 20))
+RECORDING_TRANSCODE_WORKERS = int(os.getenv("RECORDING_TRANSCODE_WORKERS", 2))
+RECORDING_TRANSCODE_TIMEOUT = float(os.getenv("RECORDING_TRANSCODE_TIMEOUT", 120))
+# EBU R128 integrated loudness target; -16 LUFS suits speech on phones
+RECORDING_TARGET_LUFS = float(os.getenv("RECORDING_TARGET_LUFS", -16))
+FFMPEG = os.getenv("FFMPEG_BINARY") or shutil.which("ffmpeg")
+
+# Output format -> ffmpeg encoder arguments; mono speech at Polly's rate
+_ENCODERS = {
+    "mp3": ["-c:a", "libmp3lame", "-b:a", "64k"],
+    "ogg_vorbis": ["-c:a", "libvorbis", "-q:a", "3"],
+}
+# Leading and trailing silence below -50 dB is cut
+_TRIM = "silenceremove=start_periods=1:start_silence=0.1:start_threshold=-50dB"
+
+_executor = None
+
+
+class RecordingError(Exception):
+    """The upload could not be turned into playable audio."""
+
+
+class RecordingTooLarge(RecordingError):
+    pass
+
+
+def get_transcode_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=RECORDING_TRANSCODE_WORKERS)
+    return _executor
+
+
+def shutdown_transcode_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+async def receive_upload(chunks, max_bytes: int = None) -> tuple:
+    """Writes an async iterator of body chunks to a temporary file.
+
+    Returns (path, sha256 hex digest); the caller removes the file.
+    """
+    max_bytes = max_bytes if max_bytes is not None else int(RECORDING_MAX_MB * 1024 * 1024)
+    digest = hashlib.sha256()
+    received = 0
+    fd, path = tempfile.mkstemp(prefix="recording_", suffix=".upload")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in chunks:
+                received += len(chunk)
+                if received > max_bytes:
+                    raise RecordingTooLarge(f"Recording exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                f.write(chunk)
+        if received == 0:
+            raise RecordingError("Empty upload")
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, digest.hexdigest()
+
+
+def _ffmpeg_command(ffmpeg: str, src_path: str, outputs: dict, target_lufs: float) -> list:
+    # Trim the start, reverse to trim the end, then normalize once
+    chain = f"{_TRIM},areverse,{_TRIM},areverse,loudnorm=I={target_lufs}:TP=-1.5:LRA=11"
+    labels = [f"[out{n}]" for n in range(len(outputs))]
+    command = [ffmpeg, "-hide_banner", "-nostdin", "-loglevel", "error", "-y", "-i", src_path,
+               "-filter_complex", f"[0:a]{chain},asplit={len(outputs)}{''.join(labels)}"]
+    for label, (output_format, path) in zip(labels, outputs.items()):
+        command += ["-map", label, "-ac", "1", "-ar", str(audio.DEFAULT_SAMPLE_RATE),
+                    *_ENCODERS[output_format], path]
+    return command
+
+
+def transcode(src_path: str, dest_base: str, ffmpeg: str = None,
+              target_lufs: float = RECORDING_TARGET_LUFS,
+              timeout: float = RECORDING_TRANSCODE_TIMEOUT) -> dict:
+    """Encodes the recording to every delivery format; returns
+    {output_format: path}. Runs in a worker process."""
+    if not ffmpeg:
+        with open(src_path, "rb") as f:
+            frames = audio.mp3_frames(f.read())
+        if not frames:
+            raise RecordingError("Only MP3 uploads are supported without ffmpeg")
+        path = f"{dest_base}.mp3"
+        with open(path, "wb") as f:
+            f.write(frames)
+        return {"mp3": path}
+
+    outputs = {output_format: f"{dest_base}.{audio.AUDIO_FORMATS[output_format][0]}"
+               for output_format in _ENCODERS}
+    try:
+        subprocess.run(_ffmpeg_command(ffmpeg, src_path, outputs, target_lufs),
+                       check=True, capture_output=True, timeout=timeout)
+    except subprocess.CalledProcessError as e:
+        raise RecordingError(f"ffmpeg could not decode the upload: {e.stderr.decode(errors='replace')[-300:]}")
+    except subprocess.TimeoutExpired:
+        raise RecordingError("Transcoding timed out")
+    return outputs
+
+
+async def transcode_recording(src_path: str, dest_base: str) -> dict:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_transcode_executor(), transcode, src_path, dest_base, FFMPEG)
+
+
+def publish_recording(recording_key: str, outputs: dict) -> list:
+    """Moves transcoded files into the recordings area of the audio cache
+    (and shared storage); returns the stored formats."""
+    from app.router import tts
+
+    for output_format, path in outputs.items():
+        relpath = tts.recording_relpath(recording_key, audio.AUDIO_FORMATS[output_format][0])
+        target = os.path.join(tts.AUDIO_CACHE_DIR, relpath)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(path, target)
+        if tts.audio_storage.remote:
+            tts.audio_storage.put_file(relpath, target)
+    return list(outputs)
+
+
+def delete_recording(recording_key: str):
+    """Removes every stored format of a recording, locally and in shared
+    storage. Callers make sure no word still links it."""
+    from app.router import tts
+
+    for ext, _ in audio.AUDIO_FORMATS.values():
+        tts.remove_cached_file(tts.recording_relpath(recording_key, ext))
+    logger.info("Deleted recording %s", recording_key)
+
+
+async def store_recording(src_path: str, digest: str) -> tuple:
+    """Transcodes an upload and stores it under its content key; returns
+    (recording_key, formats); the same file always gets the same key."""
+    recording_key = digest[:32]
+    work_dir = tempfile.mkdtemp(prefix="recording_")
+    try:
+        outputs = await transcode_recording(src_path, os.path.join(work_dir, recording_key))
+        formats = await asyncio.to_thread(publish_recording, recording_key, outputs)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    logger.info("Stored recording %s as %s", recording_key, ", ".join(formats))
+    return recording_key, formats
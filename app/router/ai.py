@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends
+
+from app import ai_integration, ai_json, auth
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["AI"])
+
+
+@router.get("/keys",
+            summary="Gemini API key usage",
+            description="Per-key usage and health: token bucket, in-flight requests, error rate, latency, 429 cooldowns and circuit-breaker state. Keys are masked. Admin access required.")
+def get_key_usage(current_user=Depends(auth.require_admin)):
+    """Per-key usage and health of the Gemini key pool (admin only)."""
+    return {"keys": ai_integration.key_pool.snapshot()}
+
+
+@router.get("/metrics",
+            summary="Gemini call metrics",
+            description="Hedged-request counters (fired, won, skipped by budget or for lack of a spare key), the current hedge delay, in-flight request coalescing, and JSON parse outcomes (clean, repaired, failed) per response type. Admin access required.")
+def get_ai_metrics(current_user=Depends(auth.require_admin)):
+    """Hedging, coalescing and JSON parsing metrics for Gemini calls (admin only)."""
+    return {
+        "hedging": ai_integration.hedge_policy.stats(),
+        "coalescing": ai_integration.ai_inflight.stats(),
+        "json_parsing": ai_json.parse_stats.snapshot(),
+    }
@@ -0,0 +1,46 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app import auth, jobs, models, schemas
+from app.database import get_db
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["Jobs"])
+
+
+@router.get("/", response_model=List[schemas.JobOut],
+            summary="List background jobs",
+            description="Returns the most recent background jobs, newest first. Admin access required.")
+def list_jobs(
+    limit: int = 20,
+    db: Session = Depends(get_db),
+    current_user=Depends(auth.require_admin),
+):
+    """List recent background jobs (admin only)."""
+    recent = (
+        db.query(models.Job)
+        .order_by(models.Job.id.desc())
+        .limit(limit)
+        .all()
+    )
+    return [jobs.job_to_schema(job) for job in recent]
+
+
+@router.get("/{job_id}", response_model=schemas.JobOut,
+            summary="Get job progress",
+            description="Returns the status of a background job with per-item progress. Admin access required.")
+def get_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user=Depends(auth.require_admin),
+):
+    """Get a background job and its per-item progress (admin only)."""
+    job = db.query(models.Job).filter_by(id=job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return jobs.job_to_schema(job)
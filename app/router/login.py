@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
-from app import auth, schemas
+from app import auth, crud, schemas
 from app.database import get_db
 
 import logging
@@ -17,16 +17,32 @@ router = APIRouter(tags=["Login"])
 #             description="Authenticate with email and password. Returns a JWT access token if successful.")
 @router.post("", response_model=schemas.Token,
             summary="User login (alternative)",
-            description="Authenticate with email and password. Returns a JWT access token if successful.")
-def login(
+            description="Authenticate with email and password. Returns a JWT access token and a refresh token if successful.")
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
 ):
     """Authenticate user and issue JWT token."""
-    user = auth.authenticate_user(db, form_data.username, form_data.password)
+    user = await auth.authenticate(db, form_data.username, form_data.password)
     if not user:
         logger.error("Incorrect email or password: %s", user)
         raise HTTPException(
             status_code=400, detail="Incorrect email or password")
-    access_token = auth.create_access_token(
-        data={"sub": user.email, "role": user.role})
-    return {"access_token": access_token, "token_type": "bearer"}
+    return auth.issue_tokens(db, user)
+
+
+@router.post("/refresh", response_model=schemas.Token,
+             summary="Refresh the access token",
+             description="Exchanges a refresh token for a new access token and a new refresh token. "
+                         "Each refresh token works once; reusing one signs that device out.")
+def refresh(body: schemas.RefreshRequest, db: Session = Depends(get_db)):
+    """Issue new tokens without verifying the password again."""
+    return auth.rotate_refresh_token(db, body.refresh_token)
+
+
+@router.post("/logout", status_code=204,
+             summary="Log out a device",
+             description="Revokes the refresh token and the access tokens issued with it.")
+def logout(body: schemas.RefreshRequest, db: Session = Depends(get_db)):
+    entry = crud.get_refresh_token(db, auth.hash_refresh_token(body.refresh_token))
+    if entry is not None:
+        auth.revoke_token_family(db, entry.family_id, entry.user_id)
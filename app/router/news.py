@@ -4,10 +4,11 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
+from app import jobs
 from app.ai_integration import get_positive_news_from_gemini
 from app.auth import get_db, require_admin
 from app.models import NewsItem
-from app.schemas import NewsOut, BatchDeleteRequest
+from app.schemas import JobOut, NewsOut, BatchDeleteRequest
 
 import logging
 logger = logging.getLogger(__name__)
@@ -74,8 +75,8 @@ def list_all_news(
     return [NewsOut.model_validate(item) for item in news_items]
 
 
-@router.post("/refresh", tags=["News"], summary="Refresh news from AI",
-             description="Fetches new positive news stories using Gemini AI and saves them to the database. Admin access required.")
+@router.post("/refresh", tags=["News"], summary="Refresh news from AI", deprecated=True,
+             description="Fetches new positive news stories using Gemini AI and saves them to the database. Admin access required. Deprecated: use `/refresh/job`, which does not hold the request open during the AI call.")
 async def admin_refresh_news(
     db: Session = Depends(get_db), current_user=Depends(require_admin)
 ):
@@ -85,23 +86,36 @@ async def admin_refresh_news(
     return {"added": added, "message": f"{added} new news stories added."}
 
 
+@router.post("/refresh/job", response_model=JobOut, status_code=202, tags=["News"],
+             summary="Refresh news from AI in the background",
+             description="Queues a background news refresh and returns the job id immediately. Poll `/jobs/{id}` for progress. Admin access required.")
+async def queue_news_refresh(
+    db: Session = Depends(get_db), current_user=Depends(require_admin)
+):
+    """Queue a news refresh job (admin only)."""
+    job = jobs.enqueue_job(db, "news.refresh", ["news"],
+                           created_by=current_user.id)
+    return jobs.job_to_schema(job)
+
+
 @router.post("/refresh/manual", tags=["News"],
              summary="Manually trigger news refresh",
-             description="Manually refresh news from AI. Admin access required.")
-def manual_news_refresh_endpoint(
+             description="Manually refresh news from AI. Runs as a background job; poll `/jobs/{id}` for the result. Admin access required.")
+async def manual_news_refresh_endpoint(
+    db: Session = Depends(get_db),
     current_user=Depends(require_admin),
 ):
     """Manually trigger news refresh (admin only)."""
     try:
-        from app.utils import manual_news_refresh
-
         logger.info("[MANUAL REFRESH] Admin triggered manual news refresh")
-        manual_news_refresh()
+        job = jobs.enqueue_job(db, "news.refresh", ["news"],
+                               created_by=current_user.id)
 
         return {
-            "message": "Manual news refresh completed successfully",
+            "message": "Manual news refresh queued",
             "triggered_by": "admin",
-            "note": "Check logs for detailed results"
+            "job_id": job.id,
+            "note": f"Check /jobs/{job.id} for progress"
         }
 
     except Exception as e:
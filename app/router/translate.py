@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+import asyncio
+import json
 import logging
 import traceback
 import httpx
 
-from app.ai_integration import get_translation
+from app import ai_integration, auth, crud
+from app.database import get_db
+from app.singleflight import cross_worker_lock
 from app.schemas import TranslationRequest, TranslationResponse
 
 from ..utils import extract_ai_text, extract_json_from_markdown, sanitize_ai_data
@@ -13,25 +19,159 @@ logger = logging.getLogger(__name__)
 
 
 @router.post("/", response_model=TranslationResponse)
-async def translate_word(request: TranslationRequest, req: Request):
+async def translate_word(request: TranslationRequest, req: Request, db: Session = Depends(get_db)):
     try:
-        from app.ai_integration import timeout  # make sure you use your timeout
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            # uses client with timeout
-            result = await get_translation(request.text)
-        raw_ai_text = extract_ai_text(result)
-        if not raw_ai_text:
-            return TranslationResponse(translation="Translation not found.")
-        try:
-            ai_data = extract_json_from_markdown(raw_ai_text)
-            ai_data = sanitize_ai_data(ai_data)
-        except Exception:
-            return TranslationResponse(translation="Error parsing translation.")
-        return TranslationResponse(translation=ai_data.get("translation", "No translation found."))
+        normalized = request.text.strip().lower()
+        # Dictionary words and recent translations never reach Gemini
+        word = crud.get_word_by_normalized(db, normalized)
+        if word and word.translation:
+            crud.record_translation_lookup("dictionary")
+            return TranslationResponse(translation=word.translation)
+        cached = crud.get_cached_translation(
+            db, normalized, ai_integration.GEMINI_MODEL)
+        if cached:
+            crud.record_translation_lookup("cache")
+            return TranslationResponse(translation=cached.payload.get("translation", "No translation found."))
+        async with cross_worker_lock(db, "translation", normalized) as locked:
+            if locked:
+                # Another worker may have filled the shared cache while we waited
+                cached = crud.get_cached_translation(
+                    db, normalized, ai_integration.GEMINI_MODEL)
+                if cached:
+                    crud.record_translation_lookup("cache")
+                    return TranslationResponse(translation=cached.payload.get("translation", "No translation found."))
+            crud.record_translation_lookup("miss")
+            # Don't keep a pooled connection checked out while Gemini works
+            db.commit()
+
+            # Interactive: bounded and hedged, and stop paying for it if the client leaves
+            with ai_integration.call_budget(ai_integration.GEMINI_INTERACTIVE_DEADLINE, hedge=True):
+                result = await ai_integration.cancel_on_disconnect(
+                    req, ai_integration.get_translation(request.text))
+            raw_ai_text = extract_ai_text(result)
+            if not raw_ai_text:
+                return TranslationResponse(translation="Translation not found.")
+            try:
+                ai_data = extract_json_from_markdown(raw_ai_text)
+                ai_data = sanitize_ai_data(ai_data)
+            except Exception:
+                return TranslationResponse(translation="Error parsing translation.")
+            if ai_data["translation"]:
+                crud.store_cached_translation(
+                    db, normalized, ai_integration.GEMINI_MODEL, ai_data)
+            return TranslationResponse(translation=ai_data.get("translation", "No translation found."))
     except httpx.ReadTimeout:
         logger.error("Gemini API timed out:\n" + traceback.format_exc())
         return TranslationResponse(translation="AI service is slow or unavailable, please try again later.")
+    except ai_integration.GeminiRequestError as e:
+        logger.error("Gemini API rejected translation request: %s", e)
+        return TranslationResponse(translation="Translation not found.")
+    except asyncio.CancelledError:
+        logger.info("Translation for '%s' abandoned by client", request.text)
+        raise
     except Exception as e:
         logger.error(
             f"Unexpected error in /translate: {e}\n{traceback.format_exc()}")
         return TranslationResponse(translation="Internal server error.")
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/stream",
+             summary="Stream a translation (Server-Sent Events)",
+             description="""
+                Same lookup as `/translate/`, but the result is sent as Server-Sent Events:
+                - `field`: `{"field": ..., "value": ...}`, one per field, `translation` first
+                - `done`: the complete translation object
+                - `error`: `{"detail": ...}` if the translation failed
+                Dictionary and cached translations are sent at once; otherwise fields are
+                forwarded as Gemini generates them.""")
+async def translate_word_stream(request: TranslationRequest, db: Session = Depends(get_db)):
+    normalized = request.text.strip().lower()
+    known = None
+    word = crud.get_word_by_normalized(db, normalized)
+    if word and word.translation:
+        crud.record_translation_lookup("dictionary")
+        known = sanitize_ai_data({f: getattr(word, f, "") for f in (
+            "translation", "ipa", "phonetic", "type", "domain", "example", "notes")})
+    else:
+        cached = crud.get_cached_translation(
+            db, normalized, ai_integration.GEMINI_MODEL)
+        if cached:
+            crud.record_translation_lookup("cache")
+            known = sanitize_ai_data(dict(cached.payload))
+
+    async def events():
+        # get_db has already closed `db` by the time this runs; it reopens
+        # on use, so close it again once the stream ends
+        try:
+            if known:
+                yield sse_event("field", {"field": "translation", "value": known["translation"]})
+                for field, value in known.items():
+                    if field != "translation":
+                        yield sse_event("field", {"field": field, "value": value})
+                yield sse_event("done", known)
+                return
+
+            crud.record_translation_lookup("miss")
+            fields = {}
+            try:
+                with ai_integration.call_budget(ai_integration.GEMINI_INTERACTIVE_DEADLINE):
+                    async for field, value in ai_integration.stream_translation(request.text):
+                        fields[field] = value
+                        yield sse_event("field", {"field": field, "value": value})
+            except httpx.ReadTimeout:
+                logger.error("Gemini stream timed out for: %s", request.text)
+                yield sse_event("error", {"detail": "AI service is slow or unavailable, please try again later."})
+                return
+            except ai_integration.GeminiRequestError as e:
+                logger.error("Gemini API rejected streaming translation: %s", e)
+                yield sse_event("error", {"detail": "Translation not found."})
+                return
+            except Exception as e:
+                logger.error(
+                    f"Unexpected error in /translate/stream: {e}\n{traceback.format_exc()}")
+                yield sse_event("error", {"detail": "Internal server error."})
+                return
+
+            ai_data = sanitize_ai_data(fields)
+            if ai_data["translation"]:
+                crud.store_cached_translation(
+                    db, normalized, ai_integration.GEMINI_MODEL, ai_data)
+                yield sse_event("done", ai_data)
+            else:
+                yield sse_event("error", {"detail": "Translation not found."})
+        finally:
+            db.close()
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.get("/cache/stats",
+            summary="Translation cache statistics",
+            description="Returns how many /translate lookups were answered from the dictionary, the translation cache, or Gemini, and the resulting hit ratio. Admin access required.")
+def translation_cache_stats(
+    db: Session = Depends(get_db),
+    current_user=Depends(auth.require_admin),
+):
+    """Translation cache hit ratio (admin only)."""
+    stats = crud.get_translation_cache_stats(db)
+    stats["in_flight_coalescing"] = ai_integration.ai_inflight.stats()
+    return stats
+
+
+@router.delete("/cache",
+               summary="Purge translation cache",
+               description="Deletes cached translations (all, or only expired ones with `expired_only=true`). Admin access required.")
+def purge_translation_cache(
+    expired_only: bool = False,
+    db: Session = Depends(get_db),
+    current_user=Depends(auth.require_admin),
+):
+    """Purge the translation cache (admin only)."""
+    deleted = crud.purge_translation_cache(db, expired_only=expired_only)
+    logger.info("Purged %d translation cache entries", deleted)
+    return {"message": "Translation cache purged", "deleted_entries": deleted}
@@ -1,14 +1,23 @@
+import asyncio
 import hashlib
 import os
 import logging
-from typing import Optional
-from fastapi import APIRouter, HTTPException, Query, Depends
-from fastapi.responses import FileResponse
+import threading
+import uuid
+from datetime import datetime
+from typing import Annotated, Optional
+from fastapi import APIRouter, HTTPException, Header, Path, Query, Depends, Request
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
+from filelock import AsyncFileLock
 from sqlalchemy.orm import Session
 
-from app import auth, schemas
-from app.ai_integration import synthesize_maori_audio_with_polly
-from app.database import get_db
+from app import ai_integration, audio, auth, crud, schemas
+from app.audio import DEFAULT_VARIANT, AudioVariant
+from app.ai_integration import stream_maori_audio_with_polly, synthesize_maori_audio_with_polly
+from app.database import SessionLocal, get_db
+from app.singleflight import SingleFlight
+from app.static_files import IMMUTABLE_CACHE_CONTROL, AudioFileResponse
+from app.storage import create_audio_storage
 
 logger = logging.getLogger(__name__)
 
@@ -17,17 +26,64 @@ router = APIRouter(tags=["TTS"])
 # Audio cache directory
 AUDIO_CACHE_DIR = "./static/audio/tts_cache/"
 os.makedirs(AUDIO_CACHE_DIR, exist_ok=True)
+# Local disk, or S3-compatible storage shared by all instances (AUDIO_STORAGE)
+audio_storage = create_audio_storage(AUDIO_CACHE_DIR, "/static/audio/tts_cache/")
+# Longer texts are split into sentences, synthesized and cached one by one
+TTS_MAX_TEXT_LENGTH = int(os.getenv("TTS_MAX_TEXT_LENGTH", 5000))
+TTS_SEGMENT_MAX_CHARS = int(os.getenv("TTS_SEGMENT_MAX_CHARS", 300))
+TTS_SEGMENT_CONCURRENCY = int(os.getenv("TTS_SEGMENT_CONCURRENCY", 4))
+# Polly's limit for one request, which applies to unsegmented (Ogg) texts
+POLLY_MAX_TEXT_LENGTH = 3000
+# How long a worker waits for another worker's synthesis of the same key
+TTS_LOCK_TIMEOUT = float(os.getenv("TTS_LOCK_TIMEOUT", 60))
 
+# Disk budget for the cache; eviction trims it to the low watermark
+TTS_CACHE_MAX_MB = float(os.getenv("TTS_CACHE_MAX_MB", 500))
+TTS_CACHE_LOW_WATERMARK = float(os.getenv("TTS_CACHE_LOW_WATERMARK", 0.9))
+TTS_CACHE_EVICTION_POLICY = os.getenv("TTS_CACHE_EVICTION_POLICY", "lru").lower()  # lru or lfu
+# Cache hits are counted in memory and written to the index in batches
+TTS_CACHE_HIT_FLUSH = int(os.getenv("TTS_CACHE_HIT_FLUSH", 200))
 
-def generate_cache_key(text: str, voice_id: str = "Aria") -> str:
-    """Generate a unique cache key for the given text and voice."""
+# Concurrent Polly syntheses for the misses of one /tts/batch request
+TTS_BATCH_CONCURRENCY = int(os.getenv("TTS_BATCH_CONCURRENCY", 4))
+
+# When set (e.g. "/internal/tts_cache/"), audio is handed to nginx with
+# X-Accel-Redirect so it is sent with sendfile instead of through Python
+TTS_ACCEL_REDIRECT_PREFIX = os.getenv("TTS_ACCEL_REDIRECT_PREFIX")
+# Redirects to shared storage may be cached only briefly: presigned URLs expire
+TTS_REDIRECT_MAX_AGE = int(os.getenv("TTS_REDIRECT_MAX_AGE", 3600))
+CACHE_KEY_PATTERN = r"^[0-9a-f]{32}$"
+
+# Concurrent misses for the same cache key share one synthesis
+tts_inflight = SingleFlight("tts")
+
+_hit_buffer = {}
+_hit_lock = threading.Lock()
+_hit_flush_running = False
+
+
+def generate_cache_key(text: str, voice_id: str = "Aria", variant: AudioVariant = DEFAULT_VARIANT) -> str:
+    """Generate a unique cache key for the given text, voice and variant."""
     content = f"{text.lower().strip()}_{voice_id}"
+    if variant != DEFAULT_VARIANT:
+        # The default MP3 keeps its original key, so existing caches stay valid
+        content += f"_{variant.output_format}_{variant.sample_rate or audio.DEFAULT_SAMPLE_RATE}"
     return hashlib.md5(content.encode('utf-8')).hexdigest()
 
 
-def get_cached_audio_path(cache_key: str) -> Optional[str]:
+def cache_relpath(cache_key: str, ext: str = "mp3") -> str:
+    """Cache files are sharded as ab/cd/tts_abcd....mp3 to keep directories small."""
+    return os.path.join(cache_key[:2], cache_key[2:4], f"tts_{cache_key}.{ext}")
+
+
+def get_cached_audio_path(cache_key: str, ext: str = "mp3") -> Optional[str]:
     """Check if cached audio file exists and return its path."""
-    filename = f"tts_{cache_key}.mp3"
+    filepath = os.path.join(AUDIO_CACHE_DIR, cache_relpath(cache_key, ext))
+    if os.path.exists(filepath):
+        return filepath
+
+    # Files cached before sharding live directly in the cache directory
+    filename = f"tts_{cache_key}.{ext}"
     filepath = os.path.join(AUDIO_CACHE_DIR, filename)
     
     if os.path.exists(filepath):
@@ -35,29 +91,291 @@ def get_cached_audio_path(cache_key: str) -> Optional[str]:
     return None
 
 
-async def generate_and_cache_audio(text: str, voice_id: str, cache_key: str) -> str:
-    """Generate audio using AWS Polly and cache it."""
-    try:
-        # Generate filename for caching
-        filename = f"tts_{cache_key}.mp3"
-        
-        # Use existing Polly function with filename override
-        generated_filename = await synthesize_maori_audio_with_polly(
-            maori_text=text,
-            voice_id=voice_id,
-            output_format="mp3",
-            filename_override=filename
+def cache_audio_url(cache_key: str, path: str) -> str:
+    """Public URL of a cached file (/static, presigned or CDN)."""
+    relpath = os.path.relpath(path, AUDIO_CACHE_DIR)
+    if relpath.startswith(".."):
+        relpath = os.path.basename(path)
+    return audio_storage.url(relpath)
+
+
+def store_cached_file(cache_key: str, voice_id: str, relpath: str, path: str):
+    """Publishes a newly cached file to shared storage, then indexes it."""
+    if audio_storage.remote:
+        audio_storage.put_file(relpath, path)
+    with SessionLocal() as db:
+        crud.register_tts_cache_entry(db, cache_key, voice_id, relpath, os.path.getsize(path))
+
+
+def shared_cached_relpath(cache_key: str) -> Optional[str]:
+    """Where the audio is in shared storage, according to the cache index."""
+    if not audio_storage.remote:
+        return None
+    with SessionLocal() as db:
+        entry = crud.get_tts_cache_entries(db, [cache_key]).get(cache_key)
+        return entry.path if entry else None
+
+
+def fetch_cached_audio(cache_key: str, ext: str = "mp3") -> Optional[str]:
+    """Local path of cached audio, downloaded from shared storage if another
+    instance generated it."""
+    path = get_cached_audio_path(cache_key, ext)
+    if path or not audio_storage.remote:
+        return path
+    relpath = shared_cached_relpath(cache_key)
+    if relpath:
+        local_path = os.path.join(AUDIO_CACHE_DIR, relpath)
+        if audio_storage.download(relpath, local_path):
+            return local_path
+    return None
+
+
+async def locate_cached_audio(cache_key: str, ext: str = "mp3") -> Optional[str]:
+    """Like get_cached_audio_path, but also finds audio that only exists in
+    shared storage (the path is then not local; use it for URLs only)."""
+    path = get_cached_audio_path(cache_key, ext)
+    if path or not audio_storage.remote:
+        return path
+    relpath = await asyncio.to_thread(shared_cached_relpath, cache_key)
+    return os.path.join(AUDIO_CACHE_DIR, relpath) if relpath else None
+
+
+async def find_cached_audio(cache_key: str, ext: str = "mp3") -> Optional[str]:
+    path = get_cached_audio_path(cache_key, ext)
+    if path or not audio_storage.remote:
+        return path
+    return await asyncio.to_thread(fetch_cached_audio, cache_key, ext)
+
+
+async def find_cached_variant(text: str, voice_id: str, variant: AudioVariant, accept: Optional[str] = None):
+    """(variant, cache_key, path) of the closest cached variant the client
+    accepts, so a missing rate or format does not cost a Polly call."""
+    candidates = {generate_cache_key(text, voice_id, v): v for v in audio.fallback_variants(variant, accept)}
+    for cache_key, candidate in candidates.items():
+        path = get_cached_audio_path(cache_key, candidate.ext)
+        if path:
+            return candidate, cache_key, path
+    if audio_storage.remote:
+        def lookup():
+            with SessionLocal() as db:
+                return crud.get_tts_cache_entries(db, list(candidates))
+        indexed = await asyncio.to_thread(lookup)
+        for cache_key, candidate in candidates.items():
+            if cache_key in indexed:
+                return candidate, cache_key, os.path.join(AUDIO_CACHE_DIR, indexed[cache_key].path)
+    return None
+
+
+def recording_relpath(recording_key: str, ext: str = "mp3") -> str:
+    """Uploaded recordings sit beside the TTS cache but are not indexed, so
+    eviction and cache clearing never touch them."""
+    return os.path.join("recordings", cache_relpath(recording_key, ext))
+
+
+async def locate_recording(recording_key: str, ext: str = "mp3") -> Optional[str]:
+    """Path of the recording in the preferred format, else the MP3 that
+    every recording has."""
+    for candidate in dict.fromkeys([ext, "mp3"]):
+        relpath = recording_relpath(recording_key, candidate)
+        path = os.path.join(AUDIO_CACHE_DIR, relpath)
+        if os.path.exists(path):
+            return path
+        if audio_storage.remote and await asyncio.to_thread(audio_storage.exists, relpath):
+            return path
+    return None
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def cached_audio_response(request: Request, cache_key: str, path: Optional[str],
+                          headers: dict = None, etag: Optional[str] = None) -> Response:
+    """Serves a cached file. The file for a key never changes, so the key
+    (or etag, when one key has several representations) is a strong ETag
+    and clients may keep the audio forever.
+
+    Redirects to shared storage are different: the target may be a signed
+    URL that expires, so they carry no ETag and are cached privately for
+    less than the URL's lifetime.
+    """
+    if audio_storage.remote:
+        if path is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Audio file not found. It may have been deleted or never generated."
+            )
+        url_expires = getattr(audio_storage, "url_expires", None)
+        max_age = TTS_REDIRECT_MAX_AGE if url_expires is None else min(TTS_REDIRECT_MAX_AGE, url_expires // 2)
+        # The bytes come from the bucket or CDN, not through this worker
+        return RedirectResponse(cache_audio_url(cache_key, path), status_code=307,
+                                headers={**(headers or {}), "Cache-Control": f"private, max-age={max_age}"})
+    headers = {"ETag": f'"{etag or cache_key}"', "Cache-Control": IMMUTABLE_CACHE_CONTROL, **(headers or {})}
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    if path is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Audio file not found. It may have been deleted or never generated."
         )
-        
-        # Move the file to cache directory
-        original_path = os.path.join("./static/audio/", generated_filename)
-        cache_path = os.path.join(AUDIO_CACHE_DIR, filename)
-        
-        if os.path.exists(original_path) and original_path != cache_path:
-            os.rename(original_path, cache_path)
-        
+    media_type = audio.MEDIA_TYPES.get(path.rsplit(".", 1)[-1], "audio/mpeg")
+    if TTS_ACCEL_REDIRECT_PREFIX:
+        relpath = os.path.relpath(path, AUDIO_CACHE_DIR).replace(os.sep, "/")
+        headers["X-Accel-Redirect"] = TTS_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + relpath
+        return Response(media_type=media_type, headers=headers)
+    # Range requests (206) are handled by FileResponse
+    return AudioFileResponse(path=path, media_type=media_type, headers=headers,
+                             filename=os.path.basename(path), content_disposition_type="inline")
+
+
+def _flush_buffered_hits():
+    global _hit_flush_running
+    try:
+        with SessionLocal() as db:
+            flush_cache_hits(db)
+    except Exception as e:
+        logger.error(f"Flushing TTS cache hits failed: {e}")
+    finally:
+        with _hit_lock:
+            _hit_flush_running = False
+
+
+def record_cache_hit(cache_key: str):
+    """Counts a hit in memory; the index is updated in batches. A full
+    buffer is flushed in a thread when called from the event loop."""
+    global _hit_flush_running
+    with _hit_lock:
+        count, _ = _hit_buffer.get(cache_key, (0, None))
+        _hit_buffer[cache_key] = (count + 1, datetime.utcnow())
+        flush = len(_hit_buffer) >= TTS_CACHE_HIT_FLUSH and not _hit_flush_running
+        if flush:
+            _hit_flush_running = True
+    if not flush:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _flush_buffered_hits()
+    else:
+        loop.run_in_executor(None, _flush_buffered_hits)
+
+
+def flush_cache_hits(db: Session):
+    """Writes buffered hits to the index; indexes files it did not know about."""
+    global _hit_buffer
+    with _hit_lock:
+        hits, _hit_buffer = _hit_buffer, {}
+    for cache_key in crud.record_tts_cache_hits(db, hits):
+        index_cached_file(db, cache_key)
+
+
+def index_cached_file(db: Session, cache_key: str, voice_id: str = None):
+    path = get_cached_audio_path(cache_key) or get_cached_audio_path(cache_key, "ogg")
+    if path:
+        crud.register_tts_cache_entry(
+            db, cache_key, voice_id, os.path.relpath(path, AUDIO_CACHE_DIR), os.path.getsize(path))
+
+
+def remove_cached_file(relpath: str):
+    try:
+        os.remove(os.path.join(AUDIO_CACHE_DIR, relpath))
+    except FileNotFoundError:
+        pass
+    if audio_storage.remote:
+        audio_storage.delete(relpath)
+
+
+def enforce_tts_cache_budget(db: Session, max_bytes: int = None) -> dict:
+    """Evicts LRU (or LFU) entries until the cache is under its low watermark."""
+    flush_cache_hits(db)
+    max_bytes = max_bytes if max_bytes is not None else int(TTS_CACHE_MAX_MB * 1024 * 1024)
+    stats = crud.get_tts_cache_stats_row(db)
+    if stats.total_bytes <= max_bytes:
+        return {"evicted_files": 0, "freed_bytes": 0}
+    target = int(max_bytes * TTS_CACHE_LOW_WATERMARK)
+    evicted = freed = 0
+    while stats.total_bytes > target:
+        candidates = crud.tts_eviction_candidates(db, TTS_CACHE_EVICTION_POLICY)
+        if not candidates:
+            break
+        batch = []
+        excess = stats.total_bytes - target
+        for entry in candidates:
+            batch.append(entry)
+            excess -= entry.size_bytes or 0
+            if excess <= 0:
+                break
+        for entry in batch:
+            remove_cached_file(entry.path)
+        freed += crud.delete_tts_cache_entries(db, batch, evicted=True)
+        evicted += len(batch)
+    logger.info("Evicted %d TTS cache files (%d bytes) using %s",
+                evicted, freed, TTS_CACHE_EVICTION_POLICY)
+    return {"evicted_files": evicted, "freed_bytes": freed}
+
+
+def scheduled_tts_cache_eviction():
+    """Background eviction run by the scheduler."""
+    with SessionLocal() as db:
+        try:
+            enforce_tts_cache_budget(db)
+        except Exception as e:
+            logger.error(f"TTS cache eviction failed: {e}")
+
+
+def cache_lock_path(cache_key: str) -> str:
+    lock_dir = os.path.join(AUDIO_CACHE_DIR, ".locks")
+    os.makedirs(lock_dir, exist_ok=True)
+    return os.path.join(lock_dir, f"{cache_key}.lock")
+
+
+async def generate_and_cache_audio(text: str, voice_id: str, cache_key: str,
+                                   variant: AudioVariant = DEFAULT_VARIANT) -> str:
+    """Generate audio using AWS Polly and cache it.
+
+    A per-key file lock makes other workers wait for this synthesis instead
+    of calling Polly again; the audio is written under a temporary name and
+    renamed into place, so readers never see a partial file.
+    """
+    try:
+        relpath = cache_relpath(cache_key, variant.ext)
+        cache_path = os.path.join(AUDIO_CACHE_DIR, relpath)
+
+        async with AsyncFileLock(cache_lock_path(cache_key), timeout=TTS_LOCK_TIMEOUT):
+            # Another worker may have finished it while we waited for the lock
+            cached_path = await find_cached_audio(cache_key, variant.ext)
+            if cached_path:
+                return cached_path
+
+            # Use existing Polly function with a temporary filename
+            temp_filename = f"tts_{cache_key}.{uuid.uuid4().hex}.part"
+            original_path = os.path.join(ai_integration.AUDIO_DIR, temp_filename)
+            extra = {"sample_rate": variant.sample_rate} if variant.sample_rate else {}
+            try:
+                generated_filename = await synthesize_maori_audio_with_polly(
+                    maori_text=text,
+                    voice_id=voice_id,
+                    output_format=variant.output_format,
+                    filename_override=temp_filename,
+                    **extra
+                )
+                original_path = os.path.join(ai_integration.AUDIO_DIR, generated_filename)
+
+                # Atomically move the file into the cache directory
+                if os.path.exists(original_path):
+                    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                    os.replace(original_path, cache_path)
+                    await asyncio.to_thread(store_cached_file, cache_key, voice_id, relpath, cache_path)
+            finally:
+                if os.path.exists(original_path):
+                    os.remove(original_path)
+
         return cache_path
-        
+
     except Exception as e:
         logger.error(f"Failed to generate audio for text '{text}': {e}")
         raise HTTPException(
@@ -66,6 +384,73 @@ async def generate_and_cache_audio(text: str, voice_id: str, cache_key: str) ->
         )
 
 
+def _write_cache_file(cache_key: str, voice_id: str, data: bytes) -> str:
+    relpath = cache_relpath(cache_key)
+    cache_path = os.path.join(AUDIO_CACHE_DIR, relpath)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    temp_path = f"{cache_path}.{uuid.uuid4().hex}.part"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, cache_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    store_cached_file(cache_key, voice_id, relpath, cache_path)
+    return cache_path
+
+
+def _join_segment_files(paths) -> bytes:
+    parts = []
+    for path in paths:
+        with open(path, "rb") as f:
+            parts.append(f.read())
+    return audio.concat_mp3(parts)
+
+
+async def generate_joined_audio(segments, voice_id: str, cache_key: str,
+                                variant: AudioVariant = DEFAULT_VARIANT) -> str:
+    """Synthesizes the uncached segments in parallel and caches their
+    concatenation under the key of the whole text (MP3 variants only)."""
+    semaphore = asyncio.Semaphore(TTS_SEGMENT_CONCURRENCY)
+
+    async def segment_path(segment):
+        segment_key = generate_cache_key(segment, voice_id, variant)
+        path = await find_cached_audio(segment_key)
+        if path:
+            record_cache_hit(segment_key)
+            return path
+        async with semaphore:
+            return await tts_inflight.do(
+                segment_key, generate_and_cache_audio, segment, voice_id, segment_key, variant)
+
+    paths = await asyncio.gather(*(segment_path(s) for s in segments))
+    try:
+        data = await asyncio.to_thread(_join_segment_files, paths)
+        return await asyncio.to_thread(_write_cache_file, cache_key, voice_id, data)
+    except Exception as e:
+        logger.error(f"Failed to join {len(segments)} audio segments: {e}")
+        raise HTTPException(status_code=500, detail=f"Audio generation failed: {str(e)}")
+
+
+async def ensure_cached_audio(text: str, voice_id: str = "Aria", cache_key: str = None,
+                              variant: AudioVariant = DEFAULT_VARIANT) -> str:
+    """Path of the cached audio for text, synthesizing whatever is missing.
+
+    Multi-sentence texts are built from per-sentence cache entries, so
+    texts sharing sentences only pay Polly for the new ones. Ogg streams
+    cannot be joined frame by frame, so Ogg texts are synthesized whole.
+    """
+    cache_key = cache_key or generate_cache_key(text, voice_id, variant)
+    cached_path = await find_cached_audio(cache_key, variant.ext)
+    if cached_path:
+        return cached_path
+    segments = audio.split_segments(text, TTS_SEGMENT_MAX_CHARS)
+    if len(segments) <= 1 or variant.output_format != "mp3":
+        return await tts_inflight.do(cache_key, generate_and_cache_audio, text, voice_id, cache_key, variant)
+    return await tts_inflight.do(cache_key, generate_joined_audio, segments, voice_id, cache_key, variant)
+
+
 @router.get("/tts",
            response_model=schemas.TTSResponse,
            summary="Text-to-Speech for Māori",
@@ -79,9 +464,14 @@ async def generate_and_cache_audio(text: str, voice_id: str, cache_key: str) ->
            - **Open access - no authentication required**
            
            **Parameters:**
-           - `text`: The Māori text to convert to speech (max 500 characters)
+           - `text`: The Māori text to convert to speech (long texts are split into sentences)
            - `voice_id`: AWS Polly voice ID (default: "Aria")
-           - `format`: Output format (default: "mp3")
+           - `format`: `mp3` or `ogg_vorbis`; otherwise chosen from the `Accept` header (default: mp3)
+           - `sample_rate`: 8000, 16000, 22050 or 24000 Hz (`Save-Data: on` defaults to 16000)
+
+           When the requested variant is not cached yet but another one the
+           client accepts is, that one is returned instead of calling Polly;
+           `output_format` and `sample_rate` in the response say which it is.
            
            **Example:**
            ```
@@ -89,9 +479,12 @@ async def generate_and_cache_audio(text: str, voice_id: str, cache_key: str) ->
            ```
            """)
 async def text_to_speech(
-    text: str = Query(..., description="Māori text to convert to speech", max_length=500),
+    text: str = Query(..., description="Māori text to convert to speech", max_length=TTS_MAX_TEXT_LENGTH),
     voice_id: str = Query("Aria", description="AWS Polly voice ID"),
-    format: str = Query("mp3", description="Audio format (mp3)")
+    format: Annotated[Optional[str], Query(description="Audio format (mp3 or ogg_vorbis)")] = None,
+    sample_rate: Annotated[Optional[int], Query(description="Sample rate in Hz")] = None,
+    accept: Annotated[Optional[str], Header(include_in_schema=False)] = None,
+    save_data: Annotated[Optional[str], Header(include_in_schema=False)] = None
 ):
     """
     Convert Māori text to speech using AWS Polly with caching.
@@ -105,18 +498,34 @@ async def text_to_speech(
         raise HTTPException(status_code=400, detail="Text parameter is required")
     
     text = text.strip()
-    if len(text) > 500:
-        raise HTTPException(status_code=400, detail="Text too long (max 500 characters)")
+    if len(text) > TTS_MAX_TEXT_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Text too long (max {TTS_MAX_TEXT_LENGTH} characters)")
+
+    try:
+        variant = audio.negotiate_variant(format, sample_rate, accept, (save_data or "").lower() == "on")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if variant.output_format != "mp3" and len(text) > POLLY_MAX_TEXT_LENGTH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Text too long for {variant.output_format} (max {POLLY_MAX_TEXT_LENGTH} characters); use mp3"
+        )
     
     # Generate cache key
-    cache_key = generate_cache_key(text, voice_id)
+    cache_key = generate_cache_key(text, voice_id, variant)
     
-    # Check if audio is already cached
-    cached_path = get_cached_audio_path(cache_key)
+    # Check if audio is already cached, in this variant or one the client also accepts
+    cached_path = await locate_cached_audio(cache_key, variant.ext)
+    if not cached_path:
+        # An explicit format pins the format; only the rate may differ then
+        found = await find_cached_variant(text, voice_id, variant, None if format else accept)
+        if found:
+            variant, cache_key, cached_path = found
     
     if cached_path:
         # Return cached audio
-        audio_url = f"/static/audio/tts_cache/tts_{cache_key}.mp3"
+        record_cache_hit(cache_key)
+        audio_url = cache_audio_url(cache_key, cached_path)
         logger.info(f"Returning cached audio for text: '{text[:50]}...'")
         
         return schemas.TTSResponse(
@@ -124,22 +533,26 @@ async def text_to_speech(
             text=text,
             voice_id=voice_id,
             cached=True,
-            message="Audio retrieved from cache"
+            message="Audio retrieved from cache",
+            output_format=variant.output_format,
+            sample_rate=variant.sample_rate or audio.DEFAULT_SAMPLE_RATE
         )
     else:
         # Generate new audio
         logger.info(f"Generating new audio for text: '{text[:50]}...'")
         
         try:
-            audio_path = await generate_and_cache_audio(text, voice_id, cache_key)
-            audio_url = f"/static/audio/tts_cache/tts_{cache_key}.mp3"
+            audio_path = await ensure_cached_audio(text, voice_id, cache_key, variant)
+            audio_url = cache_audio_url(cache_key, audio_path)
             
             return schemas.TTSResponse(
                 audio_url=audio_url,
                 text=text,
                 voice_id=voice_id,
                 cached=False,
-                message="Audio generated and cached successfully"
+                message="Audio generated and cached successfully",
+                output_format=variant.output_format,
+                sample_rate=variant.sample_rate or audio.DEFAULT_SAMPLE_RATE
             )
             
         except Exception as e:
@@ -150,36 +563,308 @@ async def text_to_speech(
             )
 
 
+def _publish_streamed_file(cache_key: str, voice_id: str, part_path: str):
+    relpath = cache_relpath(cache_key)
+    cache_path = os.path.join(AUDIO_CACHE_DIR, relpath)
+    # Another request may have cached the same audio in the meantime
+    if get_cached_audio_path(cache_key):
+        return
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    os.replace(part_path, cache_path)
+    store_cached_file(cache_key, voice_id, relpath, cache_path)
+
+
+def _discard_file(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+async def stream_and_cache_audio(chunks, first_chunk: bytes, voice_id: str, cache_key: str):
+    """Relays Polly's audio to the client and tees it into the cache.
+
+    The file only enters the cache once the stream completed; if the stream
+    is closed early or Polly fails midway, the partial file is discarded. Disk
+    writes and the index commit run in threads, off the event loop.
+    """
+    part_path = os.path.join(ai_integration.AUDIO_DIR, f"tts_{cache_key}.{uuid.uuid4().hex}.part")
+    try:
+        f = await asyncio.to_thread(open, part_path, "wb")
+        try:
+            await asyncio.to_thread(f.write, first_chunk)
+            yield first_chunk
+            async for chunk in chunks:
+                await asyncio.to_thread(f.write, chunk)
+                yield chunk
+        finally:
+            await asyncio.to_thread(f.close)
+        await asyncio.to_thread(_publish_streamed_file, cache_key, voice_id, part_path)
+    finally:
+        await chunks.aclose()
+        await asyncio.to_thread(_discard_file, part_path)
+
+
+async def relay_to_cache(text: str, voice_id: str, cache_key: str, queue: asyncio.Queue) -> str:
+    """The in-flight call for a streamed miss: streams Polly's audio into
+    the cache and hands each chunk to the streaming response through queue.
+
+    It runs as the shared task of tts_inflight, so concurrent requests for
+    the key wait for it instead of calling Polly again, and it finishes
+    caching even if the streaming client disconnects. A failure is put on
+    the queue, then raised to the waiting requests.
+    """
+    try:
+        chunks = stream_maori_audio_with_polly(text, voice_id=voice_id, output_format="mp3")
+        try:
+            first_chunk = await chunks.__anext__()
+        except BaseException:
+            await chunks.aclose()
+            raise
+        async for chunk in stream_and_cache_audio(chunks, first_chunk, voice_id, cache_key):
+            queue.put_nowait(chunk)
+    except BaseException as e:
+        queue.put_nowait(e)
+        raise
+    queue.put_nowait(None)
+    return await asyncio.to_thread(get_cached_audio_path, cache_key)
+
+
+async def drain_relay(first_chunk: bytes, queue: asyncio.Queue):
+    yield first_chunk
+    while (chunk := await queue.get()) is not None:
+        if isinstance(chunk, BaseException):
+            raise chunk
+        yield chunk
+
+
+@router.get("/tts/stream",
+           summary="Streaming Text-to-Speech for Māori",
+           description="""
+           Like `/tts/tts`, but returns the audio itself as `audio/mpeg`.
+
+           On a cache miss the audio is streamed to the client while Polly
+           is still producing it, and cached for later requests. The
+           `X-TTS-Cache` header says whether it was a `HIT` or a `MISS`.
+           """)
+async def text_to_speech_stream(
+    request: Request,
+    text: str = Query(..., description="Māori text to convert to speech", max_length=TTS_MAX_TEXT_LENGTH),
+    voice_id: str = Query("Aria", description="AWS Polly voice ID")
+):
+    if not text or not text.strip():
+        raise HTTPException(status_code=400, detail="Text parameter is required")
+    text = text.strip()
+
+    cache_key = generate_cache_key(text, voice_id)
+    cached_path = await locate_cached_audio(cache_key)
+    if cached_path:
+        record_cache_hit(cache_key)
+        return cached_audio_response(request, cache_key, cached_path, {"X-TTS-Cache": "HIT"})
+
+    if len(audio.split_segments(text, TTS_SEGMENT_MAX_CHARS)) > 1:
+        # Built from cached sentences; only single segments are streamed live
+        try:
+            audio_path = await ensure_cached_audio(text, voice_id, cache_key)
+        except Exception as e:
+            logger.error(f"TTS generation failed: {e}")
+            raise HTTPException(
+                status_code=500,
+                detail="Failed to generate audio. Please try again later."
+            )
+        return cached_audio_response(request, cache_key, audio_path, {"X-TTS-Cache": "MISS"})
+
+    queue = asyncio.Queue()
+    if tts_inflight.lead(cache_key, relay_to_cache, text, voice_id, cache_key, queue) is None:
+        # Already being synthesized (streamed or not): wait for that instead
+        try:
+            audio_path = await ensure_cached_audio(text, voice_id, cache_key)
+        except Exception as e:
+            logger.error(f"TTS generation failed: {e}")
+            raise HTTPException(
+                status_code=500,
+                detail="Failed to generate audio. Please try again later."
+            )
+        return cached_audio_response(request, cache_key, audio_path, {"X-TTS-Cache": "MISS"})
+
+    logger.info(f"Streaming new audio for text: '{text[:50]}...'")
+    # Wait for the first bytes so a Polly failure is still a proper 500
+    first_chunk = await queue.get()
+    if isinstance(first_chunk, BaseException):
+        logger.error(f"TTS streaming failed: {first_chunk}")
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to generate audio. Please try again later."
+        )
+
+    return StreamingResponse(
+        drain_relay(first_chunk, queue),
+        media_type="audio/mpeg",
+        headers={"X-TTS-Cache": "MISS"},
+    )
+
+
+def _batch_cached_paths(keys, indexed: dict) -> dict:
+    """{cache_key: path} of the keys whose audio exists. Index rows are
+    trusted for shared storage; locally the file must still be on disk, and
+    files cached before the index existed still count."""
+    paths = {}
+    for key in keys:
+        entry = indexed.get(key)
+        if entry and audio_storage.remote:
+            paths[key] = os.path.join(AUDIO_CACHE_DIR, entry.path)
+            continue
+        path = get_cached_audio_path(key)
+        if path:
+            paths[key] = path
+    return paths
+
+
+def _build_sprite(keys, sprite_key: str, voice_id: str):
+    """Joins the items' audio into one cached MP3; returns (path, [(start, duration)])."""
+    parts = []
+    for key in keys:
+        path = fetch_cached_audio(key)
+        if path is None:
+            raise FileNotFoundError(f"Cached audio {key} disappeared")
+        with open(path, "rb") as f:
+            parts.append(audio.mp3_frames(f.read()))
+    offsets, start = [], 0.0
+    for part in parts:
+        duration = audio.mp3_duration(part)
+        offsets.append((round(start, 3), round(duration, 3)))
+        start += duration
+    sprite_path = fetch_cached_audio(sprite_key)
+    if not sprite_path:
+        sprite_path = _write_cache_file(sprite_key, voice_id, b"".join(parts))
+    return sprite_path, offsets
+
+
+@router.post("/batch",
+            response_model=schemas.TTSBatchResponse,
+            summary="Text-to-Speech for a list of texts",
+            description="""
+            Returns audio URLs for up to 50 texts in one call (e.g. all cards of
+            a lesson). Cached audio is looked up in one index query and misses
+            are synthesized concurrently. Items that fail carry an `error`.
+
+            With `sprite: true` the audio is also joined into one MP3
+            (`sprite_url`), and each item gets its `start` and `duration` in
+            seconds within it.
+            """)
+async def text_to_speech_batch(
+    batch: schemas.TTSBatchRequest,
+    db: Session = Depends(get_db)
+):
+    voice_id = batch.voice_id or "Aria"
+    texts = [t.strip() for t in batch.texts]
+    for text in texts:
+        if not text:
+            raise HTTPException(status_code=400, detail="Texts must not be empty")
+        if len(text) > TTS_MAX_TEXT_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Text too long (max {TTS_MAX_TEXT_LENGTH} characters)")
+
+    keys = [generate_cache_key(text, voice_id) for text in texts]
+    unique = dict(zip(keys, texts))
+    indexed = crud.get_tts_cache_entries(db, unique)
+    db.commit()  # release the pooled connection while Polly works
+
+    paths, cached, errors = {}, {}, {}
+    for key, path in (await asyncio.to_thread(_batch_cached_paths, unique, indexed)).items():
+        paths[key], cached[key] = path, True
+        record_cache_hit(key)
+
+    semaphore = asyncio.Semaphore(TTS_BATCH_CONCURRENCY)
+
+    async def synthesize(key):
+        async with semaphore:
+            try:
+                paths[key] = await ensure_cached_audio(unique[key], voice_id, key)
+                cached[key] = False
+            except Exception as e:
+                logger.error(f"Batch TTS failed for '{unique[key][:50]}': {e}")
+                errors[key] = "Failed to generate audio"
+
+    await asyncio.gather(*(synthesize(key) for key in unique if key not in paths))
+
+    items = [
+        schemas.TTSBatchItem(
+            text=text,
+            audio_url=cache_audio_url(key, paths[key]) if key in paths else None,
+            cached=cached.get(key, False),
+            error=errors.get(key),
+        )
+        for text, key in zip(texts, keys)
+    ]
+
+    sprite_url = None
+    if batch.sprite:
+        ready = [(item, key) for item, key in zip(items, keys) if key in paths]
+        if ready:
+            sprite_key = hashlib.md5("|".join(key for _, key in ready).encode()).hexdigest()
+            try:
+                sprite_path, offsets = await asyncio.to_thread(
+                    _build_sprite, [key for _, key in ready], sprite_key, voice_id)
+            except Exception as e:
+                logger.error(f"Failed to build TTS sprite: {e}")
+                raise HTTPException(status_code=500, detail="Failed to build audio sprite")
+            sprite_url = cache_audio_url(sprite_key, sprite_path)
+            for (item, _), (start, duration) in zip(ready, offsets):
+                item.start, item.duration = start, duration
+
+    return schemas.TTSBatchResponse(items=items, voice_id=voice_id, sprite_url=sprite_url)
+
+
 @router.get("/tts/audio/{cache_key}",
            summary="Direct audio file access",
            description="Direct access to cached audio files by cache key")
 async def get_audio_file(
-    cache_key: str
+    request: Request,
+    cache_key: str = Path(..., pattern=CACHE_KEY_PATTERN, description="Cache key from /tts/tts"),
+    format: Annotated[Optional[str], Query(
+        description="Format of a recording: mp3 or ogg_vorbis; chosen from Accept when omitted")] = None,
+    accept: Annotated[Optional[str], Header(include_in_schema=False)] = None,
 ):
     """
     Direct access to cached audio files.
-    This endpoint allows direct download/streaming of cached audio files.
+    This endpoint allows direct download/streaming of cached audio files,
+    including Range requests for seeking. Revalidation with If-None-Match
+    is answered with 304 without touching the disk. Only downloads of files
+    that exist count as cache hits; recordings are not part of the cache.
+
+    A TTS key names one format already. A recording key has an MP3 and,
+    when ffmpeg encoded it, an Ogg Vorbis version, negotiated like /tts/tts.
     """
-    
-    cached_path = get_cached_audio_path(cache_key)
-    
-    if not cached_path:
-        raise HTTPException(
-            status_code=404,
-            detail="Audio file not found. It may have been deleted or never generated."
-        )
-    
-    return FileResponse(
-        path=cached_path,
-        media_type="audio/mpeg",
-        filename=f"tts_{cache_key}.mp3"
-    )
+    try:
+        variant = audio.negotiate_variant(format, None, accept)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not audio_storage.remote and variant.ext == "mp3" and etag_matches(request, f'"{cache_key}"'):
+        return cached_audio_response(request, cache_key, None)
+    path = await locate_cached_audio(cache_key) or await locate_cached_audio(cache_key, "ogg")
+    if path:
+        record_cache_hit(cache_key)
+        return cached_audio_response(request, cache_key, path)
+    path = await locate_recording(cache_key, variant.ext)
+    ext = path.rsplit(".", 1)[-1] if path else "mp3"
+    return cached_audio_response(request, cache_key, path, {"Vary": "Accept"},
+                                 etag=cache_key if ext == "mp3" else f"{cache_key}.{ext}")
+
+
+def iter_cache_files():
+    """Yields (cache_key, path) for every cached file, sharded or legacy."""
+    for root, dirs, files in os.walk(AUDIO_CACHE_DIR):
+        if root == AUDIO_CACHE_DIR:
+            dirs[:] = [d for d in dirs if d != "recordings"]
+        for filename in files:
+            name, ext = os.path.splitext(filename)
+            if name.startswith("tts_") and ext[1:] in audio.MEDIA_TYPES:
+                yield name[len("tts_"):], os.path.join(root, filename)
 
 
 @router.delete("/tts/cache",
               summary="Clear TTS cache",
               description="Clear all cached TTS audio files. Admin access required.")
 async def clear_tts_cache(
+    db: Session = Depends(get_db),
     current_user=Depends(auth.require_admin)
 ):
     """
@@ -191,11 +876,16 @@ async def clear_tts_cache(
         deleted_count = 0
         
         if os.path.exists(AUDIO_CACHE_DIR):
-            for filename in os.listdir(AUDIO_CACHE_DIR):
-                if filename.startswith("tts_") and filename.endswith(".mp3"):
-                    file_path = os.path.join(AUDIO_CACHE_DIR, filename)
-                    os.remove(file_path)
-                    deleted_count += 1
+            for _cache_key, file_path in list(iter_cache_files()):
+                os.remove(file_path)
+                deleted_count += 1
+        if audio_storage.remote:
+            # Shared copies are found through the index, so remove them first
+            for entry in crud.tts_eviction_candidates(db, limit=None):
+                audio_storage.delete(entry.path)
+        with _hit_lock:
+            _hit_buffer.clear()
+        crud.clear_tts_cache_index(db)
         
         logger.info(f"Cleared TTS cache: {deleted_count} files deleted")
         
@@ -212,34 +902,61 @@ async def clear_tts_cache(
         )
 
 
+@router.post("/tts/cache/evict",
+            summary="Evict TTS cache entries",
+            description="Trim the TTS cache to its size budget now. Admin access required.")
+async def evict_tts_cache(
+    max_mb: Optional[float] = Query(None, gt=0, description="Budget to enforce instead of TTS_CACHE_MAX_MB"),
+    db: Session = Depends(get_db),
+    current_user=Depends(auth.require_admin)
+):
+    max_bytes = int(max_mb * 1024 * 1024) if max_mb is not None else None
+    return enforce_tts_cache_budget(db, max_bytes)
+
+
+@router.post("/tts/cache/reindex",
+            summary="Rebuild TTS cache index",
+            description="Rebuild the cache index from the files on disk. Admin access required.")
+async def reindex_tts_cache(
+    db: Session = Depends(get_db),
+    current_user=Depends(auth.require_admin)
+):
+    """Needed once for caches created before the index existed."""
+    flush_cache_hits(db)
+    crud.clear_tts_cache_index(db)
+    indexed = 0
+    for cache_key, path in iter_cache_files():
+        crud.register_tts_cache_entry(
+            db, cache_key, None, os.path.relpath(path, AUDIO_CACHE_DIR), os.path.getsize(path))
+        indexed += 1
+    return {"indexed_files": indexed}
+
+
 @router.get("/tts/cache/info",
            summary="TTS cache information",
            description="Get information about the TTS cache")
-async def get_cache_info():
+async def get_cache_info(db: Session = Depends(get_db)):
     """
     Get information about the current TTS cache.
-    Returns cache size, number of files, etc.
+    Returns cache size, number of files, etc. Read from the index totals,
+    so it does not scan the cache directory.
     """
     
     try:
-        total_files = 0
-        total_size = 0
-        
-        if os.path.exists(AUDIO_CACHE_DIR):
-            for filename in os.listdir(AUDIO_CACHE_DIR):
-                if filename.startswith("tts_") and filename.endswith(".mp3"):
-                    file_path = os.path.join(AUDIO_CACHE_DIR, filename)
-                    if os.path.exists(file_path):
-                        total_files += 1
-                        total_size += os.path.getsize(file_path)
-        
-        # Convert bytes to MB
-        total_size_mb = round(total_size / (1024 * 1024), 2)
+        stats = crud.get_tts_cache_stats_row(db)
+        with _hit_lock:
+            pending_hits = sum(count for count, _ in _hit_buffer.values())
         
         return {
             "cache_directory": AUDIO_CACHE_DIR,
-            "total_cached_files": total_files,
-            "total_cache_size_mb": total_size_mb,
+            "total_cached_files": stats.total_files,
+            "total_cache_size_mb": round(stats.total_bytes / (1024 * 1024), 2),
+            "max_cache_size_mb": TTS_CACHE_MAX_MB,
+            "eviction_policy": TTS_CACHE_EVICTION_POLICY,
+            "total_hits": stats.total_hits + pending_hits,
+            "evicted_files": stats.evicted_files,
+            "evicted_size_mb": round(stats.evicted_bytes / (1024 * 1024), 2),
+            "last_eviction_at": stats.last_eviction_at,
             "cache_enabled": True
         }
         
@@ -248,4 +965,4 @@ async def get_cache_info():
         raise HTTPException(
             status_code=500,
             detail="Failed to retrieve cache information"
-        ) 
\ No newline at end of file
+        )
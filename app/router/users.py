@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from app import auth, crud, models, schemas
+from app import auth, crud, hashing, models, schemas
 from app.database import get_db
 
 import logging
@@ -22,13 +22,14 @@ def list_users(db: Session = Depends(get_db), current_user=Depends(auth.require_
 @router.post("/register", response_model=schemas.UserOut,
              summary="Register a new user",
              description="Creates a new user account with the specified email and password.")
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
     """Register a new user."""
     db_user = auth.get_user_by_email(db, user.email)
     if db_user:
         logger.warning("Email already registered for: %s", db_user)
         raise HTTPException(status_code=400, detail="Email already registered")
-    hashed_pw = auth.get_password_hash(user.password)
+    db.commit()  # release the pooled connection while bcrypt runs
+    hashed_pw = await hashing.hash_password(user.password)
     new_user = models.User(email=user.email, hashed_password=hashed_pw)
     db.add(new_user)
     db.commit()
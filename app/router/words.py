@@ -5,11 +5,14 @@ from app.utils import (
     sanitize_level,
 )
 from app.database import get_db
-from app.ai_integration import synthesize_maori_audio_with_polly
-from app import ai_integration, auth, crud, models, schemas
+from app import ai_integration, auth, crud, jobs, models, recordings, schemas
+from app.singleflight import cross_worker_lock
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Request
 from typing import List
+import asyncio
+import httpx
 import os
 import logging
 
@@ -77,6 +80,17 @@ def word_of_the_day(
     return word
 
 
+def queue_word_audio(db: Session, words, created_by: int = None):
+    """Pre-generate audio for the words' translations and examples in the background."""
+    try:
+        return jobs.enqueue_tts_prewarm(
+            db, [t for w in words for t in (w.translation, w.example)], created_by=created_by)
+    except Exception as e:
+        db.rollback()
+        logger.error("Failed to queue audio for new words: %s", e)
+        return None
+
+
 @router.post("/add", response_model=schemas.WordOut,
              summary="Add a new word",
              description="Creates a new word entry. Uses AI to generate translation and details. Admin access required.")
@@ -90,31 +104,61 @@ async def add_word(
     if crud.get_word_by_normalized(db, normalized):
         logger.warning("Text already exists for input: %s", normalized)
         raise HTTPException(status_code=400, detail="Text already exists")
-    result = await ai_integration.get_translation(word.text)
-    raw_ai_text = extract_ai_text(result)
-    if not raw_ai_text:
-        logger.warning(
-            "AI did not return a usable response for: %s", raw_ai_text)
-        raise HTTPException(
-            status_code=502, detail="AI did not return a usable response."
-        )
-    try:
-        ai_data = extract_json_from_markdown(raw_ai_text)
-        logger.debug("Raw AI data for '%s': %s", word.text, ai_data)
-        ai_data = sanitize_ai_data(ai_data)
-        logger.debug("Sanitized AI data for '%s': %s", word.text, ai_data)
-    except Exception:
-        logger.error("Failed to parse AI response: %s", ai_data)
-        raise HTTPException(
-            status_code=502, detail="Failed to parse AI response.")
-    ai_data["level"] = sanitize_level(ai_data.get("level"))
+    async with cross_worker_lock(db, "word", normalized) as locked:
+        # Another admin may have added the word while we waited for the lock
+        if locked and crud.get_word_by_normalized(db, normalized):
+            logger.warning("Text already exists for input: %s", normalized)
+            raise HTTPException(status_code=400, detail="Text already exists")
+        # Don't keep a pooled connection checked out while Gemini works
+        db.commit()
+        try:
+            with ai_integration.call_budget(ai_integration.GEMINI_INTERACTIVE_DEADLINE, hedge=True):
+                result = await ai_integration.get_translation(word.text)
+        except httpx.ReadTimeout:
+            logger.error("Gemini API timed out translating: %s", word.text)
+            raise HTTPException(
+                status_code=504, detail="AI service timed out, please try again later.")
+        except ai_integration.GeminiRequestError as e:
+            logger.error("Gemini API rejected translation of %s: %s", word.text, e)
+            raise HTTPException(
+                status_code=502, detail="AI did not return a usable response.")
+        raw_ai_text = extract_ai_text(result)
+        if not raw_ai_text:
+            logger.warning(
+                "AI did not return a usable response for: %s", raw_ai_text)
+            raise HTTPException(
+                status_code=502, detail="AI did not return a usable response."
+            )
+        try:
+            ai_data = extract_json_from_markdown(raw_ai_text)
+            logger.debug("Raw AI data for '%s': %s", word.text, ai_data)
+            ai_data = sanitize_ai_data(ai_data)
+            logger.debug("Sanitized AI data for '%s': %s", word.text, ai_data)
+        except Exception:
+            logger.error("Failed to parse AI response: %s", raw_ai_text)
+            raise HTTPException(
+                status_code=502, detail="Failed to parse AI response.")
+        ai_data["level"] = sanitize_level(ai_data.get("level"))
 
-    # Step 1: Create word without audio_url to get its ID
-    db_word = crud.create_word(
-        db, word.text, ai_data, ai_data["level"])
+        # Another request may have added the word during the AI call; the
+        # unique index on normalized catches the rest
+        if crud.get_word_by_normalized(db, normalized):
+            logger.warning("Text already exists for input: %s", normalized)
+            raise HTTPException(status_code=400, detail="Text already exists")
+
+        # Step 1: Create word without audio_url to get its ID
+        try:
+            db_word = crud.create_word(
+                db, word.text, ai_data, ai_data["level"])
+        except IntegrityError:
+            # A concurrent request (sharing our AI call) inserted it first
+            db.rollback()
+            logger.warning("Text already exists for input: %s", normalized)
+            raise HTTPException(status_code=400, detail="Text already exists")
     db.refresh(db_word)  # Get the generated id from DB
     logger.info("Created word '%s' with IPA: '%s', phonetic: '%s'",
                 word.text, db_word.ipa, db_word.phonetic)
+    queue_word_audio(db, [db_word], created_by=current_user.id)
     return db_word
 
 
@@ -128,13 +172,8 @@ async def generate_word_audio_polly(
 ):
     """Generate Polly audio for a word (admin only)."""
     word = db.query(models.Word).filter_by(id=word_id).first()
-    normalized = word.text.strip().lower()
-    if crud.get_word_by_normalized(db, normalized):
-        logger.warning("Translation already exists for: %s", normalized)
-        raise HTTPException(
-            status_code=400, detail="Translation already exists")
     if not word:
-        logger.warning("Word not found for: %s", normalized)
+        logger.warning("Word not found for id: %s", word_id)
         raise HTTPException(status_code=404, detail="Word not found.")
     maori_text = word.translation
     if not maori_text:
@@ -143,9 +182,14 @@ async def generate_word_audio_polly(
         raise HTTPException(
             status_code=400, detail="No translation available for this word."
         )
+    from app.router import tts
+
+    cache_key = tts.generate_cache_key(maori_text)
     try:
-        filename = synthesize_maori_audio_with_polly(maori_text)
-        word.audio_url = f"/static/audio/{filename}"
+        if not tts.get_cached_audio_path(cache_key):
+            db.commit()  # release the pooled connection while Polly works
+            await tts.ensure_cached_audio(maori_text, "Aria", cache_key)
+        word.audio_cache_key = cache_key
         db.commit()
         return {
             "audio_url": word.audio_url,
@@ -158,15 +202,115 @@ async def generate_word_audio_polly(
         )
 
 
+RECORDING_TARGETS = {"translation": "audio_recording_key", "example": "example_recording_key"}
+
+
+@router.put("/words/{word_id}/recording",
+            tags=["Words"],
+            summary="Upload a native-speaker recording",
+            description="""
+            Upload a recording of the word's translation (or, with `target=example`,
+            of its example sentence) as the raw request body, e.g.
+            `curl -T kupu.wav -H "Content-Type: audio/wav" .../recording`. Chunked
+            uploads are fine; the body is streamed to disk, then silence-trimmed,
+            loudness-normalized and encoded in the background process pool.
+            The recording replaces the Polly audio in `audio_url`. Admin access required.
+            """)
+async def upload_word_recording(
+    word_id: int,
+    request: Request,
+    target: str = Query("translation", pattern="^(translation|example)$"),
+    db: Session = Depends(get_db),
+    current_user=Depends(auth.require_admin),
+):
+    """Store a recording for a word (admin only)."""
+    word = db.query(models.Word).filter_by(id=word_id).first()
+    if not word:
+        raise HTTPException(status_code=404, detail="Word not found.")
+    max_bytes = int(recordings.RECORDING_MAX_MB * 1024 * 1024)
+    if int(request.headers.get("content-length") or 0) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Recording too large (max {recordings.RECORDING_MAX_MB:g} MB)")
+    db.commit()  # release the pooled connection during upload and transcoding
+
+    try:
+        upload_path, digest = await recordings.receive_upload(request.stream(), max_bytes)
+    except recordings.RecordingTooLarge:
+        raise HTTPException(status_code=413, detail=f"Recording too large (max {recordings.RECORDING_MAX_MB:g} MB)")
+    except recordings.RecordingError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        recording_key, formats = await recordings.store_recording(upload_path, digest)
+    except recordings.RecordingError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except Exception as e:
+        logger.error("Storing recording for word %s failed: %s", word_id, e)
+        raise HTTPException(status_code=500, detail="Failed to process the recording.")
+    finally:
+        os.remove(upload_path)
+
+    replaced = getattr(word, RECORDING_TARGETS[target])
+    setattr(word, RECORDING_TARGETS[target], recording_key)
+    db.commit()
+    if replaced and replaced != recording_key and not crud.recording_in_use(db, replaced):
+        await asyncio.to_thread(recordings.delete_recording, replaced)
+    return {
+        "audio_url": word.audio_url if target == "translation" else word.example_audio_url,
+        "formats": formats,
+    }
+
+
+@router.delete("/words/{word_id}/recording",
+               tags=["Words"],
+               summary="Remove a word's recording",
+               description="Unlinks the recording so the word falls back to Polly audio, and deletes its files once no word uses it. Admin access required.")
+def delete_word_recording(
+    word_id: int,
+    target: str = Query("translation", pattern="^(translation|example)$"),
+    db: Session = Depends(get_db),
+    current_user=Depends(auth.require_admin),
+):
+    word = db.query(models.Word).filter_by(id=word_id).first()
+    if not word:
+        raise HTTPException(status_code=404, detail="Word not found.")
+    recording_key = getattr(word, RECORDING_TARGETS[target])
+    setattr(word, RECORDING_TARGETS[target], None)
+    db.commit()
+    # Identical uploads share a key, so other words may still play it
+    if recording_key and not crud.recording_in_use(db, recording_key):
+        recordings.delete_recording(recording_key)
+    return {"audio_url": word.audio_url if target == "translation" else word.example_audio_url}
+
+
+@router.post("/audio/prewarm", response_model=schemas.JobOut, status_code=202,
+             tags=["Words"],
+             summary="Pre-generate audio for words without it",
+             description="Queues a background job that generates audio for words whose translation or example has none yet. Admin access required.")
+async def prewarm_word_audio(
+    limit: int = 1000,
+    db: Session = Depends(get_db),
+    current_user=Depends(auth.require_admin),
+):
+    """Backfill word audio (admin only)."""
+    job = queue_word_audio(db, crud.words_missing_audio(db, limit), created_by=current_user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No word audio to generate.")
+    return jobs.job_to_schema(job)
+
+
 @router.post(
     "/batch_add",
     response_model=schemas.BatchWordResult,
     tags=["Words"],
+    deprecated=True,
     description="""
+                    **Deprecated:** use `/batch_add/job`, which runs in the background and
+                    survives restarts. This route waits for the AI inside the request.
+
                     **Note:**  
                     - The recommended batch size is 5–10 words at a time.  
                     - The maximum allowed is 15 words per batch to be safe.  
-                    - Words that already exist will be skipped and reported in the result."""
+                    - Words that already exist will be skipped and reported in the result.  
+                    - Words that could not be translated or stored are reported as failed."""
 )
 async def batch_add_words(
     batch: schemas.BatchWordCreate,
@@ -175,50 +319,79 @@ async def batch_add_words(
 ):
     added = []
     skipped = []
+    failed = []
+    to_translate = []
+    seen = set()
     for text in batch.texts:
         normalized = text.strip().lower()
-        if crud.get_word_by_normalized(db, normalized):
+        if normalized in seen or crud.get_word_by_normalized(db, normalized):
             skipped.append(text)
             logger.info("Skipped (exists): %s", text)
             continue
+        seen.add(normalized)
+        to_translate.append(text)
+
+    # One Gemini call covers the whole batch; only words that fail to parse are retried
+    translations = {}
+    if to_translate:
+        db.commit()  # release the pooled connection during the AI call
+        translations = await ai_integration.get_translations_batch(to_translate)
+
+    for text in to_translate:
+        ai_data = translations.get(text)
+        if not ai_data:
+            logger.warning("AI did not return usable response for: %s", text)
+            failed.append(text)
+            continue
         try:
-            result = await ai_integration.get_translation(text)
-            raw_ai_text = extract_ai_text(result)
-            if not raw_ai_text:
-                logger.warning(
-                    "AI did not return usable response for: %s", text)
-                skipped.append(text)
-                continue
-            ai_data = extract_json_from_markdown(raw_ai_text)
-            logger.debug("Raw AI data for '%s': %s", text, ai_data)
-            ai_data = sanitize_ai_data(ai_data)
-            logger.debug("Sanitized AI data for '%s': %s", text, ai_data)
-            ai_data["level"] = sanitize_level(ai_data.get("level"))
             db_word = crud.create_word(
                 db, text, ai_data, ai_data["level"])
             db.refresh(db_word)
             logger.info("Created word '%s' with IPA: '%s', phonetic: '%s'",
                         text, db_word.ipa, db_word.phonetic)
             added.append(db_word)
-            '''
-            # Optional: Generate audio
-            try:
-                filename = await ai_integration.synthesize_maori_audio_with_polly(
-                    ai_data.get("translation", ""),
-                    filename_override=f"{db_word.id}.mp3",
-                )
-                db_word.audio_url = f"/static/audio/{filename}"
-                db.commit()
-                db.refresh(db_word)
-            except Exception as e:
-                logger.warning("Audio failed for word '%s': %s", text, e)
-            
-            '''
         except Exception as e:
+            db.rollback()
             logger.error("Error adding word '%s': %s", text, e)
-            skipped.append(text)
+            failed.append(text)
+
+    if added:
+        queue_word_audio(db, added, created_by=current_user.id)
 
     return schemas.BatchWordResult(
         added=added,
-        skipped=skipped
+        skipped=skipped,
+        failed=failed
     )
+
+
+@router.post(
+    "/batch_add/job",
+    response_model=schemas.JobOut,
+    status_code=202,
+    tags=["Words"],
+    summary="Batch add words in the background",
+    description="""
+                    Queues a background job that adds the words with AI-generated details and
+                    returns its id immediately. Poll `/jobs/{id}` for per-word progress.
+                    Admin access required."""
+)
+async def batch_add_words_job(
+    batch: schemas.BatchWordCreate,
+    db: Session = Depends(get_db),
+    current_user=Depends(auth.require_admin),
+):
+    """Queue a batch word import (admin only)."""
+    texts = []
+    seen = set()
+    for text in batch.texts:
+        text = (text or "").strip()
+        # One item per word; case-insensitive repeats would only be skipped
+        if text and text.lower() not in seen:
+            seen.add(text.lower())
+            texts.append(text)
+    if not texts:
+        raise HTTPException(status_code=400, detail="No words to add.")
+    job = jobs.enqueue_job(db, "words.batch_add", texts,
+                           created_by=current_user.id)
+    return jobs.job_to_schema(job)
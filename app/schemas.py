@@ -2,7 +2,7 @@ from enum import Enum
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
-from pydantic import BaseModel, EmailStr, field_validator, ConfigDict
+from pydantic import BaseModel, EmailStr, Field, field_validator, ConfigDict
 
 # ---------- User ----------
 
@@ -30,6 +30,11 @@ class Token(BaseModel):
     """JWT access token schema."""
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None  # exchange at /login/refresh for new tokens
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 # ---------- Word ----------
@@ -61,6 +66,8 @@ class WordOut(WordBase):
     """Output for a word, with DB id."""
     id: int
     normalized: str
+    audio_url: Optional[str] = None  # Set once the audio has been pre-generated
+    example_audio_url: Optional[str] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -72,6 +79,8 @@ class BatchWordCreate(BaseModel):
 class BatchWordResult(BaseModel):
     added: List[WordOut]
     skipped: List[str]
+    # Words the AI could not translate or that could not be stored
+    failed: List[str] = []
 
 # ---------- Progress ----------
 
@@ -241,3 +250,74 @@ class TTSResponse(BaseModel):
     voice_id: str
     cached: bool = False
     message: Optional[str] = None
+    output_format: str = "mp3"
+    sample_rate: Optional[int] = None
+
+
+class TTSBatchRequest(BaseModel):
+    """Input for generating audio for a whole lesson screen at once."""
+    texts: List[str] = Field(..., min_length=1, max_length=50)
+    voice_id: Optional[str] = "Aria"
+    sprite: bool = False  # Also join all items into one MP3 with a manifest
+
+
+class TTSBatchItem(BaseModel):
+    text: str
+    audio_url: Optional[str] = None
+    cached: bool = False
+    error: Optional[str] = None
+    # Position in the sprite, in seconds (only when a sprite was requested)
+    start: Optional[float] = None
+    duration: Optional[float] = None
+
+
+class TTSBatchResponse(BaseModel):
+    items: List[TTSBatchItem]
+    voice_id: str
+    sprite_url: Optional[str] = None
+
+
+# ---------- Jobs ----------
+
+
+class JobItemOut(BaseModel):
+    """Progress of a single input within a background job."""
+    position: int
+    input: str
+    status: str
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    @field_validator('status', mode="before")
+    def status_to_str(cls, v):
+        return getattr(v, "value", v)
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class JobOut(BaseModel):
+    """Background job with per-item progress."""
+    id: int
+    kind: str
+    status: str
+    total_items: int
+    completed_items: int = 0
+    failed_items: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: Optional[str] = None
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    items: List[JobItemOut] = []
+
+    @field_validator('status', mode="before")
+    def status_to_str(cls, v):
+        return getattr(v, "value", v)
+
+    @field_validator('created_at', 'started_at', 'finished_at', mode="before")
+    def datetime_to_iso(cls, v):
+        if isinstance(v, datetime):
+            return v.isoformat()
+        return v
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,147 @@
+# app/singleflight.py
+"""Request coalescing for identical in-flight AI calls.
+
+Within a worker, `SingleFlight.do` makes concurrent callers with the same key
+share one task. Across workers, `cross_worker_lock` serialises callers on a
+PostgreSQL advisory lock so the second worker can re-check the shared cache
+(or the words table) instead of calling the AI again.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+CROSS_WORKER_ENABLED = os.getenv(
+    "AI_SINGLEFLIGHT_CROSS_WORKER", "false").lower() in ("1", "true", "yes")
+CROSS_WORKER_LOCK_TIMEOUT = float(
+    os.getenv("AI_SINGLEFLIGHT_LOCK_TIMEOUT", 30))
+
+
+class SingleFlight:
+    """Runs one task per key at a time; concurrent callers await the same task.
+
+    The shared task is shielded, so a caller that is cancelled (for example
+    because its client disconnected) does not cancel the call for the others.
+    Once the last waiter is cancelled the shared task is cancelled too.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls = {}
+        self._waiters = {}
+        self.leaders = 0
+        self.followers = 0
+        self.abandoned = 0
+
+    def _start(self, loop, slot, func, args, kwargs):
+        self.leaders += 1
+        task = loop.create_task(func(*args, **kwargs))
+        self._calls[slot] = task
+        task.add_done_callback(lambda t: self._forget(slot, t))
+        return task
+
+    def lead(self, key, func, *args, **kwargs):
+        """Starts func as the shared call for key without waiting for it, for
+        a caller that consumes its progress another way (e.g. a live stream).
+
+        Returns the task, or None if a call for key is already in flight.
+        Callers joining through `do` leaving never cancel a task started here.
+        """
+        loop = asyncio.get_running_loop()
+        slot = (loop, key)
+        if slot in self._calls:
+            return None
+        task = self._start(loop, slot, func, args, kwargs)
+        self._waiters[task] = 1
+        task.add_done_callback(lambda t: self._waiters.pop(t, None))
+        return task
+
+    async def do(self, key, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        # Tasks are bound to their loop; the scheduler thread runs its own.
+        slot = (loop, key)
+        task = self._calls.get(slot)
+        if task is None:
+            task = self._start(loop, slot, func, args, kwargs)
+        else:
+            self.followers += 1
+            logger.debug("[%s] Coalesced in-flight call for %s", self.name, key)
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and self._waiters.get(task) == 1:
+                self.abandoned += 1
+                logger.debug("[%s] Every caller left; cancelling %s", self.name, key)
+                task.cancel()
+            raise
+        finally:
+            remaining = self._waiters.get(task, 1) - 1
+            if remaining:
+                self._waiters[task] = remaining
+            else:
+                self._waiters.pop(task, None)
+
+    def _forget(self, slot, task):
+        if self._calls.get(slot) is task:
+            del self._calls[slot]
+        if not task.cancelled():
+            task.exception()  # mark as retrieved even if every caller left
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight(),
+            "leader_calls": self.leaders,
+            "coalesced_calls": self.followers,
+            "abandoned_calls": self.abandoned,
+        }
+
+
+def advisory_lock_id(namespace: str, key: str) -> int:
+    """Stable signed 64-bit id for pg advisory locks."""
+    digest = hashlib.sha1(f"{namespace}:{key}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big", signed=True)
+
+
+@asynccontextmanager
+async def cross_worker_lock(db, namespace: str, key: str, timeout: float = None):
+    """Hold a PostgreSQL advisory lock for (namespace, key) across workers.
+
+    A no-op unless AI_SINGLEFLIGHT_CROSS_WORKER is enabled and the database
+    is PostgreSQL. The lock lives on a dedicated connection so commits made
+    through `db` meanwhile do not release it. If it cannot be acquired in
+    `timeout` seconds the caller proceeds unlocked rather than failing.
+    """
+    bind = db.get_bind()
+    if not CROSS_WORKER_ENABLED or bind.dialect.name != "postgresql":
+        yield False
+        return
+
+    lock_id = advisory_lock_id(namespace, key)
+    deadline = time.monotonic() + (timeout or CROSS_WORKER_LOCK_TIMEOUT)
+    conn = bind.connect()
+    acquired = False
+    try:
+        while True:
+            acquired = conn.execute(
+                text("SELECT pg_try_advisory_lock(:id)"), {"id": lock_id}).scalar()
+            if acquired or time.monotonic() >= deadline:
+                break
+            await asyncio.sleep(0.05)
+        if not acquired:
+            logger.warning(
+                "Advisory lock %s:%s not acquired in time; continuing without it", namespace, key)
+        yield acquired
+    finally:
+        if acquired:
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": lock_id})
+        conn.close()
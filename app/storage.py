@@ -0,0 +1,141 @@
+# app/storage.py
+"""Where cached audio lives.
+
+The local disk under ./static is always used as a node-local working copy.
+With AUDIO_STORAGE=s3, cached audio is also written to an S3-compatible
+bucket that every instance shares: a node that misses locally finds the
+audio through the shared cache index (tts_cache_entries) and either
+redirects the client to the object (presigned or CDN URL, so the bytes
+never pass through the app) or downloads it when it needs the bytes.
+"""
+import logging
+import os
+import shutil
+import uuid
+
+import boto3
+from botocore.config import Config as BotoConfig
+from botocore.exceptions import ClientError
+
+from app.audio import MEDIA_TYPES
+from app.static_files import IMMUTABLE_CACHE_CONTROL
+
+logger = logging.getLogger(__name__)
+
+AUDIO_STORAGE = os.getenv("AUDIO_STORAGE", "local").lower()  # local or s3
+AUDIO_S3_BUCKET = os.getenv("AUDIO_S3_BUCKET")
+AUDIO_S3_PREFIX = os.getenv("AUDIO_S3_PREFIX", "tts_cache/")
+# For MinIO, R2 and other S3-compatible services
+AUDIO_S3_ENDPOINT_URL = os.getenv("AUDIO_S3_ENDPOINT_URL") or None
+AUDIO_S3_REGION = os.getenv("AUDIO_S3_REGION", os.getenv("AWS_DEFAULT_REGION", "ap-southeast-2"))
+# Public base URL of a CDN in front of the bucket; otherwise URLs are presigned
+AUDIO_CDN_BASE_URL = os.getenv("AUDIO_CDN_BASE_URL")
+AUDIO_URL_EXPIRES = int(os.getenv("AUDIO_URL_EXPIRES", 24 * 3600))
+
+
+class LocalAudioStorage:
+    """Audio files under a local directory, served from the /static mount."""
+
+    remote = False
+
+    def __init__(self, root: str, url_prefix: str):
+        self.root = root
+        self.url_prefix = url_prefix.rstrip("/") + "/"
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def put_file(self, key: str, local_path: str):
+        target = self.path(key)
+        if os.path.abspath(target) == os.path.abspath(local_path):
+            return
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(local_path, target)
+
+    def download(self, key: str, local_path: str) -> bool:
+        if not self.exists(key):
+            return False
+        if os.path.abspath(self.path(key)) != os.path.abspath(local_path):
+            shutil.copyfile(self.path(key), local_path)
+        return True
+
+    def delete(self, key: str):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def url(self, key: str) -> str:
+        return self.url_prefix + key.replace(os.sep, "/")
+
+
+class S3AudioStorage:
+    """Audio objects in an S3-compatible bucket shared by all instances."""
+
+    remote = True
+
+    def __init__(self, bucket: str, prefix: str = AUDIO_S3_PREFIX, client=None,
+                 cdn_base_url: str = AUDIO_CDN_BASE_URL, url_expires: int = AUDIO_URL_EXPIRES):
+        if not bucket:
+            raise ValueError("AUDIO_S3_BUCKET is required for AUDIO_STORAGE=s3")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.cdn_base_url = cdn_base_url.rstrip("/") + "/" if cdn_base_url else None
+        self.url_expires = url_expires
+        self.client = client or boto3.client(
+            "s3", region_name=AUDIO_S3_REGION, endpoint_url=AUDIO_S3_ENDPOINT_URL,
+            config=BotoConfig(retries={"mode": "adaptive", "max_attempts": 3}))
+
+    def object_key(self, key: str) -> str:
+        return self.prefix + key.replace(os.sep, "/")
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.object_key(key))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def put_file(self, key: str, local_path: str):
+        self.client.upload_file(
+            local_path, self.bucket, self.object_key(key),
+            ExtraArgs={"ContentType": MEDIA_TYPES.get(key.rsplit(".", 1)[-1], "audio/mpeg"), "CacheControl": IMMUTABLE_CACHE_CONTROL})
+
+    def download(self, key: str, local_path: str) -> bool:
+        """Fetches the object into local_path (atomically); False if missing."""
+        os.makedirs(os.path.dirname(local_path) or ".", exist_ok=True)
+        temp_path = f"{local_path}.{uuid.uuid4().hex}.part"
+        try:
+            self.client.download_file(self.bucket, self.object_key(key), temp_path)
+            os.replace(temp_path, local_path)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self.object_key(key))
+
+    def url(self, key: str) -> str:
+        if self.cdn_base_url:
+            return self.cdn_base_url + self.object_key(key)
+        return self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": self.object_key(key)},
+            ExpiresIn=self.url_expires)
+
+
+def create_audio_storage(local_root: str, url_prefix: str):
+    """Storage backend selected by AUDIO_STORAGE."""
+    if AUDIO_STORAGE == "s3":
+        logger.info("Storing audio in s3://%s/%s", AUDIO_S3_BUCKET, AUDIO_S3_PREFIX)
+        return S3AudioStorage(AUDIO_S3_BUCKET)
+    return LocalAudioStorage(local_root, url_prefix)
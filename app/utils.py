@@ -1,6 +1,7 @@
 # app/utils.py
 from app.database import SessionLocal
 from app.ai_integration import get_positive_news_from_gemini
+from app.ai_json import parse_ai_json, strip_fences
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.schedulers.background import BackgroundScheduler
 import asyncio
@@ -24,13 +25,7 @@ def sanitize_level(ai_level: str) -> str:
 
 def extract_json_from_markdown(md_text: str) -> dict:
     """Extracts JSON object from markdown or plaintext AI response."""
-    clean = re.sub(r"^```(?:json)?\s*", "",
-                   md_text.strip(), flags=re.IGNORECASE)
-    clean = re.sub(r"\s*```$", "", clean.strip())
-    if not clean or not clean.strip().startswith("{"):
-        logger.error("AI response is not valid JSON:", repr(clean))
-        raise ValueError("AI did not return valid JSON")
-    return json.loads(clean)
+    return parse_ai_json(md_text, expect=dict, source="translation")
 
 
 def sanitize_ai_data(ai_data: dict) -> dict:
@@ -58,14 +53,41 @@ def extract_ai_text(result: dict) -> str:
         return ""
 
 
+class StreamingFieldParser:
+    """Pulls "field": "value" pairs out of a JSON object as it streams in.
+
+    `feed` takes the next chunk of text and returns the string fields that
+    have been completed since the last call, in the order they appeared.
+    """
+
+    FIELD_RE = re.compile(r'"(\w+)"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields = {}
+        self._pos = 0
+
+    def feed(self, text: str) -> list:
+        self.buffer += text
+        completed = []
+        for match in self.FIELD_RE.finditer(self.buffer, self._pos):
+            field = match.group(1)
+            try:
+                value = json.loads(f'"{match.group(2)}"')
+            except ValueError:
+                value = match.group(2)
+            self._pos = match.end()
+            if field not in self.fields:
+                self.fields[field] = value
+                completed.append((field, value))
+        return completed
+
+
 def news_extract_json_from_markdown(md_text: str) -> str:
     """
     Strips markdown code fences (``` or ```json) from a string and returns the inner JSON string.
     """
-    clean = re.sub(r"^```(?:json)?\s*", "",
-                   md_text.strip(), flags=re.IGNORECASE)
-    clean = re.sub(r"\s*```$", "", clean.strip())
-    return clean
+    return strip_fences(md_text)
 
 
 def scheduled_news_refresh():
@@ -98,6 +120,17 @@ def scheduled_news_refresh():
         logger.info("[SCHEDULER] Database connection closed")
 
 
+def scheduled_translation_hit_flush():
+    """Writes the buffered translation-cache hit counts."""
+    from app import crud
+
+    with SessionLocal() as db:
+        try:
+            crud.flush_translation_cache_hits(db)
+        except Exception as e:
+            logger.error(f"[SCHEDULER] Translation cache hit flush failed: {e}")
+
+
 def test_scheduler_job():
     """Test job to verify scheduler is working."""
     logger.info(
@@ -131,6 +164,42 @@ def start_scheduler():
             coalesce=True     # If multiple triggers, run only once
         )
 
+        # Keep the TTS cache within its disk budget
+        from app.router.tts import scheduled_tts_cache_eviction
+        scheduler.add_job(
+            scheduled_tts_cache_eviction,
+            'interval',
+            minutes=int(os.getenv("TTS_CACHE_EVICTION_MINUTES", 15)),
+            id='tts_cache_eviction',
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True
+        )
+
+        # Translation-cache hit counts are buffered in memory
+        from app.crud import TRANSLATION_CACHE_HIT_FLUSH_SECONDS
+        scheduler.add_job(
+            scheduled_translation_hit_flush,
+            'interval',
+            seconds=TRANSLATION_CACHE_HIT_FLUSH_SECONDS,
+            id='translation_cache_hit_flush',
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True
+        )
+
+        # Revoked refresh-token families, so their access tokens are refused
+        from app.auth import AUTH_DENYLIST_SYNC_SECONDS, scheduled_denylist_sync
+        scheduler.add_job(
+            scheduled_denylist_sync,
+            'interval',
+            seconds=AUTH_DENYLIST_SYNC_SECONDS,
+            id='auth_denylist_sync',
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True
+        )
+
         # Add test job for development (every 15 minutes)
         if not is_production:
             scheduler.add_job(
@@ -187,6 +256,7 @@ async def refresh_news_in_db(db, news_array):
     from datetime import datetime
 
     added = 0
+    titles = []
     for item in news_array[:10]:  # Only up to 10 items
         source_url = item.get("link")
         if not source_url:
@@ -209,8 +279,15 @@ async def refresh_news_in_db(db, news_array):
             )
             db.add(news)
             added += 1
+            titles.append(news.title_maori)
         except Exception as e:
             logger.error(f"Error saving news item: {e}")
 
     db.commit()
+    if titles:
+        from app.jobs import enqueue_tts_prewarm
+        try:
+            enqueue_tts_prewarm(db, titles)
+        except Exception as e:
+            logger.error(f"Failed to queue news title audio: {e}")
     return added
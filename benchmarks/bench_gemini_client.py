@@ -0,0 +1,117 @@
+"""Micro-benchmark: shared keep-alive Gemini client vs a new client per call.
+
+Starts a local stub of the Gemini `generateContent` endpoint, points
+`ai_integration.gemini_post` at it and times sequential calls in two modes:
+
+- per-call: no shared client, so every call opens (and closes) a connection,
+  which is what `gemini_post` did before the shared client existed.
+- shared:   the pooled client opened by the app lifespan is reused.
+
+The stub runs over plain HTTP on localhost, so by default the difference is
+only the local TCP setup and client construction. Use --handshake-ms to
+simulate the per-connection cost of reaching the real API (TCP + TLS round
+trips), which a pooled connection pays only once.
+
+    python benchmarks/bench_gemini_client.py --calls 200 --handshake-ms 60
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GOOGLE_AI_API_KEYS", "bench-key-1,bench-key-2")
+os.environ.setdefault("AWS_DEFAULT_REGION", "ap-southeast-2")
+# The key pool's per-key rate limit would otherwise pace the calls and hide
+# the connection cost being measured
+os.environ.setdefault("GEMINI_KEY_RPM", "1000000")
+os.environ.setdefault("GEMINI_KEY_BURST", "1000000")
+
+from app import ai_integration  # noqa: E402
+
+RESPONSE = json.dumps({
+    "candidates": [{"content": {"parts": [{"text": '{"translation": "kia ora"}'}]}}]
+}).encode("utf-8")
+
+
+class StubGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+    handshake_seconds = 0.0
+
+    def setup(self):
+        super().setup()
+        # Runs once per TCP connection, not once per request
+        if self.handshake_seconds:
+            time.sleep(self.handshake_seconds)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(RESPONSE)))
+        self.end_headers()
+        self.wfile.write(RESPONSE)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub(handshake_ms: float):
+    StubGeminiHandler.handshake_seconds = handshake_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubGeminiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def time_calls(calls: int):
+    payload = {"contents": [{"parts": [{"text": "kia ora"}]}]}
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await ai_integration.gemini_post(payload, max_retries=1)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def summarize(name, latencies):
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(f"{name:>9}: mean {statistics.mean(latencies):7.2f} ms | "
+          f"p50 {statistics.median(latencies):7.2f} ms | p95 {p95:7.2f} ms")
+    return statistics.mean(latencies)
+
+
+async def main(args):
+    server = start_stub(args.handshake_ms)
+    ai_integration.GEMINI_API_BASE = f"http://127.0.0.1:{server.server_port}/v1beta"
+    try:
+        await ai_integration.close_http_client()
+        per_call = await time_calls(args.calls)
+
+        await ai_integration.start_http_client()
+        await time_calls(5)  # warm the pool
+        shared = await time_calls(args.calls)
+        await ai_integration.close_http_client()
+    finally:
+        server.shutdown()
+
+    print(f"{args.calls} sequential gemini_post calls against a local stub "
+          f"(simulated handshake {args.handshake_ms:g} ms)")
+    before = summarize("per-call", per_call)
+    after = summarize("shared", shared)
+    print(f"    saved: {before - after:7.2f} ms per call "
+          f"({(1 - after / before) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--handshake-ms", type=float, default=0,
+                        help="simulated per-connection setup cost")
+    asyncio.run(main(parser.parse_args()))
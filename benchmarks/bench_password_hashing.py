@@ -0,0 +1,81 @@
+"""Benchmark: password verifications (logins) per second per core.
+
+Times bcrypt verification, the CPU cost of one /login, in two ways:
+
+- inline: on the calling thread, as login did before the hashing pool.
+  This is the per-core ceiling.
+- pool:   through app.hashing with --workers processes and as many
+  concurrent logins as the pool admits. This should scale close to
+  linearly with the workers while leaving the event loop free.
+
+It also counts how many extra logins get a 503 instead of queueing
+when the burst is larger than HASH_MAX_PENDING.
+
+    python benchmarks/bench_password_hashing.py --rounds 12 --logins 40 --workers 2
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import HTTPException  # noqa: E402
+
+from app import hashing  # noqa: E402
+
+
+def inline(hashed: str, logins: int, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(logins):
+        assert hashing._verify_and_update("kia ora", hashed, rounds)[0]
+    return logins / (time.perf_counter() - start)
+
+
+async def pooled(hashed: str, logins: int):
+    await hashing.verify_password("kia ora", hashed)  # start the workers
+    rejected = 0
+
+    async def login():
+        nonlocal rejected
+        try:
+            await hashing.verify_password("kia ora", hashed)
+        except HTTPException:
+            rejected += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    return (logins - rejected) / elapsed, rejected
+
+
+def main(args):
+    hashing.BCRYPT_ROUNDS = args.rounds
+    hashing.HASH_WORKERS = args.workers
+    hashing.HASH_MAX_PENDING = args.max_pending or args.logins
+    hashed = hashing._hash("kia ora", args.rounds)
+
+    per_core = inline(hashed, args.logins, args.rounds)
+    try:
+        pool_rate, rejected = asyncio.run(pooled(hashed, args.logins))
+    finally:
+        hashing.shutdown_hash_executor()
+
+    print(f"bcrypt cost {args.rounds}, {args.logins} logins, {os.cpu_count()} CPUs")
+    print(f"  inline: {per_core:7.1f} logins/s (one core, {1000 / per_core:.0f} ms each)")
+    cores = min(args.workers, os.cpu_count() or 1)
+    print(f"    pool: {pool_rate:7.1f} logins/s with {args.workers} workers "
+          f"= {pool_rate / cores:.1f} per core")
+    if rejected:
+        print(f"    503s: {rejected} logins over HASH_MAX_PENDING={hashing.HASH_MAX_PENDING}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=hashing.BCRYPT_ROUNDS)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=hashing.HASH_WORKERS)
+    parser.add_argument("--max-pending", type=int, default=0,
+                        help="admission limit (default: admit the whole burst)")
+    main(parser.parse_args())
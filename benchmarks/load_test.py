@@ -0,0 +1,129 @@
+"""Load test for the AI-backed endpoints against the local stand-ins.
+
+Start the stand-ins and the app (see `python -m benchmarks.stubs --help`),
+then run for example:
+
+    python benchmarks/load_test.py --base-url http://127.0.0.1:8000 \
+        --email admin@example.com --password secret \
+        --scenario translate --requests 500 --concurrency 50
+
+Scenarios: translate, batch_add, news_refresh, tts, mixed. Inputs are made
+unique per run (unless --repeat-inputs) so caches do not hide the AI path.
+Prints throughput, error counts and latency percentiles per endpoint.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+
+WORDS = ["hello", "water", "mountain", "family", "river", "house", "food", "friend",
+         "school", "morning", "love", "sea", "land", "tree", "sun", "rain"]
+
+
+def percentile(samples, p):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))]
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.run_id = uuid.uuid4().hex[:6]
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.token = None
+
+    def phrase(self, i: int) -> str:
+        word = WORDS[i % len(WORDS)]
+        return word if self.args.repeat_inputs else f"{word} {self.run_id}{i}"
+
+    async def login(self, client):
+        resp = await client.post("/login", data={"username": self.args.email, "password": self.args.password})
+        resp.raise_for_status()
+        self.token = resp.json()["access_token"]
+
+    def auth(self):
+        return {"Authorization": f"Bearer {self.token}"} if self.token else {}
+
+    async def call(self, client, name, method, url, **kwargs):
+        started = time.perf_counter()
+        try:
+            resp = await client.request(method, url, headers=self.auth(), **kwargs)
+            status = resp.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        self.latencies[name].append(time.perf_counter() - started)
+        self.statuses[name][status] += 1
+
+    async def one(self, client, scenario, i):
+        if scenario == "mixed":
+            scenario = random.choices(["translate", "tts", "batch_add", "news_refresh"], [70, 25, 4, 1])[0]
+        if scenario == "translate":
+            await self.call(client, "POST /translate/", "POST", "/translate/", json={"text": self.phrase(i)})
+        elif scenario == "tts":
+            await self.call(client, "GET /tts/tts", "GET", "/tts/tts", params={"text": f"kia ora {self.phrase(i)}"})
+        elif scenario == "batch_add":
+            texts = [self.phrase(i * self.args.batch_size + j) for j in range(self.args.batch_size)]
+            await self.call(client, "POST /words/batch_add", "POST", "/words/batch_add", json={"texts": texts})
+        elif scenario == "news_refresh":
+            await self.call(client, "POST /news/refresh", "POST", "/news/refresh")
+
+    async def run(self):
+        limits = httpx.Limits(max_connections=self.args.concurrency)
+        timeout = httpx.Timeout(self.args.timeout)
+        async with httpx.AsyncClient(base_url=self.args.base_url, limits=limits, timeout=timeout) as client:
+            if self.args.email:
+                await self.login(client)
+            queue = asyncio.Queue()
+            for i in range(self.args.requests):
+                queue.put_nowait(i)
+
+            async def worker():
+                while not queue.empty():
+                    await self.one(client, self.args.scenario, queue.get_nowait())
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(self.args.concurrency)))
+            return time.perf_counter() - started
+
+    def report(self, elapsed):
+        total = sum(len(v) for v in self.latencies.values())
+        print(f"{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s), "
+              f"concurrency {self.args.concurrency}")
+        for name, samples in sorted(self.latencies.items()):
+            ms = [s * 1000 for s in samples]
+            statuses = ", ".join(f"{k}: {v}" for k, v in sorted(self.statuses[name].items(), key=str))
+            print(f"  {name:24} n={len(ms):5}  mean={statistics.mean(ms):8.1f}ms  "
+                  f"p50={percentile(ms, 50):8.1f}  p95={percentile(ms, 95):8.1f}  "
+                  f"p99={percentile(ms, 99):8.1f}  max={max(ms):8.1f}  [{statuses}]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", help="admin email (needed for batch_add and news_refresh)")
+    parser.add_argument("--password")
+    parser.add_argument("--scenario", default="translate",
+                        choices=["translate", "batch_add", "news_refresh", "tts", "mixed"])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--repeat-inputs", action="store_true",
+                        help="reuse a small word list so caches and coalescing kick in")
+    args = parser.parse_args()
+
+    test = LoadTest(args)
+    elapsed = asyncio.run(test.run())
+    test.report(elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Local stand-ins for the Gemini and Polly APIs (see __main__ to run them)."""
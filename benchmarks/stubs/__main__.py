@@ -0,0 +1,44 @@
+"""Run a stand-in server.
+
+    python -m benchmarks.stubs gemini --port 8091 --latency lognormal:800,0.6 --rate-429 0.05
+    python -m benchmarks.stubs polly --port 8092 --latency lognormal:250,0.4 --error-rate 0.01
+
+Then start the app against them:
+
+    GEMINI_API_BASE=http://127.0.0.1:8091/v1beta \\
+    POLLY_ENDPOINT_URL=http://127.0.0.1:8092 \\
+    AWS_ACCESS_KEY_ID=stub AWS_SECRET_ACCESS_KEY=stub \\
+    uvicorn main:app --port 8000
+"""
+import argparse
+import json
+
+import uvicorn
+
+from benchmarks.stubs import gemini, polly
+from benchmarks.stubs.common import add_profile_arguments, profile_from_args
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("service", choices=["gemini", "polly"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--fixtures", help="JSON file of canned translations keyed by English input (gemini)")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    profile = profile_from_args(args)
+    if args.service == "gemini":
+        fixtures = None
+        if args.fixtures:
+            with open(args.fixtures, encoding="utf-8") as f:
+                fixtures = json.load(f)
+        app, port = gemini.create_app(profile, fixtures), args.port or 8091
+    else:
+        app, port = polly.create_app(profile), args.port or 8092
+    uvicorn.run(app, host=args.host, port=port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
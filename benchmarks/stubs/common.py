@@ -0,0 +1,96 @@
+"""Latency and fault injection shared by the Gemini and Polly stand-ins."""
+import asyncio
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+
+
+def parse_latency(spec: str):
+    """Returns a sampler (seconds) for a latency spec.
+
+    fixed:MS | uniform:LO_MS,HI_MS | normal:MEAN_MS,SD_MS |
+    lognormal:MEDIAN_MS,SIGMA (long tail, like the real APIs)
+    """
+    kind, _, args = (spec or "fixed:0").partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()] or [0.0]
+    if kind == "fixed":
+        return lambda: values[0] / 1000
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if kind == "normal":
+        return lambda: max(0.0, random.gauss(values[0], values[1])) / 1000
+    if kind == "lognormal":
+        import math
+        mu = math.log(max(values[0], 0.001))
+        sigma = values[1] if len(values) > 1 else 0.5
+        return lambda: random.lognormvariate(mu, sigma) / 1000
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+@dataclass
+class FaultProfile:
+    """What a stand-in does to each request before answering.
+
+    latency:     latency spec (see parse_latency)
+    error_rate:  fraction of requests answered with HTTP 500/503
+    rate_429:    fraction answered with HTTP 429 + Retry-After
+    retry_after: Retry-After seconds sent with 429s
+    key_rpm:     per-key requests per minute before 429s (0 = unlimited)
+    """
+    latency: str = "fixed:0"
+    error_rate: float = 0.0
+    rate_429: float = 0.0
+    retry_after: float = 1.0
+    key_rpm: int = 0
+    seed: int = None
+    stats: dict = field(default_factory=lambda: defaultdict(int))
+
+    def __post_init__(self):
+        self.sample_latency = parse_latency(self.latency)
+        self._random = random.Random(self.seed)
+        self._lock = threading.Lock()
+        self._key_hits = defaultdict(deque)
+
+    def _over_quota(self, key: str) -> bool:
+        if not self.key_rpm or not key:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            hits = self._key_hits[key]
+            while hits and now - hits[0] > 60:
+                hits.popleft()
+            if len(hits) >= self.key_rpm:
+                return True
+            hits.append(now)
+            return False
+
+    async def inject(self, key: str = None):
+        """Sleeps for a sampled latency; returns (status, headers) for a fault or None."""
+        self.stats["requests"] += 1
+        await asyncio.sleep(self.sample_latency())
+        if self._over_quota(key) or self._random.random() < self.rate_429:
+            self.stats["429"] += 1
+            return 429, {"Retry-After": str(int(self.retry_after))}
+        if self._random.random() < self.error_rate:
+            status = self._random.choice([500, 503])
+            self.stats[str(status)] += 1
+            return status, {}
+        self.stats["ok"] += 1
+        return None
+
+
+def add_profile_arguments(parser):
+    parser.add_argument("--latency", default="lognormal:800,0.5",
+                        help="fixed:MS | uniform:LO,HI | normal:MEAN,SD | lognormal:MEDIAN,SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--key-rpm", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def profile_from_args(args) -> FaultProfile:
+    return FaultProfile(latency=args.latency, error_rate=args.error_rate, rate_429=args.rate_429,
+                        retry_after=args.retry_after, key_rpm=args.key_rpm, seed=args.seed)
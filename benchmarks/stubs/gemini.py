@@ -0,0 +1,117 @@
+"""Local stand-in for the Gemini generateContent / streamGenerateContent API.
+
+Answers the prompts ai_integration sends (single and batch translations,
+positive news) with generated or canned JSON, after a sampled latency and
+with optional 5xx/429 injection. Point the app at it with
+
+    GEMINI_API_BASE=http://127.0.0.1:8091/v1beta
+"""
+import asyncio
+import json
+import re
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from benchmarks.stubs.common import FaultProfile
+
+BATCH_RE = re.compile(r"Words or phrases:\s*(\[.*\])", re.DOTALL)
+SINGLE_RE = re.compile(r'Word or phrase:\s*"(.*)"', re.DOTALL)
+
+
+def generated_translation(word: str) -> dict:
+    base = word.strip().lower()
+    return {
+        "translation": f"{base} (reo)",
+        "ipa": "ˈ" + ".".join(base.split()),
+        "phonetic": "-".join(base.split()),
+        "type": "phrase" if " " in base else "noun",
+        "domain": "general",
+        "example": f"He {base} tēnei. - This is {base}.",
+        "notes": "",
+    }
+
+
+class GeminiStub:
+    def __init__(self, profile: FaultProfile = None, fixtures: dict = None):
+        self.profile = profile or FaultProfile()
+        # Canned translations keyed by lower-cased input
+        self.fixtures = {k.strip().lower(): v for k, v in (fixtures or {}).items()}
+        self.news_counter = 0
+
+    def translation(self, word: str) -> dict:
+        return dict(self.fixtures.get(word.strip().lower()) or generated_translation(word))
+
+    def news(self) -> list:
+        items = []
+        for _ in range(10):
+            self.news_counter += 1
+            n = self.news_counter
+            items.append({
+                "title": f"Community celebrates milestone {n}",
+                "content": f"Good news story number {n} from Aotearoa.",
+                "link": f"https://news.example.nz/story/{n}",
+                "title_maori": f"Ka whakanui te hapori i te tohu {n}",
+                "summary_maori": f"He kōrero pai {n} nō Aotearoa.",
+                "image_url": "",
+            })
+        return items
+
+    def answer(self, prompt: str) -> str:
+        batch = BATCH_RE.search(prompt)
+        if batch:
+            words = json.loads(batch.group(1))
+            return json.dumps([{"input": w, **self.translation(w)} for w in words], ensure_ascii=False)
+        single = SINGLE_RE.search(prompt)
+        if single:
+            return json.dumps(self.translation(single.group(1)), ensure_ascii=False)
+        if "news" in prompt.lower():
+            return json.dumps(self.news(), ensure_ascii=False)
+        return json.dumps({"text": "ok"})
+
+
+def response_body(text: str) -> dict:
+    return {
+        "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP"}],
+        "usageMetadata": {"candidatesTokenCount": len(text) // 4},
+    }
+
+
+def create_app(profile: FaultProfile = None, fixtures: dict = None) -> FastAPI:
+    stub = GeminiStub(profile, fixtures)
+    app = FastAPI(title="Gemini stand-in")
+    app.state.stub = stub
+
+    @app.post("/v1beta/models/{model_action}")
+    async def generate(model_action: str, request: Request):
+        _, _, action = model_action.partition(":")
+        key = request.query_params.get("key")
+        if not key:
+            return JSONResponse({"error": {"code": 403, "message": "API key missing"}}, status_code=403)
+        body = await request.json()
+        try:
+            prompt = body["contents"][0]["parts"][0]["text"]
+        except (KeyError, IndexError, TypeError):
+            return JSONResponse({"error": {"code": 400, "message": "Invalid contents"}}, status_code=400)
+
+        fault = await stub.profile.inject(key)
+        if fault:
+            status, headers = fault
+            return JSONResponse({"error": {"code": status, "message": "Injected fault"}},
+                                status_code=status, headers=headers)
+        text = stub.answer(prompt)
+        if action == "streamGenerateContent":
+            return StreamingResponse(stream_chunks(text), media_type="text/event-stream")
+        return response_body(text)
+
+    @app.get("/stats")
+    def stats():
+        return dict(stub.profile.stats)
+
+    return app
+
+
+async def stream_chunks(text: str, chunk_size: int = 24, delay: float = 0.02):
+    for start in range(0, len(text), chunk_size):
+        yield f"data: {json.dumps(response_body(text[start:start + chunk_size]))}\r\n\r\n"
+        await asyncio.sleep(delay)
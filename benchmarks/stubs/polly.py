@@ -0,0 +1,75 @@
+"""Local stand-in for Amazon Polly's SynthesizeSpeech REST API.
+
+Returns silent but valid MP3 (MPEG-2 Layer III, 24 kHz mono) whose length
+follows the text, after a sampled latency and with optional throttling and
+service-failure injection. Point the app at it with
+
+    POLLY_ENDPOINT_URL=http://127.0.0.1:8092
+    AWS_ACCESS_KEY_ID=stub AWS_SECRET_ACCESS_KEY=stub
+"""
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from benchmarks.stubs.common import FaultProfile
+
+# One MPEG-2 Layer III frame: 48 kbps, 24 kHz, mono, no CRC; 576 samples (24 ms)
+MP3_FRAME_HEADER = b"\xff\xf3\x64\xc0"
+MP3_FRAME_SIZE = 144
+MP3_FRAME_SECONDS = 576 / 24000
+SECONDS_PER_CHAR = 0.07
+MAX_TEXT_CHARS = 3000
+
+CONTENT_TYPES = {"mp3": "audio/mpeg", "ogg_vorbis": "audio/ogg", "pcm": "audio/pcm"}
+
+
+def silent_mp3(seconds: float) -> bytes:
+    frames = max(1, int(seconds / MP3_FRAME_SECONDS))
+    frame = MP3_FRAME_HEADER + b"\x00" * (MP3_FRAME_SIZE - len(MP3_FRAME_HEADER))
+    return frame * frames
+
+
+def silent_audio(output_format: str, seconds: float, sample_rate: int = 16000) -> bytes:
+    if output_format == "pcm":
+        return b"\x00\x00" * int(seconds * sample_rate)
+    # Not a real Ogg stream, but the right size for load testing
+    return silent_mp3(seconds)
+
+
+def polly_error(status: int, error_type: str, message: str, headers: dict = None):
+    headers = dict(headers or {})
+    headers["x-amzn-ErrorType"] = error_type
+    return JSONResponse({"message": message}, status_code=status, headers=headers)
+
+
+def create_app(profile: FaultProfile = None) -> FastAPI:
+    profile = profile or FaultProfile()
+    app = FastAPI(title="Polly stand-in")
+    app.state.profile = profile
+
+    @app.post("/v1/speech")
+    async def synthesize_speech(request: Request):
+        body = await request.json()
+        text = body.get("Text") or ""
+        output_format = body.get("OutputFormat", "mp3")
+        if not text or output_format not in CONTENT_TYPES:
+            return polly_error(400, "InvalidParameterValueException", "Invalid Text or OutputFormat")
+        if len(text) > MAX_TEXT_CHARS:
+            return polly_error(400, "TextLengthExceededException", "Text is too long")
+
+        fault = await profile.inject("account")  # Polly quotas are per account
+        if fault:
+            status, headers = fault
+            if status == 429:
+                return polly_error(400, "ThrottlingException", "Rate exceeded", headers)
+            return polly_error(500, "ServiceFailureException", "Injected fault")
+
+        audio = silent_audio(output_format, len(text) * SECONDS_PER_CHAR,
+                             int(body.get("SampleRate") or 16000))
+        return Response(audio, media_type=CONTENT_TYPES[output_format],
+                        headers={"x-amzn-RequestCharacters": str(len(text))})
+
+    @app.get("/stats")
+    def stats():
+        return dict(profile.stats)
+
+    return app
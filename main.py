@@ -1,11 +1,17 @@
+import asyncio
 import logging
 import os
 import json
-from app.utils import start_scheduler
-from app.router import login, news, progress, quiz, translate, tts, users, words
-from app.database import engine, SessionLocal
+from contextlib import asynccontextmanager
+from app.utils import scheduled_translation_hit_flush, start_scheduler
+from app.router import ai, jobs, login, news, progress, quiz, translate, tts, users, words
+from app.database import engine, ensure_columns, SessionLocal
 from app import models, auth
-from fastapi.staticfiles import StaticFiles
+from app.ai_integration import close_http_client, start_http_client
+from app.hashing import shutdown_hash_executor
+from app.jobs import get_worker_pool
+from app.recordings import shutdown_transcode_executor
+from app.static_files import CachingStaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI
 from dotenv import load_dotenv
@@ -92,11 +98,29 @@ def init_default_admin():
 
 # Create database tables
 models.Base.metadata.create_all(bind=engine)
+ensure_columns(engine, models.Base.metadata)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared clients and job workers with the app; close them on shutdown."""
+    # bcrypt takes a while, so the default admin is created here, not at import
+    await asyncio.to_thread(init_default_admin)
+    await asyncio.to_thread(auth.sync_denylist)
+    await start_http_client()
+    worker_pool = get_worker_pool()
+    await worker_pool.start()
+    try:
+        yield
+    finally:
+        await worker_pool.stop()
+        await asyncio.to_thread(scheduled_translation_hit_flush)
+        shutdown_transcode_executor()
+        shutdown_hash_executor()
+        await close_http_client()
 
-# Initialize default admin account
-init_default_admin()
 
-app = FastAPI(title="Te Reo Hoa API")
+app = FastAPI(title="Te Reo Hoa API", lifespan=lifespan)
 
 origins = ["http://localhost:3000",
            "https://te-reo-hoa.vercel.app",
@@ -138,7 +162,9 @@ try:
 except Exception as e:
     logger.error(f"❌ Scheduler startup error: {e}")
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Cached TTS audio is content-addressed: its URL changes whenever the audio would
+app.mount("/static", CachingStaticFiles(directory="static", immutable_prefixes=("audio/tts_cache/",)),
+          name="static")
 app.include_router(login.router, prefix="/login")
 app.include_router(users.router, prefix="/users")
 app.include_router(words.router, prefix="/words")
@@ -147,3 +173,5 @@ app.include_router(progress.router, prefix="/progress")
 app.include_router(quiz.router, prefix="/quiz")
 app.include_router(news.router, prefix="/news")
 app.include_router(tts.router, prefix="/tts")
+app.include_router(jobs.router, prefix="/jobs")
+app.include_router(ai.router, prefix="/ai")
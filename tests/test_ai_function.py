@@ -55,3 +55,18 @@ def test_add_word(client, db_session):
     word = resp.json()
     assert word["text"].lower() == "love"
     assert word["translation"] == "arohi"
+
+
+def test_add_word_rechecks_after_ai_call(client, db_session, register_and_login_admin, monkeypatch):
+    from app import crud
+
+    async def racing_translation(word, max_retries=3):
+        # Another admin adds the same word, differently cased, meanwhile
+        crud.create_word(db_session, "Racing Word", {"translation": "tere"}, "beginner")
+        return {"candidates": [{"content": {"parts": [{"text": '{"translation": "tere"}'}]}}]}
+    monkeypatch.setattr("app.ai_integration.get_translation", racing_translation)
+
+    resp = client.post("/words/add", json={"id": 0, "text": "racing word", "normalized": ""},
+                       headers={"Authorization": f"Bearer {register_and_login_admin}"})
+    assert resp.status_code == 400
+    assert resp.json()["detail"] == "Text already exists"
@@ -0,0 +1,85 @@
+import pytest
+
+from app import ai_json
+from app.ai_integration import parse_batch_translation
+from app.ai_json import parse_ai_json, repair_json
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ('{"translation": "kia ora"}', {"translation": "kia ora"}),
+    ('```json\n{"translation": "kia ora"}\n```', {"translation": "kia ora"}),
+    ('Sure! Here it is: {"translation": "kia ora",} Hope that helps.', {"translation": "kia ora"}),
+    ('{"translation": "kia ora", "notes": "greet', {"translation": "kia ora"}),
+    ('{"translation": "kia ora", "ipa":', {"translation": "kia ora"}),
+])
+def test_translation_objects_are_repaired(raw, expected):
+    assert parse_ai_json(raw, expect=dict, source="test") == expected
+
+
+def test_truncated_array_keeps_complete_elements():
+    raw = '[{"title": "a", "link": "x"}, {"title": "b", "link": "y"}, {"title": "c'
+    assert parse_ai_json(raw, expect=list, source="test") == [
+        {"title": "a", "link": "x"}, {"title": "b", "link": "y"}]
+
+    # A half-written value is dropped, never kept
+    raw = '[{"title": "a", "link": "x"}, {"title": "b", "link": "http://exa'
+    assert parse_ai_json(raw, expect=list, source="test") == [
+        {"title": "a", "link": "x"}, {"title": "b"}]
+
+
+def test_truncated_before_anything_complete_fails():
+    with pytest.raises(ValueError):
+        parse_ai_json('{"translation": "kia o', expect=dict, source="test")
+
+
+def test_trailing_commas_in_arrays():
+    assert parse_ai_json('[1, 2, 3,]', expect=list, source="test") == [1, 2, 3]
+
+
+def test_brackets_inside_strings_are_left_alone():
+    raw = '{"example": "use [this], {that},", "notes": "a,}"'
+    assert parse_ai_json(raw, expect=dict, source="test") == {
+        "example": "use [this], {that},", "notes": "a,}"}
+
+
+def test_unrecoverable_text_raises_and_is_counted():
+    before = ai_json.parse_stats.snapshot().get("test_fail", {}).get("failed", 0)
+    with pytest.raises(ValueError):
+        parse_ai_json("I cannot translate that.", expect=dict, source="test_fail")
+    assert ai_json.parse_stats.snapshot()["test_fail"]["failed"] == before + 1
+
+
+def test_parse_outcomes_are_counted():
+    parse_ai_json('{"a": 1}', expect=dict, source="test_counts")
+    parse_ai_json('```{"a": 1,}```', expect=dict, source="test_counts")
+    counts = ai_json.parse_stats.snapshot()["test_counts"]
+    assert counts["clean"] == 1 and counts["repaired"] == 1 and counts["failed"] == 0
+
+
+def test_wrong_top_level_type_is_unwrapped():
+    assert parse_ai_json('[{"translation": "x"}]', expect=dict, source="test") == {"translation": "x"}
+
+
+def test_repair_returns_text_unchanged_when_not_json():
+    assert repair_json("no json here") == "no json here"
+
+
+def test_batch_with_trailing_comma_is_not_lost():
+    raw = '```json\n[{"input": "hello", "translation": "kia ora"},\n {"input": "water", "translation": "wai"},]\n```'
+    parsed = parse_batch_translation(raw, ["hello", "water"])
+    assert parsed["hello"]["translation"] == "kia ora"
+    assert parsed["water"]["translation"] == "wai"
+
+
+def test_json_mode_generation_config(monkeypatch):
+    config = ai_json.json_generation_config(ai_json.TRANSLATION_SCHEMA)
+    assert config["generationConfig"]["responseMimeType"] == "application/json"
+    assert config["generationConfig"]["responseSchema"]["properties"]["translation"] == {"type": "STRING"}
+    monkeypatch.setattr(ai_json, "GEMINI_JSON_MODE", False)
+    assert ai_json.json_generation_config(ai_json.TRANSLATION_SCHEMA) == {}
+
+
+def test_only_surrounding_fences_are_stripped():
+    raw = '```json\n{"example": "type ```code``` here"}\n```'
+    assert ai_json.strip_fences(raw) == '{"example": "type ```code``` here"}'
+    assert parse_ai_json(raw, expect=dict, source="test") == {"example": "type ```code``` here"}
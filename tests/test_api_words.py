@@ -39,3 +39,16 @@ def test_duplicate_word_addition_returns_error(client, register_and_login_admin)
         "type": "", "domain": "", "example": "", "audio_url": "", "normalized": "", "notes": ""
     }, headers={"Authorization": f"Bearer {token}"})
     assert resp.status_code in (400, 409)  # Depending on your error handling
+
+
+def test_ensure_columns_adds_new_word_columns(tmp_path):
+    from sqlalchemy import create_engine, inspect, text
+    from app.database import Base, ensure_columns
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE words (id INTEGER PRIMARY KEY, text VARCHAR, "
+                          "translation VARCHAR, normalized VARCHAR)"))
+    ensure_columns(engine, Base.metadata)
+    columns = {c["name"] for c in inspect(engine).get_columns("words")}
+    assert {"audio_cache_key", "example_audio_cache_key", "example"} <= columns
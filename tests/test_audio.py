@@ -0,0 +1,53 @@
+import pytest
+from benchmarks.stubs.polly import MP3_FRAME_SIZE, silent_mp3
+
+from app.audio import (AudioVariant, concat_mp3, fallback_variants, mp3_duration, mp3_frames,
+                       negotiate_variant, split_segments)
+
+
+def test_split_on_sentences():
+    assert split_segments("Kia ora koutou. He aha tō ingoa?\nKo Mere tōku ingoa!") == [
+        "Kia ora koutou.", "He aha tō ingoa?", "Ko Mere tōku ingoa!"]
+
+
+def test_long_sentences_split_at_phrases_then_words():
+    segments = split_segments("Tēnā koe, e hoa, me pēhea koe i tēnei rā", max_chars=20)
+    assert segments == ["Tēnā koe, e hoa,", "me pēhea koe i tēnei", "rā"]
+    assert all(len(s) <= 20 for s in split_segments("a" * 50 + " b", max_chars=20))
+
+
+def test_empty_text():
+    assert split_segments("  \n ") == []
+
+
+def test_concat_drops_tags_and_keeps_frames():
+    audio = silent_mp3(0.5)
+    id3 = b"ID3\x04\x00\x00\x00\x00\x00\x04" + b"TIT2"
+    id3v1 = b"TAG" + b"\x00" * 125
+    joined = concat_mp3([id3 + audio + id3v1, audio])
+    assert joined == audio + audio
+    assert mp3_duration(joined) == pytest.approx(mp3_duration(audio) * 2)
+
+
+def test_info_frame_is_dropped():
+    audio = silent_mp3(0.1)
+    info = audio[:4] + b"\x00" * 32 + b"Info" + b"\x00" * (MP3_FRAME_SIZE - 40)
+    assert mp3_frames(info + audio) == audio
+
+
+def test_negotiate_variant():
+    assert negotiate_variant() == AudioVariant("mp3", None)
+    assert negotiate_variant(accept="*/*") == AudioVariant("mp3", None)
+    assert negotiate_variant(accept="audio/ogg;q=0.9, audio/mpeg;q=0.5").output_format == "ogg_vorbis"
+    assert negotiate_variant(accept="audio/ogg, audio/*").output_format == "mp3"
+    assert negotiate_variant(sample_rate=24000, save_data=True) == AudioVariant("mp3", None)
+    assert negotiate_variant(save_data=True).sample_rate == 16000
+    with pytest.raises(ValueError):
+        negotiate_variant("flac")
+
+
+def test_fallback_variants_prefer_the_same_format():
+    fallbacks = fallback_variants(AudioVariant("mp3", 16000), "audio/mpeg, audio/ogg")
+    assert fallbacks[:3] == [AudioVariant("mp3", 22050), AudioVariant("mp3", None), AudioVariant("mp3", 8000)]
+    assert fallbacks[3] == AudioVariant("ogg_vorbis", 16000)
+    assert all(v.output_format == "mp3" for v in fallback_variants(AudioVariant(), "*/*"))
@@ -0,0 +1,135 @@
+from unittest.mock import patch
+
+import boto3
+import pytest
+
+moto = pytest.importorskip("moto")
+
+from benchmarks.stubs.polly import silent_mp3
+
+from app import models
+from app.router import tts
+from app.storage import LocalAudioStorage, S3AudioStorage
+from tests.conftest import TestingSessionLocal
+
+BUCKET = "te-reo-audio"
+
+
+@pytest.fixture
+def s3():
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+@pytest.fixture
+def storage(s3):
+    return S3AudioStorage(BUCKET, prefix="tts_cache/", client=s3, cdn_base_url=None)
+
+
+@pytest.fixture
+def shared(storage, tmp_path, db_session):
+    """The TTS router on 'node A' with audio in shared S3 storage."""
+    db_session.query(models.TTSCacheEntry).delete()
+    db_session.commit()
+    calls = []
+
+    async def fake(maori_text, voice_id="Aria", output_format="mp3", filename_override=None):
+        calls.append(maori_text)
+        (tmp_path / "audio" / filename_override).write_bytes(silent_mp3(0.3))
+        return filename_override
+
+    (tmp_path / "audio").mkdir()
+    (tmp_path / "node_a").mkdir()
+    with patch('app.router.tts.audio_storage', storage), \
+            patch('app.ai_integration.AUDIO_DIR', str(tmp_path / "audio")), \
+            patch('app.router.tts.AUDIO_CACHE_DIR', str(tmp_path / "node_a")), \
+            patch('app.router.tts.SessionLocal', TestingSessionLocal), \
+            patch('app.router.tts.synthesize_maori_audio_with_polly', side_effect=fake):
+        yield calls
+
+
+def switch_node(tmp_path, name):
+    """Another instance: same DB and bucket, empty local disk."""
+    (tmp_path / name).mkdir()
+    return patch('app.router.tts.AUDIO_CACHE_DIR', str(tmp_path / name))
+
+
+def test_s3_storage_round_trip(storage, tmp_path):
+    src = tmp_path / "src.mp3"
+    src.write_bytes(b"audio")
+    assert not storage.exists("ab/cd/tts_abcd.mp3")
+    storage.put_file("ab/cd/tts_abcd.mp3", str(src))
+    assert storage.exists("ab/cd/tts_abcd.mp3")
+
+    head = storage.client.head_object(Bucket=BUCKET, Key="tts_cache/ab/cd/tts_abcd.mp3")
+    assert head["ContentType"] == "audio/mpeg"
+    assert "immutable" in head["CacheControl"]
+
+    assert storage.download("ab/cd/tts_abcd.mp3", str(tmp_path / "dst" / "x.mp3"))
+    assert (tmp_path / "dst" / "x.mp3").read_bytes() == b"audio"
+    assert not storage.download("missing.mp3", str(tmp_path / "missing.mp3"))
+
+    assert "Signature=" in storage.url("ab/cd/tts_abcd.mp3")
+    storage.delete("ab/cd/tts_abcd.mp3")
+    assert not storage.exists("ab/cd/tts_abcd.mp3")
+
+
+def test_ogg_content_type(storage, tmp_path):
+    src = tmp_path / "src.ogg"
+    src.write_bytes(b"OggS")
+    storage.put_file("ab/cd/tts_abcd.ogg", str(src))
+    head = storage.client.head_object(Bucket=BUCKET, Key="tts_cache/ab/cd/tts_abcd.ogg")
+    assert head["ContentType"] == "audio/ogg"
+
+
+def test_cdn_urls(s3):
+    storage = S3AudioStorage(BUCKET, client=s3, cdn_base_url="https://cdn.example.com/")
+    assert storage.url("ab/cd/tts_abcd.mp3") == "https://cdn.example.com/tts_cache/ab/cd/tts_abcd.mp3"
+
+
+def test_local_storage_urls(tmp_path):
+    storage = LocalAudioStorage(str(tmp_path), "/static/audio/tts_cache")
+    assert storage.url("ab/cd/tts_x.mp3") == "/static/audio/tts_cache/ab/cd/tts_x.mp3"
+    assert not storage.remote
+
+
+def test_one_synthesis_serves_every_node(client, shared, storage, tmp_path):
+    first = client.get("/tts/tts", params={"text": "Kia ora e te whānau"}).json()
+    assert first["cached"] is False
+    assert first["audio_url"].startswith("https://")
+    key = tts.generate_cache_key("Kia ora e te whānau")
+    assert storage.exists(tts.cache_relpath(key))
+
+    with switch_node(tmp_path, "node_b"):
+        second = client.get("/tts/tts", params={"text": "Kia ora e te whānau"}).json()
+        assert second["cached"] is True
+
+        response = client.get(f"/tts/tts/audio/{key}", follow_redirects=False)
+        assert response.status_code == 307
+        assert "Signature=" in response.headers["location"]
+        # The signed URL expires, so the redirect must not be kept for long
+        assert response.headers["cache-control"] == f"private, max-age={tts.TTS_REDIRECT_MAX_AGE}"
+        assert "etag" not in response.headers
+    assert shared == ["Kia ora e te whānau"]
+
+
+@pytest.mark.asyncio
+async def test_other_nodes_download_segments_they_need(shared, tmp_path):
+    await tts.ensure_cached_audio("Kia ora. Haere mai.")
+    with switch_node(tmp_path, "node_b"):
+        path = await tts.ensure_cached_audio("Kia ora. Haere mai. Ka kite.")
+        assert path.startswith(str(tmp_path / "node_b"))
+    assert sorted(shared) == ["Haere mai.", "Ka kite.", "Kia ora."]
+
+
+def test_eviction_removes_shared_copies(shared, storage, db_session, tmp_path):
+    import asyncio
+
+    asyncio.run(tts.ensure_cached_audio("Mā te wā"))
+    relpath = tts.cache_relpath(tts.generate_cache_key("Mā te wā"))
+    assert storage.exists(relpath)
+    tts.enforce_tts_cache_budget(db_session, max_bytes=0)
+    assert not storage.exists(relpath)
+    assert not (tmp_path / "node_a" / relpath).exists()
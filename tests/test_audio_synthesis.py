@@ -2,10 +2,11 @@ import pytest
 import os
 import tempfile
 import asyncio
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import AsyncMock, Mock, patch, MagicMock
 from io import BytesIO
 
 from app.ai_integration import synthesize_maori_audio_with_polly
+from app.audio import DEFAULT_VARIANT
 from app.router.tts import generate_cache_key, get_cached_audio_path, generate_and_cache_audio
 
 
@@ -276,8 +277,8 @@ class TestTTSCaching:
                         # Call the function
                         result = await generate_and_cache_audio("Kia ora", "Aria", cache_key)
 
-                        # Verify the function completed and returned expected cache path
-                        expected_cache_path = os.path.join(temp_dir, filename)
+                        # Verify the function completed and returned the sharded cache path
+                        expected_cache_path = os.path.join(temp_dir, "te", "st", filename)
                         assert result == expected_cache_path
 
     @pytest.mark.asyncio
@@ -356,7 +357,9 @@ class TestTTSEndpoint:
 
     def test_tts_endpoint_text_too_long(self, client):
         """Test TTS endpoint with text that's too long."""
-        long_text = "a" * 501  # Exceeds 500 character limit
+        from app.router.tts import TTS_MAX_TEXT_LENGTH
+
+        long_text = "a" * (TTS_MAX_TEXT_LENGTH + 1)  # Exceeds the configured limit
 
         response = client.get(f"/tts/tts?text={long_text}")
 
@@ -485,3 +488,511 @@ class TestTTSIntegration:
                         data = response.json()
                         assert data["voice_id"] == voice
                         assert data["text"] == maori_text
+
+
+class TestNonBlockingSynthesis:
+    """Polly runs on its own bounded thread pool, off the event loop."""
+
+    @pytest.fixture
+    def slow_polly(self):
+        import threading
+        import time
+
+        state = {"active": 0, "peak": 0}
+        lock = threading.Lock()
+
+        def synthesize_speech(**kwargs):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.2)
+            with lock:
+                state["active"] -= 1
+            return {"AudioStream": BytesIO(b"audio")}
+
+        with patch('app.ai_integration.polly_client') as mock_client:
+            mock_client.synthesize_speech.side_effect = synthesize_speech
+            yield state
+
+    @pytest.mark.asyncio
+    async def test_event_loop_keeps_running_during_synthesis(self, slow_polly, tmp_path):
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        with patch('app.ai_integration.AUDIO_DIR', str(tmp_path)):
+            task = asyncio.create_task(ticker())
+            await synthesize_maori_audio_with_polly("kia ora")
+            task.cancel()
+        assert ticks >= 10
+        assert (tmp_path / "polly_kia_ora.mp3").read_bytes() == b"audio"
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self, slow_polly, tmp_path):
+        from concurrent.futures import ThreadPoolExecutor
+
+        with patch('app.ai_integration.AUDIO_DIR', str(tmp_path)), \
+                patch('app.ai_integration.polly_executor', ThreadPoolExecutor(max_workers=2)):
+            await asyncio.gather(*(synthesize_maori_audio_with_polly(f"kupu {i}") for i in range(5)))
+        assert slow_polly["peak"] == 2
+
+    def test_generate_word_audio_endpoint_awaits_synthesis(self, client, db_session, register_and_login_admin):
+        from app import crud
+
+        word = crud.create_word(db_session, "Polly test word", {"translation": "kupu whakamātau"}, "beginner")
+        cache_key = generate_cache_key("kupu whakamātau")
+        with patch('app.router.tts.get_cached_audio_path', return_value=None), \
+                patch('app.router.tts.generate_and_cache_audio',
+                      new=AsyncMock(return_value="/cache/tts.mp3")) as mock_generate:
+            resp = client.post(f"/words/words/{word.id}/generate_audio_polly",
+                               headers={"Authorization": f"Bearer {register_and_login_admin}"})
+        assert resp.status_code == 200
+        assert resp.json()["audio_url"] == f"/tts/tts/audio/{cache_key}"
+        mock_generate.assert_awaited_once_with("kupu whakamātau", "Aria", cache_key, DEFAULT_VARIANT)
+        db_session.refresh(word)
+        assert word.audio_cache_key == cache_key
+
+        resp = client.post("/words/words/999999/generate_audio_polly",
+                           headers={"Authorization": f"Bearer {register_and_login_admin}"})
+        assert resp.status_code == 404
+
+
+class TestSingleFlightTTS:
+    """Concurrent misses for one cache key share a single Polly call."""
+
+    @pytest.fixture
+    def dirs(self, tmp_path):
+        audio_dir = tmp_path / "audio"
+        cache_dir = tmp_path / "cache"
+        audio_dir.mkdir()
+        cache_dir.mkdir()
+        with patch('app.ai_integration.AUDIO_DIR', str(audio_dir)), \
+                patch('app.router.tts.AUDIO_CACHE_DIR', str(cache_dir)):
+            yield audio_dir, cache_dir
+
+    @pytest.fixture
+    def counting_synthesis(self, dirs):
+        import threading
+
+        audio_dir, _ = dirs
+        calls = []
+        lock = threading.Lock()
+
+        async def fake(maori_text, voice_id="Aria", output_format="mp3", filename_override=None):
+            with lock:
+                calls.append(maori_text)
+            await asyncio.sleep(0.1)
+            (audio_dir / filename_override).write_bytes(b"ID3 full audio")
+            return filename_override
+
+        with patch('app.router.tts.synthesize_maori_audio_with_polly', side_effect=fake):
+            yield calls
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_coalesce(self, counting_synthesis, dirs):
+        from app.router.tts import text_to_speech
+
+        responses = await asyncio.gather(*(
+            text_to_speech(text="Kia ora koutou", voice_id="Aria", format="mp3") for _ in range(5)))
+        assert counting_synthesis == ["Kia ora koutou"]
+        assert all(r.audio_url == responses[0].audio_url for r in responses)
+
+    def test_workers_wait_on_file_lock_instead_of_resynthesizing(self, counting_synthesis, dirs):
+        import threading
+
+        _, cache_dir = dirs
+        cache_key = generate_cache_key("Tēnā koe", "Aria")
+        results = []
+
+        def worker():
+            # Each thread has its own event loop, like a separate worker process
+            results.append(asyncio.run(generate_and_cache_audio("Tēnā koe", "Aria", cache_key)))
+
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert counting_synthesis == ["Tēnā koe"]
+        assert len(set(results)) == 1
+        assert (cache_dir / cache_key[:2] / cache_key[2:4] / f"tts_{cache_key}.mp3").read_bytes() == b"ID3 full audio"
+
+    @pytest.mark.asyncio
+    async def test_no_partial_files_left_behind(self, dirs):
+        audio_dir, cache_dir = dirs
+
+        async def failing(**kwargs):
+            (audio_dir / kwargs["filename_override"]).write_bytes(b"half")
+            raise RuntimeError("Polly went away")
+
+        with patch('app.router.tts.synthesize_maori_audio_with_polly', side_effect=failing):
+            with pytest.raises(Exception):
+                await generate_and_cache_audio("Kia ora", "Aria", "abc")
+        assert list(audio_dir.iterdir()) == []
+        assert not any(p.suffix == ".mp3" for p in cache_dir.iterdir())
+
+    @pytest.mark.asyncio
+    async def test_polly_writes_atomically(self, tmp_path):
+        with patch('app.ai_integration.polly_client') as mock_client, \
+                patch('app.ai_integration.AUDIO_DIR', str(tmp_path)):
+            mock_client.synthesize_speech.return_value = {"AudioStream": BytesIO(b"audio")}
+            filename = await synthesize_maori_audio_with_polly("kia ora")
+        assert [p.name for p in tmp_path.iterdir()] == [filename]
+
+
+class TestStreamingTTS:
+    """/tts/tts/stream relays Polly's audio while teeing it into the cache."""
+
+    @pytest.fixture
+    def dirs(self, tmp_path):
+        from tests.conftest import TestingSessionLocal
+
+        audio_dir = tmp_path / "audio"
+        cache_dir = tmp_path / "cache"
+        audio_dir.mkdir()
+        cache_dir.mkdir()
+        with patch('app.ai_integration.AUDIO_DIR', str(audio_dir)), \
+                patch('app.router.tts.AUDIO_CACHE_DIR', str(cache_dir)), \
+                patch('app.router.tts.SessionLocal', TestingSessionLocal):
+            yield audio_dir, cache_dir
+
+    def test_miss_streams_and_caches(self, client, dirs):
+        audio_dir, _ = dirs
+        audio = b"ID3" + bytes(range(256)) * 200
+        with patch('app.ai_integration.polly_client') as mock_client:
+            mock_client.synthesize_speech.return_value = {"AudioStream": BytesIO(audio)}
+            response = client.get("/tts/tts/stream", params={"text": "Kia ora tātou"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "audio/mpeg"
+        assert response.headers["x-tts-cache"] == "MISS"
+        assert response.content == audio
+
+        cached = get_cached_audio_path(generate_cache_key("Kia ora tātou", "Aria"))
+        assert cached and open(cached, "rb").read() == audio
+        assert list(audio_dir.iterdir()) == []
+
+        with patch('app.ai_integration.polly_client') as mock_client:
+            response = client.get("/tts/tts/stream", params={"text": "Kia ora tātou"})
+            mock_client.synthesize_speech.assert_not_called()
+        assert response.headers["x-tts-cache"] == "HIT"
+        assert response.content == audio
+
+    def test_polly_failure_is_a_500(self, client, dirs):
+        _, cache_dir = dirs
+        with patch('app.ai_integration.polly_client') as mock_client:
+            mock_client.synthesize_speech.side_effect = Exception("throttled")
+            response = client.get("/tts/tts/stream", params={"text": "Kia ora"})
+        assert response.status_code == 500
+        assert get_cached_audio_path(generate_cache_key("Kia ora", "Aria")) is None
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_polly_stream(self, dirs):
+        from starlette.requests import Request
+        from app.router.tts import text_to_speech, text_to_speech_stream
+
+        calls = []
+
+        async def fake_stream(text, voice_id="Aria", output_format="mp3"):
+            calls.append(text)
+            for part in (b"ID3", b"chunk one", b"chunk two"):
+                await asyncio.sleep(0.05)
+                yield part
+
+        async def stream_request():
+            request = Request({"type": "http", "method": "GET", "headers": []})
+            response = await text_to_speech_stream(request, text="Kia ora e hoa", voice_id="Aria")
+            if hasattr(response, "body_iterator"):
+                return b"".join([chunk async for chunk in response.body_iterator])
+            with open(response.path, "rb") as f:
+                return f.read()
+
+        with patch('app.router.tts.stream_maori_audio_with_polly', side_effect=fake_stream):
+            results = await asyncio.gather(
+                stream_request(), stream_request(),
+                text_to_speech(text="Kia ora e hoa", voice_id="Aria", format="mp3"))
+
+        assert calls == ["Kia ora e hoa"]
+        assert results[0] == results[1] == b"ID3chunk onechunk two"
+        assert results[2].cached is False
+
+    @pytest.mark.asyncio
+    async def test_interrupted_stream_is_not_cached(self, dirs):
+        from app.router.tts import stream_and_cache_audio
+
+        audio_dir, _ = dirs
+
+        async def chunks():
+            yield b"second"
+            raise ConnectionError("Polly dropped the connection")
+
+        stream = stream_and_cache_audio(chunks(), b"first", "Aria", "abcdef")
+        with pytest.raises(ConnectionError):
+            async for _ in stream:
+                pass
+        assert get_cached_audio_path("abcdef") is None
+        assert list(audio_dir.iterdir()) == []
+
+
+class TestCachedAudioDelivery:
+    """Cached audio is content-addressed: immutable, strong ETag, Range."""
+
+    KEY = generate_cache_key("Mōrena", "Aria")
+    AUDIO = bytes(range(256)) * 8
+
+    @pytest.fixture
+    def cache_dir(self, tmp_path):
+        from app.router.tts import cache_relpath
+
+        path = tmp_path / cache_relpath(self.KEY)
+        path.parent.mkdir(parents=True)
+        path.write_bytes(self.AUDIO)
+        with patch('app.router.tts.AUDIO_CACHE_DIR', str(tmp_path)), \
+                patch('app.router.tts.record_cache_hit'):
+            yield tmp_path
+
+    def test_headers(self, client, cache_dir):
+        response = client.get(f"/tts/tts/audio/{self.KEY}")
+        assert response.status_code == 200
+        assert response.content == self.AUDIO
+        assert response.headers["etag"] == f'"{self.KEY}"'
+        assert "immutable" in response.headers["cache-control"]
+        assert response.headers["accept-ranges"] == "bytes"
+
+    def test_revalidation_is_304(self, client, cache_dir):
+        response = client.get(f"/tts/tts/audio/{self.KEY}", headers={"If-None-Match": f'"{self.KEY}"'})
+        assert response.status_code == 304
+        assert response.content == b""
+
+    def test_range(self, client, cache_dir):
+        response = client.get(f"/tts/tts/audio/{self.KEY}", headers={"Range": "bytes=100-199"})
+        assert response.status_code == 206
+        assert response.content == self.AUDIO[100:200]
+        assert response.headers["content-range"] == f"bytes 100-199/{len(self.AUDIO)}"
+
+    def test_malformed_key_is_rejected(self, client, cache_dir):
+        assert client.get("/tts/tts/audio/..%2F..%2Fsecret").status_code in (404, 422)
+        assert client.get("/tts/tts/audio/not-a-key").status_code == 422
+
+    def test_unknown_key_is_404(self, client, cache_dir):
+        assert client.get(f"/tts/tts/audio/{'0' * 32}").status_code == 404
+
+    def test_accel_redirect(self, client, cache_dir):
+        with patch('app.router.tts.TTS_ACCEL_REDIRECT_PREFIX', "/internal/tts_cache/"):
+            response = client.get(f"/tts/tts/audio/{self.KEY}")
+        assert response.headers["x-accel-redirect"] == \
+            f"/internal/tts_cache/{self.KEY[:2]}/{self.KEY[2:4]}/tts_{self.KEY}.mp3"
+        assert response.content == b""
+
+    def test_static_mount_marks_tts_cache_immutable(self, client):
+        from app.router.tts import AUDIO_CACHE_DIR
+
+        path = os.path.join(AUDIO_CACHE_DIR, "tts_static_test.mp3")
+        with open(path, "wb") as f:
+            f.write(self.AUDIO)
+        try:
+            response = client.get("/static/audio/tts_cache/tts_static_test.mp3")
+            assert response.status_code == 200
+            assert "immutable" in response.headers["cache-control"]
+            etag = response.headers["etag"]
+            assert client.get("/static/audio/tts_cache/tts_static_test.mp3",
+                              headers={"If-None-Match": etag}).status_code == 304
+        finally:
+            os.remove(path)
+
+
+class TestSegmentedTTS:
+    """Multi-sentence texts are synthesized and cached sentence by sentence."""
+
+    @pytest.fixture
+    def polly(self, tmp_path):
+        from benchmarks.stubs.polly import silent_mp3
+        from tests.conftest import TestingSessionLocal
+
+        calls = []
+
+        async def fake(maori_text, voice_id="Aria", output_format="mp3", filename_override=None):
+            calls.append(maori_text)
+            (tmp_path / "audio" / filename_override).write_bytes(silent_mp3(0.5))
+            return filename_override
+
+        (tmp_path / "audio").mkdir()
+        (tmp_path / "cache").mkdir()
+        with patch('app.ai_integration.AUDIO_DIR', str(tmp_path / "audio")), \
+                patch('app.router.tts.AUDIO_CACHE_DIR', str(tmp_path / "cache")), \
+                patch('app.router.tts.SessionLocal', TestingSessionLocal), \
+                patch('app.router.tts.synthesize_maori_audio_with_polly', side_effect=fake):
+            yield calls
+
+    @pytest.mark.asyncio
+    async def test_shared_sentences_are_synthesized_once(self, polly):
+        from benchmarks.stubs.polly import silent_mp3
+        from app.audio import mp3_duration
+        from app.router.tts import ensure_cached_audio
+
+        first = await ensure_cached_audio("Kia ora. He rā pai tēnei. Haere mai.")
+        second = await ensure_cached_audio("Kia ora. He rā pai tēnei. Ka kite anō.")
+
+        assert sorted(polly) == sorted(["Kia ora.", "He rā pai tēnei.", "Haere mai.", "Ka kite anō."])
+        with open(first, "rb") as f:
+            assert mp3_duration(f.read()) == pytest.approx(3 * mp3_duration(silent_mp3(0.5)))
+        assert first != second
+
+        # The joined file is cached under the full text as well
+        await ensure_cached_audio("Kia ora. He rā pai tēnei. Haere mai.")
+        assert len(polly) == 4
+
+    def test_long_text_endpoint(self, client, polly):
+        text = " ".join(f"Ko te rerenga kōrero {i} tēnei." for i in range(40))
+        assert len(text) > 500
+        response = client.get("/tts/tts", params={"text": text})
+        assert response.status_code == 200
+        assert response.json()["cached"] is False
+        assert len(polly) == 40
+
+
+class TestBatchTTS:
+    """POST /tts/batch resolves a whole lesson's audio in one call."""
+
+    @pytest.fixture
+    def polly(self, tmp_path):
+        from benchmarks.stubs.polly import silent_mp3
+        from tests.conftest import TestingSessionLocal
+
+        calls = []
+
+        async def fake(maori_text, voice_id="Aria", output_format="mp3", filename_override=None):
+            if maori_text == "hē":
+                raise RuntimeError("Polly rejected the text")
+            calls.append(maori_text)
+            (tmp_path / "audio" / filename_override).write_bytes(silent_mp3(0.2 * len(calls)))
+            return filename_override
+
+        (tmp_path / "audio").mkdir()
+        (tmp_path / "cache").mkdir()
+        with patch('app.ai_integration.AUDIO_DIR', str(tmp_path / "audio")), \
+                patch('app.router.tts.AUDIO_CACHE_DIR', str(tmp_path / "cache")), \
+                patch('app.router.tts.SessionLocal', TestingSessionLocal), \
+                patch('app.router.tts.synthesize_maori_audio_with_polly', side_effect=fake):
+            yield calls
+
+    def test_hits_and_misses(self, client, polly):
+        client.get("/tts/tts", params={"text": "kuri"})
+        resp = client.post("/tts/batch", json={"texts": ["kuri", "ngeru", "manu", "ngeru"]})
+        assert resp.status_code == 200
+        items = resp.json()["items"]
+        assert [i["cached"] for i in items] == [True, False, False, False]
+        assert all(i["audio_url"] and i["error"] is None for i in items)
+        assert items[1]["audio_url"] == items[3]["audio_url"]
+        assert sorted(polly) == ["kuri", "manu", "ngeru"]
+
+    def test_indexed_but_deleted_audio_is_regenerated(self, client, polly):
+        from app.router import tts
+
+        client.post("/tts/batch", json={"texts": ["whare"]})
+        os.remove(tts.get_cached_audio_path(tts.generate_cache_key("whare")))
+
+        item = client.post("/tts/batch", json={"texts": ["whare"]}).json()["items"][0]
+        assert item["cached"] is False and item["audio_url"]
+        assert polly == ["whare", "whare"]
+        assert tts.get_cached_audio_path(tts.generate_cache_key("whare"))
+
+    def test_failed_items_are_reported(self, client, polly):
+        items = client.post("/tts/batch", json={"texts": ["hē", "tika"]}).json()["items"]
+        assert items[0]["audio_url"] is None and items[0]["error"]
+        assert items[1]["audio_url"]
+
+    def test_sprite_manifest(self, client, polly):
+        from app.audio import mp3_duration
+
+        data = client.post("/tts/batch", json={"texts": ["tahi", "rua", "toru"], "sprite": True}).json()
+        starts = [i["start"] for i in data["items"]]
+        durations = [i["duration"] for i in data["items"]]
+        assert starts[0] == 0.0
+        assert starts[1] == pytest.approx(durations[0], abs=0.002)
+        assert starts[2] == pytest.approx(durations[0] + durations[1], abs=0.002)
+
+        from app.router.tts import AUDIO_CACHE_DIR
+        relpath = data["sprite_url"].removeprefix("/static/audio/tts_cache/")
+        with open(os.path.join(AUDIO_CACHE_DIR, relpath), "rb") as f:
+            assert mp3_duration(f.read()) == pytest.approx(sum(durations), abs=0.005)
+
+    def test_limits(self, client, polly):
+        assert client.post("/tts/batch", json={"texts": []}).status_code == 422
+        assert client.post("/tts/batch", json={"texts": ["a"] * 51}).status_code == 422
+        assert client.post("/tts/batch", json={"texts": ["kia ora", " "]}).status_code == 400
+
+
+class TestAudioVariants:
+    """Format and sample rate negotiation for /tts/tts."""
+
+    @pytest.fixture
+    def polly(self, tmp_path):
+        from benchmarks.stubs.polly import silent_mp3
+        from tests.conftest import TestingSessionLocal
+
+        calls = []
+
+        async def fake(maori_text, voice_id="Aria", output_format="mp3", filename_override=None,
+                       sample_rate=None):
+            calls.append((maori_text, output_format, sample_rate))
+            (tmp_path / "audio" / filename_override).write_bytes(
+                silent_mp3(0.2) if output_format == "mp3" else b"OggS fake")
+            return filename_override
+
+        (tmp_path / "audio").mkdir()
+        (tmp_path / "cache").mkdir()
+        with patch('app.ai_integration.AUDIO_DIR', str(tmp_path / "audio")), \
+                patch('app.router.tts.AUDIO_CACHE_DIR', str(tmp_path / "cache")), \
+                patch('app.router.tts.SessionLocal', TestingSessionLocal), \
+                patch('app.router.tts.synthesize_maori_audio_with_polly', side_effect=fake):
+            yield calls
+
+    def test_default_key_is_unchanged(self):
+        from app.audio import AudioVariant
+
+        assert generate_cache_key("Kia ora", "Aria", DEFAULT_VARIANT) == generate_cache_key("Kia ora", "Aria")
+        assert generate_cache_key("Kia ora", "Aria", AudioVariant("mp3", 16000)) != generate_cache_key("Kia ora")
+        assert generate_cache_key("Kia ora", "Aria", AudioVariant("ogg_vorbis")) != generate_cache_key("Kia ora")
+
+    def test_ogg_by_query_and_by_accept(self, client, polly):
+        data = client.get("/tts/tts", params={"text": "Kia ora", "format": "ogg_vorbis"}).json()
+        assert data["output_format"] == "ogg_vorbis" and data["audio_url"].endswith(".ogg")
+        assert polly == [("Kia ora", "ogg_vorbis", None)]
+
+        data = client.get("/tts/tts", params={"text": "Kia ora"},
+                          headers={"Accept": "audio/ogg, audio/mpeg;q=0.5"}).json()
+        assert data["cached"] is True and data["output_format"] == "ogg_vorbis"
+
+        key = data["audio_url"].rsplit("tts_", 1)[1].removesuffix(".ogg")
+        response = client.get(f"/tts/tts/audio/{key}")
+        assert response.headers["content-type"] == "audio/ogg"
+
+    def test_save_data_lowers_the_sample_rate(self, client, polly):
+        data = client.get("/tts/tts", params={"text": "Kia ora"}, headers={"Save-Data": "on"}).json()
+        assert data["sample_rate"] == 16000
+        assert polly == [("Kia ora", "mp3", 16000)]
+
+    def test_closest_cached_variant_is_reused(self, client, polly):
+        client.get("/tts/tts", params={"text": "Mōrena", "sample_rate": 22050})
+        data = client.get("/tts/tts", params={"text": "Mōrena", "sample_rate": 16000}).json()
+        assert data["cached"] is True and data["sample_rate"] == 22050
+
+        # Ogg only stands in for clients that say they can play it
+        client.get("/tts/tts", params={"text": "Ka kite", "format": "ogg_vorbis"})
+        assert client.get("/tts/tts", params={"text": "Ka kite"}).json()["cached"] is False
+        client.get("/tts/tts", params={"text": "Pō mārie", "format": "ogg_vorbis"})
+        data = client.get("/tts/tts", params={"text": "Pō mārie"},
+                          headers={"Accept": "audio/mpeg, audio/ogg;q=0.8"}).json()
+        assert data["cached"] is True and data["output_format"] == "ogg_vorbis"
+        assert len(polly) == 4
+
+    def test_invalid_variants(self, client, polly):
+        assert client.get("/tts/tts", params={"text": "Kia ora", "format": "wav"}).status_code == 400
+        assert client.get("/tts/tts", params={"text": "Kia ora", "sample_rate": 44100}).status_code == 400
+        assert polly == []
@@ -0,0 +1,127 @@
+import json
+import logging
+
+import pytest
+
+from app.ai_integration import (
+    build_batch_translation_prompt,
+    get_translations_batch,
+    parse_batch_translation,
+)
+
+
+def gemini_text(text):
+    return {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+
+
+def element(word, translation):
+    return {"input": word, "translation": translation, "ipa": f"ipa {translation}",
+            "phonetic": f"ph {translation}", "type": "noun", "domain": "", "example": "", "notes": ""}
+
+
+def test_prompt_lists_every_word_once():
+    prompt = build_batch_translation_prompt(["hello", "thank you"])
+    assert json.dumps(["hello", "thank you"]) in prompt
+    assert "JSON array" in prompt
+    assert "REQUIRED" in prompt
+
+
+def test_parse_batch_maps_elements_by_input():
+    raw = json.dumps([element("thank you", "ngā mihi"), element("hello", "kia ora")])
+    parsed = parse_batch_translation(raw, ["hello", "thank you"])
+    assert parsed["hello"]["translation"] == "kia ora"
+    assert parsed["thank you"]["ipa"] == "ipa ngā mihi"
+    assert parsed["hello"]["level"] == "beginner"
+    assert "input" not in parsed["hello"]
+
+
+def test_parse_batch_keeps_valid_elements_when_one_is_broken():
+    good = json.dumps(element("hello", "kia ora"))
+    raw = "```json\n[" + good + ', {"input": "water", "translation": "wa' + "]\n```"
+    parsed = parse_batch_translation(raw, ["hello", "water"])
+    assert list(parsed) == ["hello"]
+
+
+def test_salvaged_batch_does_not_log_a_parse_failure(caplog):
+    raw = (json.dumps(element("hello", "kia ora")) + "\nand also\n"
+           + json.dumps(element("water", "wai")))
+    with caplog.at_level(logging.INFO):
+        parsed = parse_batch_translation(raw, ["hello", "water"])
+    assert list(parsed) == ["hello", "water"]
+    assert not [r for r in caplog.records if r.levelno >= logging.ERROR]
+
+
+def test_parse_batch_rejects_empty_translation():
+    raw = json.dumps([element("hello", "")])
+    assert parse_batch_translation(raw, ["hello"]) == {}
+
+
+@pytest.mark.asyncio
+async def test_batch_uses_one_call_per_chunk(monkeypatch):
+    calls = []
+
+    async def fake_post(payload, *args, **kwargs):
+        calls.append(payload)
+        words = json.loads(payload["contents"][0]["parts"][0]["text"].split("Words or phrases:")[1])
+        return gemini_text(json.dumps([element(w, f"mi {w}") for w in words]))
+    monkeypatch.setattr("app.ai_integration.gemini_post", fake_post)
+
+    words = [f"word{i}" for i in range(25)]
+    results = await get_translations_batch(words, batch_size=10)
+
+    assert len(calls) == 3
+    assert set(results) == set(words)
+    assert results["word7"]["translation"] == "mi word7"
+
+
+@pytest.mark.asyncio
+async def test_batch_retries_only_failed_elements(monkeypatch):
+    prompts = []
+
+    async def fake_post(payload, *args, **kwargs):
+        words = json.loads(payload["contents"][0]["parts"][0]["text"].split("Words or phrases:")[1])
+        prompts.append(words)
+        if len(prompts) == 1:
+            # "water" comes back without a translation the first time
+            return gemini_text(json.dumps([element("hello", "kia ora"), element("water", "")]))
+        return gemini_text(json.dumps([element(w, "wai") for w in words]))
+    monkeypatch.setattr("app.ai_integration.gemini_post", fake_post)
+
+    results = await get_translations_batch(["hello", "water"])
+
+    assert prompts == [["hello", "water"], ["water"]]
+    assert results["water"]["translation"] == "wai"
+
+
+@pytest.mark.asyncio
+async def test_batch_gives_up_after_max_retries(monkeypatch):
+    calls = []
+
+    async def fake_post(payload, *args, **kwargs):
+        calls.append(payload)
+        return gemini_text("not json at all")
+    monkeypatch.setattr("app.ai_integration.gemini_post", fake_post)
+
+    results = await get_translations_batch(["hello"], max_retries=2)
+
+    assert results == {}
+    assert len(calls) == 3
+
+
+def test_batch_add_endpoint_makes_single_ai_call(client, register_and_login_admin, monkeypatch):
+    calls = []
+
+    async def fake_post(payload, *args, **kwargs):
+        words = json.loads(payload["contents"][0]["parts"][0]["text"].split("Words or phrases:")[1])
+        calls.append(words)
+        return gemini_text(json.dumps([element(w, f"mi {w}") for w in words]))
+    monkeypatch.setattr("app.ai_integration.gemini_post", fake_post)
+
+    token = register_and_login_admin
+    resp = client.post("/words/batch_add",
+                       json={"texts": ["batchone", "batchtwo", "batchthree"]},
+                       headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+    assert [w["translation"] for w in data["added"]] == ["mi batchone", "mi batchtwo", "mi batchthree"]
+    assert len(calls) == 1
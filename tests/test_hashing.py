@@ -0,0 +1,35 @@
+import pytest
+
+from app import hashing, models
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_in_the_pool(monkeypatch):
+    monkeypatch.setattr(hashing, "BCRYPT_ROUNDS", 4)
+    hashed = await hashing.hash_password("kia ora")
+    assert hashed.startswith("$2b$04$")
+    assert await hashing.verify_password("kia ora", hashed) == (True, None)
+    assert (await hashing.verify_password("hē", hashed))[0] is False
+    assert await hashing.verify_password("kia ora", None) == (False, None)
+
+
+def test_login_rehashes_when_the_cost_changes(client, db_session, monkeypatch):
+    monkeypatch.setattr(hashing, "BCRYPT_ROUNDS", 4)
+    client.post("/users/register", json={"email": "rehash@example.com", "password": "testpass"})
+    user = db_session.query(models.User).filter_by(email="rehash@example.com").one()
+    assert user.hashed_password.startswith("$2b$04$")
+
+    monkeypatch.setattr(hashing, "BCRYPT_ROUNDS", 5)
+    resp = client.post("/login/", data={"username": "rehash@example.com", "password": "testpass"})
+    assert resp.status_code == 200
+    db_session.refresh(user)
+    assert user.hashed_password.startswith("$2b$05$")
+    assert client.post("/login/", data={"username": "rehash@example.com",
+                                        "password": "testpass"}).status_code == 200
+
+
+def test_saturation_is_a_fast_503(client, monkeypatch):
+    monkeypatch.setattr(hashing, "HASH_MAX_PENDING", 0)
+    resp = client.post("/users/register", json={"email": "busy@example.com", "password": "testpass"})
+    assert resp.status_code == 503
+    assert resp.headers["retry-after"] == "1"
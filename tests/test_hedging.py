@@ -0,0 +1,116 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app import ai_integration
+from app.hedging import HedgePolicy, LatencyTracker
+from app.key_pool import ApiKeyPool
+
+
+@pytest.fixture
+def hedged_gemini(monkeypatch):
+    monkeypatch.setattr(ai_integration, "key_pool", ApiKeyPool(["key-slow1", "key-fast2"], rpm=600))
+    monkeypatch.setattr(ai_integration, "GOOGLE_API_KEYS", ["key-slow1", "key-fast2"])
+    policy = HedgePolicy(max_ratio=0.5)
+    monkeypatch.setattr(ai_integration, "hedge_policy", policy)
+    monkeypatch.setattr("app.hedging.HEDGE_DEFAULT_DELAY", 0.05)
+
+    async def install(handler):
+        await ai_integration.start_http_client(transport=httpx.MockTransport(handler))
+
+    return install, policy
+
+
+def slow_key_handler(seen, cancelled):
+    async def handler(request):
+        key = request.url.params["key"]
+        seen.append(key)
+        if key == "key-slow1":
+            try:
+                await asyncio.sleep(2)
+            except asyncio.CancelledError:
+                cancelled.append(key)
+                raise
+        return httpx.Response(200, json={"key": key})
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_slow_first_attempt_is_hedged_and_loser_cancelled(hedged_gemini):
+    install, policy = hedged_gemini
+    seen, cancelled = [], []
+    await install(slow_key_handler(seen, cancelled))
+    # Make the slow key the healthiest so it is picked first
+    ai_integration.key_pool.report_success(ai_integration.key_pool.try_acquire(exclude={"key-fast2"})[0], 0.01)
+    try:
+        result = await ai_integration.gemini_post({"contents": []}, hedge=True)
+        await asyncio.sleep(0.01)
+    finally:
+        await ai_integration.close_http_client()
+
+    assert result == {"key": "key-fast2"}
+    assert seen == ["key-slow1", "key-fast2"]
+    assert cancelled == ["key-slow1"]
+    stats = policy.stats()
+    assert stats["hedges_fired"] == 1 and stats["hedges_won"] == 1
+
+
+@pytest.mark.asyncio
+async def test_fast_answer_is_not_hedged(hedged_gemini):
+    install, policy = hedged_gemini
+    seen = []
+
+    def handler(request):
+        seen.append(request.url.params["key"])
+        return httpx.Response(200, json={})
+
+    await install(handler)
+    try:
+        await ai_integration.gemini_post({"contents": []}, hedge=True)
+    finally:
+        await ai_integration.close_http_client()
+    assert len(seen) == 1
+    assert policy.stats()["hedges_fired"] == 0
+
+
+@pytest.mark.asyncio
+async def test_unhedged_calls_never_duplicate(hedged_gemini):
+    install, policy = hedged_gemini
+    seen, cancelled = [], []
+    await install(slow_key_handler(seen, cancelled))
+    ai_integration.key_pool.report_success(ai_integration.key_pool.try_acquire(exclude={"key-fast2"})[0], 0.01)
+    try:
+        with ai_integration.call_budget(0.2):
+            with pytest.raises(httpx.ReadTimeout):
+                await ai_integration.gemini_post({"contents": []})
+    finally:
+        await ai_integration.close_http_client()
+    assert seen == ["key-slow1"]
+    assert policy.stats()["hedge_eligible_requests"] == 0
+
+
+def test_budget_caps_hedge_ratio():
+    policy = HedgePolicy(max_ratio=0.1)
+    fired = 0
+    for _ in range(100):
+        policy.start_request()
+        fired += policy.try_fire()
+    assert fired <= 10
+    assert policy.stats()["skipped_budget"] == 100 - fired
+
+
+def test_delay_follows_latency_percentile(monkeypatch):
+    monkeypatch.setattr("app.hedging.HEDGE_MIN_SAMPLES", 10)
+    tracker = LatencyTracker()
+    policy = HedgePolicy(tracker, percentile=90)
+    assert policy.delay() == pytest.approx(3.0)
+    for ms in range(1, 101):
+        tracker.record(ms / 100)
+    assert policy.delay() == pytest.approx(0.9, abs=0.02)
+
+
+def test_admin_metrics_endpoint(client, register_and_login_admin):
+    resp = client.get("/ai/metrics", headers={"Authorization": f"Bearer {register_and_login_admin}"})
+    assert resp.status_code == 200
+    assert "hedges_fired" in resp.json()["hedging"]
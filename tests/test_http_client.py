@@ -0,0 +1,50 @@
+import httpx
+import pytest
+
+from app import ai_integration
+
+
+def gemini_ok(request):
+    return httpx.Response(200, json={"candidates": [{"content": {"parts": [{"text": "{}"}]}}]})
+
+
+@pytest.mark.asyncio
+async def test_shared_client_is_reused_across_calls(monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append(request.url)
+        return gemini_ok(request)
+
+    client = await ai_integration.start_http_client(transport=httpx.MockTransport(handler))
+    try:
+        async with ai_integration.gemini_client() as first:
+            pass
+        async with ai_integration.gemini_client() as second:
+            pass
+        assert first is client and second is client
+
+        await ai_integration.gemini_post({"contents": []})
+        await ai_integration.gemini_post({"contents": []})
+        assert len(seen) == 2
+        assert str(seen[0]).startswith(ai_integration.GEMINI_API_BASE)
+        assert not client.is_closed
+    finally:
+        await ai_integration.close_http_client()
+    assert client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_short_lived_client_without_lifespan():
+    await ai_integration.close_http_client()
+    async with ai_integration.gemini_client() as client:
+        assert isinstance(client, httpx.AsyncClient)
+    assert client.is_closed
+
+
+def test_client_uses_configured_pool_limits():
+    client = ai_integration.create_http_client()
+    pool = client._transport._pool
+    assert pool._max_connections == ai_integration.GEMINI_MAX_CONNECTIONS
+    assert pool._max_keepalive_connections == ai_integration.GEMINI_MAX_KEEPALIVE_CONNECTIONS
+    assert pool._http2 == (ai_integration.GEMINI_HTTP2 and ai_integration.HTTP2_AVAILABLE)
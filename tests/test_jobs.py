@@ -0,0 +1,216 @@
+import asyncio
+
+import pytest
+
+from app import jobs
+from app.models import Job, JobItem, JobItemStatus, JobStatus, Word
+from tests.conftest import TestingSessionLocal
+
+
+@pytest.fixture
+def counting_translation(monkeypatch):
+    calls = []
+
+    async def fake(words, *args, **kwargs):
+        calls.extend(words)
+        return {w: {"translation": f"mi_{w}", "ipa": "", "phonetic": "", "type": "noun",
+                    "domain": "", "example": "", "notes": "", "level": "beginner"}
+                for w in words}
+    monkeypatch.setattr("app.ai_integration.get_translations_batch", fake)
+    return calls
+
+
+def test_batch_add_job_returns_id_immediately(client, register_and_login_admin, counting_translation):
+    token = register_and_login_admin
+    resp = client.post("/words/batch_add/job",
+                       json={"texts": ["jobword one", "jobword two"]},
+                       headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 202, resp.text
+    data = resp.json()
+    assert data["status"] == "queued"
+    assert data["total_items"] == 2
+    assert [i["input"] for i in data["items"]] == ["jobword one", "jobword two"]
+    # Nothing has been sent to the AI yet
+    assert counting_translation == []
+
+
+def test_job_progress_after_run(client, register_and_login_admin, db_session, counting_translation):
+    token = register_and_login_admin
+    headers = {"Authorization": f"Bearer {token}"}
+    job_id = client.post("/words/batch_add/job",
+                         json={"texts": ["jobword three", "jobword four"]},
+                         headers=headers).json()["id"]
+
+    asyncio.run(jobs.run_job(job_id, session_factory=TestingSessionLocal))
+    db_session.expire_all()
+
+    resp = client.get(f"/jobs/{job_id}", headers=headers)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["status"] == "completed"
+    assert data["completed_items"] == 2
+    assert all(i["status"] == "done" for i in data["items"])
+    assert db_session.query(Word).filter_by(
+        normalized="jobword three").first().translation == "mi_jobword three"
+
+
+def test_resumed_job_does_not_call_ai_for_checkpointed_items(db_session, counting_translation):
+    job = jobs.enqueue_job(db_session, "words.batch_add",
+                           ["resume one", "resume two"])
+    # Simulate a worker that stopped after the AI answered for the first item
+    first = job.items[0]
+    first.checkpoint = {"translation": "tahi", "ipa": "", "phonetic": "", "type": "",
+                        "domain": "", "example": "", "notes": "", "level": "beginner"}
+    job.status = JobStatus.running
+    db_session.commit()
+
+    asyncio.run(jobs.run_job(job.id, session_factory=TestingSessionLocal))
+
+    assert counting_translation == ["resume two"]
+    db_session.expire_all()
+    assert db_session.query(Word).filter_by(
+        normalized="resume one").first().translation == "tahi"
+
+
+def test_completed_items_are_not_rerun(db_session, counting_translation):
+    job = jobs.enqueue_job(db_session, "words.batch_add", ["rerun one"])
+    asyncio.run(jobs.run_job(job.id, session_factory=TestingSessionLocal))
+    asyncio.run(jobs.run_job(job.id, session_factory=TestingSessionLocal))
+    assert counting_translation == ["rerun one"]
+
+
+def test_batch_add_job_reports_failures_apart_from_skips(db_session, monkeypatch):
+    async def partial(words, *args, **kwargs):
+        return {w: {"translation": f"mi_{w}", "level": "beginner"} for w in words if w != "untranslatable"}
+    monkeypatch.setattr("app.ai_integration.get_translations_batch", partial)
+    job = jobs.enqueue_job(db_session, "words.batch_add", ["outcome new", "untranslatable"])
+    asyncio.run(jobs.run_job(job.id, session_factory=TestingSessionLocal))
+    job = jobs.enqueue_job(db_session, "words.batch_add", ["outcome new", "untranslatable"])
+    asyncio.run(jobs.run_job(job.id, session_factory=TestingSessionLocal))
+
+    db_session.expire_all()
+    result = db_session.get(Job, job.id).result
+    assert result["added"] == []
+    assert result["skipped"] == ["outcome new"]
+    assert result["failed"] == ["untranslatable"]
+
+
+def test_repeated_inputs_are_skipped_not_failed(client, register_and_login_admin, db_session,
+                                                counting_translation):
+    resp = client.post("/words/batch_add/job", json={"texts": ["echo word", "Echo Word "]},
+                       headers={"Authorization": f"Bearer {register_and_login_admin}"})
+    assert resp.json()["total_items"] == 1
+
+    # Jobs enqueued directly may still repeat a word
+    job = jobs.enqueue_job(db_session, "words.batch_add", ["repeat word", "Repeat word"])
+    asyncio.run(jobs.run_job(job.id, session_factory=TestingSessionLocal))
+    db_session.expire_all()
+    result = db_session.get(Job, job.id).result
+    assert (result["skipped"], result["failed"]) == (["Repeat word"], [])
+
+
+def test_claim_next_job_picks_up_orphaned_jobs(db_session):
+    from datetime import datetime, timedelta
+
+    job = jobs.enqueue_job(db_session, "news.refresh", ["news"])
+    job.status = JobStatus.running
+    job.heartbeat_at = datetime.utcnow() - timedelta(seconds=jobs.JOB_STALE_SECONDS + 60)
+    db_session.commit()
+
+    claimed = []
+    while True:
+        job_id = jobs.claim_next_job(db_session)
+        if job_id is None:
+            break
+        claimed.append(job_id)
+    assert job.id in claimed
+    # A freshly claimed job has a new heartbeat and cannot be claimed twice
+    assert jobs.claim_next_job(db_session) is None
+
+
+def test_news_refresh_job_checkpoints_ai_output(db_session, monkeypatch):
+    calls = []
+
+    async def fake_news():
+        calls.append(1)
+        return [{"title": "Job News", "content": "Good things.",
+                 "link": "https://example.com/job-news"}]
+    monkeypatch.setattr(
+        "app.ai_integration.get_positive_news_from_gemini", fake_news)
+
+    job = jobs.enqueue_job(db_session, "news.refresh", ["news"])
+    asyncio.run(jobs.run_job(job.id, session_factory=TestingSessionLocal))
+
+    db_session.expire_all()
+    item = db_session.query(JobItem).filter_by(job_id=job.id).one()
+    assert item.status == JobItemStatus.done
+    assert item.checkpoint[0]["link"] == "https://example.com/job-news"
+    assert calls == [1]
+
+
+def test_learner_cannot_read_jobs(client, register_and_login_learner):
+    token = register_and_login_learner
+    resp = client.get("/jobs/1", headers={"Authorization": f"Bearer {token}"})
+    assert resp.status_code == 403
+
+
+def test_batch_add_job_queues_audio_prewarm(db_session, counting_translation):
+    job = jobs.enqueue_job(db_session, "words.batch_add", ["prewarm source"])
+    asyncio.run(jobs.run_job(job.id, session_factory=TestingSessionLocal))
+
+    db_session.expire_all()
+    prewarm = db_session.query(Job).filter_by(kind="tts.prewarm").order_by(Job.id.desc()).first()
+    assert [i.input for i in prewarm.items] == ["mi_prewarm source"]
+
+
+def test_tts_prewarm_job_bounds_concurrency_and_links_words(db_session, monkeypatch):
+    from app import crud
+    from app.router import tts
+
+    word = crud.create_word(db_session, "prewarm link", {"translation": "kupu hono",
+                                                         "example": "He kupu hono tēnei."}, "beginner")
+    state = {"active": 0, "peak": 0, "calls": []}
+
+    async def fake_generate(text, voice_id, cache_key, *args):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        state["calls"].append(text)
+        await asyncio.sleep(0.01)
+        state["active"] -= 1
+        return f"/cache/{cache_key}.mp3"
+
+    monkeypatch.setattr(tts, "generate_and_cache_audio", fake_generate)
+    monkeypatch.setattr(tts, "get_cached_audio_path", lambda key, *args: None)
+    monkeypatch.setattr(jobs, "TTS_PREWARM_CONCURRENCY", 2)
+    monkeypatch.setattr(jobs, "TTS_PREWARM_RATE", 1000)
+
+    texts = ["kupu hono", "He kupu hono tēnei."] + [f"kupu {i}" for i in range(6)]
+    job = jobs.enqueue_tts_prewarm(db_session, texts + ["kupu hono", ""])
+    assert job.total_items == len(texts)
+    asyncio.run(jobs.run_job(job.id, session_factory=TestingSessionLocal))
+
+    assert sorted(state["calls"]) == sorted(texts)
+    assert state["peak"] == 2
+    db_session.expire_all()
+    finished = db_session.get(Job, job.id)
+    assert finished.status == JobStatus.completed
+    assert finished.result["generated"] == len(texts)
+    word = db_session.get(Word, word.id)
+    assert word.audio_cache_key == tts.generate_cache_key("kupu hono")
+    assert word.example_audio_url == f"/tts/tts/audio/{tts.generate_cache_key('He kupu hono tēnei.')}"
+
+    # A resumed job does not synthesize finished items again
+    asyncio.run(jobs.run_job(job.id, session_factory=TestingSessionLocal))
+    assert len(state["calls"]) == len(texts)
+
+
+def test_notify_from_another_thread_wakes_workers():
+    pool = jobs.JobWorkerPool(size=0)
+
+    async def main():
+        pool._loop = asyncio.get_running_loop()
+        pool._wakeup = asyncio.Event()
+        await asyncio.to_thread(pool.notify)  # as the scheduler does
+        await asyncio.wait_for(pool._wakeup.wait(), 1)
+
+    asyncio.run(main())
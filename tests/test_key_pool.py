@@ -0,0 +1,154 @@
+import threading
+
+import httpx
+import pytest
+
+from app import ai_integration
+from app.key_pool import ApiKeyPool, parse_retry_after
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_picks_fastest_healthy_key(clock):
+    pool = ApiKeyPool(["key-aaaa1", "key-bbbb2"], rpm=600, clock=clock)
+    for _ in range(3):
+        key, _ = pool.try_acquire()
+        pool.report_success(key, 2.0 if key == "key-aaaa1" else 0.2)
+        key, _ = pool.try_acquire(exclude={key})
+        pool.report_success(key, 2.0 if key == "key-aaaa1" else 0.2)
+
+    picks = []
+    for _ in range(5):
+        key, _ = pool.try_acquire()
+        picks.append(key)
+        pool.report_success(key, 0.2)
+    assert set(picks) == {"key-bbbb2"}
+
+
+def test_429_cooldown_honours_retry_after(clock):
+    pool = ApiKeyPool(["key-aaaa1", "key-bbbb2"], rpm=600, clock=clock)
+    key, _ = pool.try_acquire()
+    pool.report_failure(key, status_code=429, retry_after=20)
+
+    other, _ = pool.try_acquire()
+    assert other != key
+    pool.report_success(other, 0.1)
+    assert pool.try_acquire(exclude={other}) == (None, pytest.approx(20))
+
+    clock.now += 21
+    assert pool.try_acquire(exclude={other})[0] == key
+
+
+def test_token_bucket_limits_each_key(clock):
+    pool = ApiKeyPool(["key-aaaa1"], rpm=60, burst=2, clock=clock)
+    assert pool.try_acquire()[0] == "key-aaaa1"
+    assert pool.try_acquire()[0] == "key-aaaa1"
+    key, wait = pool.try_acquire()
+    assert key is None and wait == pytest.approx(1.0)
+    clock.now += 1
+    assert pool.try_acquire()[0] == "key-aaaa1"
+
+
+def test_circuit_opens_after_repeated_failures_and_half_opens(clock):
+    pool = ApiKeyPool(["key-aaaa1"], rpm=600, clock=clock)
+    for _ in range(3):
+        key, _ = pool.try_acquire()
+        pool.report_failure(key, status_code=503)
+    assert pool.snapshot()[0]["circuit"] == "open"
+    assert pool.try_acquire()[0] is None
+
+    clock.now += 61
+    key, _ = pool.try_acquire()
+    assert key == "key-aaaa1"
+    # Only one trial request while half-open
+    assert pool.try_acquire()[0] is None
+    pool.report_success(key, 0.1)
+    assert pool.snapshot()[0]["circuit"] == "closed"
+
+
+def test_forbidden_key_is_benched(clock):
+    pool = ApiKeyPool(["key-aaaa1", "key-bbbb2"], rpm=600, clock=clock)
+    key, _ = pool.try_acquire()
+    pool.report_failure(key, status_code=403)
+    for _ in range(5):
+        other, _ = pool.try_acquire()
+        assert other != key
+        pool.report_success(other, 0.1)
+
+
+def test_snapshot_masks_keys(clock):
+    pool = ApiKeyPool(["secretkey12345"], clock=clock)
+    snap = pool.snapshot()[0]
+    assert snap["key"] == "secre...345"
+    assert "secretkey12345" not in str(snap)
+
+
+def test_thread_safety_of_in_flight_accounting():
+    pool = ApiKeyPool(["key-aaaa1", "key-bbbb2"], rpm=10**6, burst=10**6)
+
+    def hammer():
+        for _ in range(500):
+            key, _ = pool.try_acquire()
+            pool.report_success(key, 0.01)
+
+    threads = [threading.Thread(target=hammer) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    snap = pool.snapshot()
+    assert sum(s["requests"] for s in snap) == 4000
+    assert all(s["in_flight"] == 0 for s in snap)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+@pytest.mark.asyncio
+async def test_gemini_post_switches_key_after_429_without_sleeping(monkeypatch):
+    pool = ApiKeyPool(["key-aaaa1", "key-bbbb2"], rpm=600)
+    monkeypatch.setattr(ai_integration, "key_pool", pool)
+    used = []
+
+    def handler(request):
+        key = request.url.params["key"]
+        used.append(key)
+        if len(used) == 1:
+            return httpx.Response(429, headers={"Retry-After": "30"})
+        return httpx.Response(200, json={"candidates": []})
+
+    async def no_sleep(seconds):
+        raise AssertionError("should not back off after a key-specific 429")
+    await ai_integration.start_http_client(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(ai_integration.asyncio, "sleep", no_sleep)
+    try:
+        assert await ai_integration.gemini_post({"contents": []}) == {"candidates": []}
+    finally:
+        await ai_integration.close_http_client()
+
+    assert used[0] != used[1]
+    cooled = {s["key"]: s for s in pool.snapshot()}
+    assert cooled[f"{used[0][:5]}...{used[0][-3:]}"]["rate_limited"] == 1
+
+
+def test_admin_key_usage_endpoint(client, register_and_login_admin, register_and_login_learner):
+    resp = client.get("/ai/keys", headers={"Authorization": f"Bearer {register_and_login_admin}"})
+    assert resp.status_code == 200
+    assert len(resp.json()["keys"]) == len(ai_integration.GOOGLE_API_KEYS)
+
+    resp = client.get("/ai/keys", headers={"Authorization": f"Bearer {register_and_login_learner}"})
+    assert resp.status_code == 403
@@ -28,3 +28,107 @@ def test_login_fail(client):
     assert resp.status_code == 400, resp.text
     data = resp.json()
     assert "Incorrect email or password" in data["detail"]
+
+
+def _register_and_login(client, email, password="testpass"):
+    client.post("/users/register", json={"email": email, "password": password})
+    return client.post("/login/", data={"username": email, "password": password}).json()["access_token"]
+
+
+def test_token_carries_user_claims(client):
+    from jose import jwt
+    from app import auth
+
+    token = _register_and_login(client, "claims@example.com")
+    payload = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+    assert payload["sub"] == "claims@example.com"
+    assert payload["role"] == "learner"
+    assert isinstance(payload["uid"], int) and payload["ver"] == 0
+
+
+def test_verified_tokens_skip_the_user_query(client, db_session):
+    from unittest.mock import Mock
+    from app import auth
+
+    token = _register_and_login(client, "cached@example.com")
+    user = auth.get_current_user(token, db_session)
+    unused_db = Mock()
+    assert auth.get_current_user(token, unused_db) == user
+    unused_db.get.assert_not_called()
+    unused_db.query.assert_not_called()
+
+
+def test_role_change_revokes_tokens(client, db_session, register_and_login_admin):
+    from app import crud, models
+
+    token = _register_and_login(client, "promoted@example.com")
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/words/list", headers=headers).status_code == 200
+
+    user = db_session.query(models.User).filter_by(email="promoted@example.com").one()
+    crud.set_user_role(db_session, user.id, "admin")
+    assert user.token_version == 1
+    assert client.get("/words/list", headers=headers).status_code == 401
+
+    token = client.post("/login/", data={"username": "promoted@example.com", "password": "testpass"}).json()["access_token"]
+    assert client.get("/users/", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+
+
+def test_tokens_without_uid_claim_still_work(client, db_session):
+    from app import auth, crud, models
+
+    _register_and_login(client, "legacy@example.com")
+    legacy = auth.create_access_token(data={"sub": "legacy@example.com", "role": "learner"})
+    headers = {"Authorization": f"Bearer {legacy}"}
+    assert client.get("/words/list", headers=headers).status_code == 200
+
+    user = db_session.query(models.User).filter_by(email="legacy@example.com").one()
+    crud.set_user_role(db_session, user.id, "learner")
+    assert client.get("/words/list", headers=headers).status_code == 401
+
+
+def test_refresh_rotates_tokens(client):
+    _register_and_login(client, "refresh@example.com")
+    tokens = client.post("/login/", data={"username": "refresh@example.com", "password": "testpass"}).json()
+    assert tokens["refresh_token"]
+
+    renewed = client.post("/login/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert renewed.status_code == 200
+    renewed = renewed.json()
+    assert renewed["refresh_token"] != tokens["refresh_token"]
+    assert client.get("/words/list", headers={"Authorization": f"Bearer {renewed['access_token']}"}).status_code == 200
+
+    again = client.post("/login/refresh", json={"refresh_token": renewed["refresh_token"]})
+    assert again.status_code == 200
+    assert client.post("/login/refresh", json={"refresh_token": "not-a-token"}).status_code == 401
+
+
+def test_reused_refresh_token_revokes_the_family(client, db_session):
+    from app import auth
+
+    _register_and_login(client, "stolen@example.com")
+    tokens = client.post("/login/", data={"username": "stolen@example.com", "password": "testpass"}).json()
+    renewed = client.post("/login/refresh", json={"refresh_token": tokens["refresh_token"]}).json()
+    headers = {"Authorization": f"Bearer {renewed['access_token']}"}
+    assert client.get("/words/list", headers=headers).status_code == 200
+
+    # The old token is presented again, e.g. by whoever copied it
+    assert client.post("/login/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+    assert client.post("/login/refresh", json={"refresh_token": renewed["refresh_token"]}).status_code == 401
+    assert client.get("/words/list", headers=headers).status_code == 401
+
+    # Other workers learn about it from the database
+    auth._revoked_families.clear()
+    assert auth.sync_denylist(db_session) >= 1
+    assert client.get("/words/list", headers=headers).status_code == 401
+
+
+def test_logout_revokes_the_device(client):
+    _register_and_login(client, "logout@example.com")
+    tokens = client.post("/login/", data={"username": "logout@example.com", "password": "testpass"}).json()
+    other_device = client.post("/login/", data={"username": "logout@example.com", "password": "testpass"}).json()
+
+    assert client.post("/login/logout", json={"refresh_token": tokens["refresh_token"]}).status_code == 204
+    assert client.post("/login/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+    assert client.get("/words/list", headers={"Authorization": f"Bearer {tokens['access_token']}"}).status_code == 401
+    assert client.post("/login/refresh", json={"refresh_token": other_device["refresh_token"]}).status_code == 200
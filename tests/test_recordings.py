@@ -0,0 +1,141 @@
+import os
+import uuid
+from unittest.mock import patch
+
+import pytest
+from benchmarks.stubs.polly import silent_mp3
+
+from app import crud, recordings
+from app.audio import mp3_frames
+from app.router import tts
+from tests.conftest import TestingSessionLocal
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(recordings, "FFMPEG", None)
+    with patch('app.router.tts.AUDIO_CACHE_DIR', str(tmp_path)), \
+            patch('app.router.tts.SessionLocal', TestingSessionLocal):
+        yield tmp_path
+
+
+@pytest.fixture
+def word(db_session):
+    return crud.create_word(db_session, f"recorded {uuid.uuid4().hex[:8]}",
+                            {"translation": "kupu rekoata", "example": "He kupu tēnei."}, "beginner")
+
+
+def chunked(data, size=1000):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def test_upload_is_transcoded_linked_and_served(client, cache, word, db_session, register_and_login_admin):
+    headers = {"Authorization": f"Bearer {register_and_login_admin}", "Content-Type": "audio/mpeg"}
+    recording = b"ID3\x04\x00\x00\x00\x00\x00\x00" + silent_mp3(0.5)
+    word.audio_cache_key = tts.generate_cache_key(word.translation)
+    db_session.commit()
+
+    resp = client.put(f"/words/words/{word.id}/recording", headers=headers, content=chunked(recording))
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["formats"] == ["mp3"]
+
+    db_session.refresh(word)
+    assert word.audio_recording_key
+    assert word.audio_url == resp.json()["audio_url"] == f"/tts/tts/audio/{word.audio_recording_key}"
+
+    audio = client.get(word.audio_url)
+    assert audio.status_code == 200
+    assert audio.content == mp3_frames(recording)
+
+    # Recordings are not part of the evictable TTS cache
+    client.delete("/tts/tts/cache", headers=headers)
+    assert client.get(word.audio_url).status_code == 200
+
+    client.delete(f"/words/words/{word.id}/recording", headers=headers)
+    db_session.refresh(word)
+    # Clearing the cache unlinked the Polly audio as well
+    assert word.audio_cache_key is None and word.audio_url is None
+
+
+def test_example_target(client, cache, word, db_session, register_and_login_admin):
+    headers = {"Authorization": f"Bearer {register_and_login_admin}"}
+    resp = client.put(f"/words/words/{word.id}/recording?target=example", headers=headers,
+                      content=silent_mp3(0.2))
+    assert resp.status_code == 200
+    db_session.refresh(word)
+    assert word.example_audio_url == resp.json()["audio_url"]
+    assert word.audio_recording_key is None
+
+
+def test_recording_files_are_deleted_with_the_last_link(client, cache, word, db_session,
+                                                         register_and_login_admin):
+    headers = {"Authorization": f"Bearer {register_and_login_admin}"}
+    other = crud.create_word(db_session, f"shared {uuid.uuid4().hex[:8]}",
+                             {"translation": "kupu tahi"}, "beginner")
+    recording = silent_mp3(0.3)
+    for target in (word, other):
+        client.put(f"/words/words/{target.id}/recording", headers=headers, content=recording)
+    db_session.refresh(word)
+    key = word.audio_recording_key
+    path = cache / tts.recording_relpath(key, "mp3")
+
+    client.delete(f"/words/words/{word.id}/recording", headers=headers)
+    assert path.exists()  # the other word still plays it
+    client.put(f"/words/words/{other.id}/recording", headers=headers, content=silent_mp3(0.4))
+    assert not path.exists()  # replaced, so no word links it any more
+
+
+def test_rejected_uploads(client, cache, word, register_and_login_admin, register_and_login_learner):
+    headers = {"Authorization": f"Bearer {register_and_login_admin}"}
+    url = f"/words/words/{word.id}/recording"
+    assert client.put(url, headers=headers, content=b"RIFF....WAVEfmt ").status_code == 415
+    assert client.put(url, headers=headers, content=b"").status_code == 400
+    with patch.object(recordings, "RECORDING_MAX_MB", 0.001):
+        assert client.put(url, headers=headers, content=chunked(silent_mp3(1.0))).status_code == 413
+    assert client.put(url, headers={"Authorization": f"Bearer {register_and_login_learner}"},
+                      content=silent_mp3(0.2)).status_code == 403
+    assert client.put("/words/words/999999/recording", headers=headers, content=b"x").status_code == 404
+    assert not list(cache.rglob("*.mp3"))
+
+
+def test_ffmpeg_command_normalizes_and_encodes_every_format():
+    command = recordings._ffmpeg_command("ffmpeg", "in.wav", {"mp3": "out.mp3", "ogg_vorbis": "out.ogg"}, -16)
+    graph = command[command.index("-filter_complex") + 1]
+    assert graph.count("silenceremove") == 2 and "loudnorm=I=-16" in graph
+    assert graph.endswith("asplit=2[out0][out1]")
+    assert command[-1] == "out.ogg" and "libmp3lame" in command and "libvorbis" in command
+
+
+@pytest.mark.asyncio
+async def test_receive_upload_streams_to_disk():
+    async def body():
+        for chunk in (b"abc", b"def"):
+            yield chunk
+
+    path, digest = await recordings.receive_upload(body())
+    try:
+        with open(path, "rb") as f:
+            assert f.read() == b"abcdef"
+        assert len(digest) == 64
+    finally:
+        os.remove(path)
+
+
+def test_ogg_version_is_served_to_clients_that_ask(client, cache, tmp_path):
+    outputs = {}
+    for output_format, data in (("mp3", b"mp3 audio"), ("ogg_vorbis", b"OggS audio")):
+        outputs[output_format] = str(tmp_path / f"upload.{output_format}")
+        with open(outputs[output_format], "wb") as f:
+            f.write(data)
+    key = "ef" * 16
+    recordings.publish_recording(key, outputs)
+
+    default = client.get(f"/tts/tts/audio/{key}")
+    assert default.content == b"mp3 audio"
+    ogg = client.get(f"/tts/tts/audio/{key}", headers={"Accept": "audio/ogg, audio/mpeg;q=0.5"})
+    assert ogg.content == b"OggS audio" and ogg.headers["content-type"] == "audio/ogg"
+    assert ogg.headers["etag"] != default.headers["etag"]
+    assert ogg.headers["vary"] == "Accept"
+    assert client.get(f"/tts/tts/audio/{key}?format=ogg_vorbis").content == b"OggS audio"
+    assert client.get(f"/tts/tts/audio/{key}?format=flac").status_code == 400
@@ -0,0 +1,132 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app import ai_integration
+from app.key_pool import ApiKeyPool
+from app.singleflight import SingleFlight
+
+
+@pytest.fixture
+def mock_gemini(monkeypatch):
+    """Installs a MockTransport handler on a fresh key pool."""
+    monkeypatch.setattr(ai_integration, "key_pool", ApiKeyPool(["key-aaaa1", "key-bbbb2"], rpm=600))
+    monkeypatch.setattr(ai_integration, "GEMINI_BACKOFF_BASE", 0.001)
+
+    async def install(handler):
+        await ai_integration.start_http_client(transport=httpx.MockTransport(handler))
+
+    return install
+
+
+@pytest.mark.asyncio
+async def test_bad_request_fails_fast(mock_gemini):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400, json={"error": "bad"})
+
+    await mock_gemini(handler)
+    try:
+        with pytest.raises(ai_integration.GeminiRequestError) as exc:
+            await ai_integration.gemini_post({"contents": []})
+    finally:
+        await ai_integration.close_http_client()
+    assert exc.value.status_code == 400
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_server_errors_are_retried(mock_gemini):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) < 3:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"candidates": []})
+
+    await mock_gemini(handler)
+    try:
+        assert await ai_integration.gemini_post({"contents": []}) == {"candidates": []}
+    finally:
+        await ai_integration.close_http_client()
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_deadline_bounds_total_latency(mock_gemini):
+    async def handler(request):
+        await asyncio.sleep(5)
+        return httpx.Response(200, json={})
+
+    await mock_gemini(handler)
+    started = time.monotonic()
+    try:
+        with ai_integration.call_budget(0.3):
+            with pytest.raises(ai_integration.GeminiDeadlineExceeded):
+                await ai_integration.gemini_post({"contents": []})
+    finally:
+        await ai_integration.close_http_client()
+    assert time.monotonic() - started < 1.5
+
+
+def test_nested_budget_only_shortens_deadline():
+    with ai_integration.call_budget(1) as outer:
+        with ai_integration.call_budget(100) as inner:
+            assert inner == outer
+        with ai_integration.call_budget(0.1) as inner:
+            assert inner < outer
+    assert ai_integration._call_deadline.get() is None
+
+
+def test_backoff_is_jittered_and_capped(monkeypatch):
+    monkeypatch.setattr(ai_integration, "GEMINI_BACKOFF_BASE", 1)
+    monkeypatch.setattr(ai_integration, "GEMINI_BACKOFF_MAX", 4)
+    delays = {ai_integration.backoff_delay(10) for _ in range(50)}
+    assert len(delays) > 1
+    assert all(0 <= d <= 4 for d in delays)
+
+
+@pytest.mark.asyncio
+async def test_last_waiter_leaving_cancels_shared_call():
+    group = SingleFlight("test")
+    cancelled = asyncio.Event()
+
+    async def work():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    caller = asyncio.create_task(group.do("k", work))
+    await asyncio.sleep(0.01)
+    caller.cancel()
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert group.stats()["abandoned_calls"] == 1
+
+
+class DisconnectedRequest:
+    async def is_disconnected(self):
+        return True
+
+
+@pytest.mark.asyncio
+async def test_client_disconnect_cancels_ai_call():
+    cancelled = asyncio.Event()
+
+    async def slow_call():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(asyncio.CancelledError):
+        await ai_integration.cancel_on_disconnect(
+            DisconnectedRequest(), slow_call(), poll_interval=0.01)
+    await asyncio.wait_for(cancelled.wait(), 1)
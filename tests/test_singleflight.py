@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from app.ai_integration import get_translation
+from app.singleflight import SingleFlight, advisory_lock_id, cross_worker_lock
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    group = SingleFlight("test")
+    calls = []
+
+    async def work(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return value * 2
+
+    results = await asyncio.gather(*[group.do("k", work, 21) for _ in range(5)])
+
+    assert results == [42] * 5
+    assert calls == [21]
+    assert group.stats()["coalesced_calls"] == 4
+    assert group.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_different_keys_run_separately():
+    group = SingleFlight("test")
+    calls = []
+
+    async def work(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value
+
+    await asyncio.gather(group.do("a", work, 1), group.do("b", work, 2))
+    assert sorted(calls) == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_led_call_is_joined_and_survives_leaving_waiters():
+    group = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    task = group.lead("k", work)
+    assert task is not None and group.lead("k", work) is None
+
+    waiter = asyncio.create_task(group.do("k", work))
+    await asyncio.sleep(0.01)
+    waiter.cancel()
+    assert await group.do("k", work) == "done"
+    assert task.result() == "done"
+    assert group.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter_and_are_not_cached():
+    group = SingleFlight("test")
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(group.do("k", fail), group.do("k", fail),
+                                   return_exceptions=True)
+    assert all(isinstance(r, ValueError) for r in results)
+
+    with pytest.raises(ValueError):
+        await group.do("k", fail)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_shared_call():
+    group = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    first = asyncio.create_task(group.do("k", work))
+    second = asyncio.create_task(group.do("k", work))
+    await asyncio.sleep(0.01)
+    first.cancel()
+
+    assert await second == "done"
+
+
+@pytest.mark.asyncio
+async def test_identical_translations_share_one_gemini_post(monkeypatch):
+    calls = []
+
+    async def fake_post(payload, *args, **kwargs):
+        calls.append(payload)
+        await asyncio.sleep(0.05)
+        return {"candidates": [{"content": {"parts": [{"text": '{"translation": "kia ora"}'}]}}]}
+    monkeypatch.setattr("app.ai_integration.gemini_post", fake_post)
+
+    results = await asyncio.gather(
+        get_translation("Hello"),
+        get_translation("hello "),
+        get_translation("hello"),
+        get_translation("goodbye"),
+    )
+
+    assert len(calls) == 2
+    assert results[0] is results[1] is results[2]
+
+
+def test_advisory_lock_id_is_stable_and_signed_64_bit():
+    lock_id = advisory_lock_id("translation", "kia ora")
+    assert lock_id == advisory_lock_id("translation", "kia ora")
+    assert lock_id != advisory_lock_id("word", "kia ora")
+    assert -2**63 <= lock_id < 2**63
+
+
+@pytest.mark.asyncio
+async def test_cross_worker_lock_is_noop_without_postgres(db_session):
+    async with cross_worker_lock(db_session, "translation", "kia ora") as locked:
+        assert locked is False
@@ -0,0 +1,128 @@
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app import ai_integration
+from app.key_pool import ApiKeyPool
+from benchmarks.stubs import gemini, polly
+from benchmarks.stubs.common import FaultProfile, parse_latency
+
+
+def gemini_request(prompt, key="stub-key"):
+    return {"params": {"key": key}, "json": {"contents": [{"parts": [{"text": prompt}]}]}}
+
+
+@pytest.fixture
+def gemini_stub(monkeypatch):
+    """Routes ai_integration's Gemini calls to the in-process stand-in."""
+    monkeypatch.setattr(ai_integration, "key_pool", ApiKeyPool(["stub-key-1", "stub-key-2"], rpm=6000))
+    monkeypatch.setattr(ai_integration, "GEMINI_BACKOFF_BASE", 0.001)
+
+    async def install(profile=None, fixtures=None):
+        app = gemini.create_app(profile, fixtures)
+        await ai_integration.start_http_client(transport=httpx.ASGITransport(app=app))
+        return app
+    return install
+
+
+def test_gemini_stub_answers_translation_prompts():
+    client = TestClient(gemini.create_app(fixtures={"Hello": {"translation": "kia ora"}}))
+    url = "/v1beta/models/gemini-2.5-flash:generateContent"
+    body = client.post(url, **gemini_request(ai_integration.build_translation_prompt("hello"))).json()
+    assert '"kia ora"' in body["candidates"][0]["content"]["parts"][0]["text"]
+
+    body = client.post(url, **gemini_request(
+        ai_integration.build_batch_translation_prompt(["water", "sea"]))).json()
+    assert '"input": "water"' in body["candidates"][0]["content"]["parts"][0]["text"]
+
+    assert client.post(url, json={"contents": []}, params={"key": "k"}).status_code == 400
+    assert client.post(url, json={"contents": []}).status_code == 403
+
+
+def test_fault_injection_and_per_key_quota():
+    client = TestClient(gemini.create_app(FaultProfile(rate_429=1.0, retry_after=7)))
+    resp = client.post("/v1beta/models/m:generateContent", **gemini_request("x"))
+    assert resp.status_code == 429 and resp.headers["Retry-After"] == "7"
+
+    client = TestClient(gemini.create_app(FaultProfile(key_rpm=2)))
+    codes = [client.post("/v1beta/models/m:generateContent", **gemini_request("x")).status_code
+             for _ in range(3)]
+    assert codes == [200, 200, 429]
+    assert client.post("/v1beta/models/m:generateContent", **gemini_request("x", key="other")).status_code == 200
+    assert client.get("/stats").json()["429"] == 1
+
+
+def test_latency_specs():
+    assert parse_latency("fixed:250")() == 0.25
+    assert 0.1 <= parse_latency("uniform:100,200")() <= 0.2
+    assert parse_latency("lognormal:800,0.5")() > 0
+    with pytest.raises(ValueError):
+        parse_latency("pareto:1")
+
+
+@pytest.mark.asyncio
+async def test_batch_translation_and_news_against_stub(gemini_stub):
+    await gemini_stub(FaultProfile(error_rate=0.3, seed=4))
+    try:
+        translations = await ai_integration.get_translations_batch(["hello", "water", "sea"])
+        news = await ai_integration.get_positive_news_from_gemini()
+    finally:
+        await ai_integration.close_http_client()
+    assert translations["water"]["translation"] == "water (reo)"
+    assert len(news) == 10 and all(item["link"] for item in news)
+
+
+@pytest.mark.asyncio
+async def test_streaming_against_stub(gemini_stub):
+    await gemini_stub()
+    try:
+        fields = dict([pair async for pair in ai_integration.stream_translation("river")])
+    finally:
+        await ai_integration.close_http_client()
+    assert fields["translation"] == "river (reo)"
+
+
+def test_polly_stub_returns_mp3_frames():
+    client = TestClient(polly.create_app())
+    resp = client.post("/v1/speech", json={"Text": "kia ora", "VoiceId": "Aria", "OutputFormat": "mp3"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "audio/mpeg"
+    assert resp.content[:4] == polly.MP3_FRAME_HEADER
+    assert len(resp.content) % polly.MP3_FRAME_SIZE == 0
+
+    resp = client.post("/v1/speech", json={"Text": "x" * 3001, "OutputFormat": "mp3"})
+    assert resp.headers["x-amzn-ErrorType"] == "TextLengthExceededException"
+
+
+def test_polly_stub_throttles_like_polly():
+    client = TestClient(polly.create_app(FaultProfile(rate_429=1.0)))
+    resp = client.post("/v1/speech", json={"Text": "kia ora", "OutputFormat": "mp3"})
+    assert resp.status_code == 400
+    assert resp.headers["x-amzn-ErrorType"] == "ThrottlingException"
+
+
+def test_boto3_polly_client_against_stub(monkeypatch):
+    uvicorn = pytest.importorskip("uvicorn")
+    import socket
+    import threading
+    import time
+
+    import boto3
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    server = uvicorn.Server(uvicorn.Config(polly.create_app(), host="127.0.0.1", port=port, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        client = boto3.client("polly", region_name="ap-southeast-2", endpoint_url=f"http://127.0.0.1:{port}",
+                              aws_access_key_id="stub", aws_secret_access_key="stub")
+        response = client.synthesize_speech(Text="kia ora", VoiceId="Aria", OutputFormat="mp3", Engine="neural")
+        assert response["AudioStream"].read()[:4] == polly.MP3_FRAME_HEADER
+    finally:
+        server.should_exit = True
+        thread.join(5)
@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app import ai_integration
+from app.key_pool import ApiKeyPool
+from app.utils import StreamingFieldParser
+
+TRANSLATION = {
+    "translation": "kia ora", "ipa": "ki.a ɔ.ɾa", "phonetic": "kee-ah or-ah",
+    "type": "phrase", "domain": "greetings", "example": "Kia ora! - Hello!", "notes": "",
+}
+
+
+def stub_stream_handler(text: str, chunk_size: int = 7, seen=None):
+    """A local streamGenerateContent stand-in: SSE frames of `chunk_size` chars."""
+    async def body():
+        for start in range(0, len(text), chunk_size):
+            chunk = {"candidates": [{"content": {"parts": [{"text": text[start:start + chunk_size]}]}}]}
+            yield f"data: {json.dumps(chunk)}\r\n\r\n".encode()
+            await asyncio.sleep(0)
+
+    def handler(request):
+        if seen is not None:
+            seen.append(request.url)
+        return httpx.Response(200, headers={"Content-Type": "text/event-stream"}, content=body())
+    return handler
+
+
+@pytest.fixture
+def stub_gemini_stream(monkeypatch):
+    monkeypatch.setattr(ai_integration, "key_pool", ApiKeyPool(["key-aaaa1"], rpm=600))
+
+    def install(handler):
+        original = ai_integration.create_http_client
+        monkeypatch.setattr(
+            ai_integration, "create_http_client",
+            lambda **kwargs: original(transport=httpx.MockTransport(handler), **kwargs))
+    return install
+
+
+def parse_sse(body: str):
+    events = []
+    for frame in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in frame.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_parser_emits_fields_as_they_complete():
+    parser = StreamingFieldParser()
+    assert parser.feed('{"translation": "kia') == []
+    assert parser.feed(' ora", "ipa": "ki') == [("translation", "kia ora")]
+    assert parser.feed('.a", "notes": "say \\"hi\\""}') == [("ipa", "ki.a"), ("notes", 'say "hi"')]
+
+
+@pytest.mark.asyncio
+async def test_stream_translation_yields_translation_first(stub_gemini_stream):
+    seen = []
+    stub_gemini_stream(stub_stream_handler(json.dumps(TRANSLATION, ensure_ascii=False), seen=seen))
+    fields = [pair async for pair in ai_integration.stream_translation("hello")]
+    assert fields[0] == ("translation", "kia ora")
+    assert dict(fields) == TRANSLATION
+    assert ":streamGenerateContent" in str(seen[0]) and "alt=sse" in str(seen[0])
+
+
+def test_stream_endpoint_sends_sse_events_and_caches(client, stub_gemini_stream):
+    stub_gemini_stream(stub_stream_handler(json.dumps(TRANSLATION, ensure_ascii=False)))
+    resp = client.post("/translate/stream", json={"text": "Hello there"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(resp.text)
+    assert events[0] == ("field", {"field": "translation", "value": "kia ora"})
+    assert events[-1] == ("done", TRANSLATION)
+
+    # Second request is answered from the translation cache without Gemini
+    stub_gemini_stream(lambda request: httpx.Response(500))
+    events = parse_sse(client.post("/translate/stream", json={"text": "hello there"}).text)
+    assert events[0] == ("field", {"field": "translation", "value": "kia ora"})
+    assert events[-1][0] == "done"
+
+
+def test_stream_endpoint_reports_errors(client, stub_gemini_stream, monkeypatch):
+    monkeypatch.setattr(ai_integration, "GEMINI_BACKOFF_BASE", 0.001)
+    stub_gemini_stream(lambda request: httpx.Response(400))
+    events = parse_sse(client.post("/translate/stream", json={"text": "unknowable"}).text)
+    assert events == [("error", {"detail": "Translation not found."})]
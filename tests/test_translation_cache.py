@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import crud
+from app.ai_integration import GEMINI_MODEL
+from app.models import TranslationCacheEntry, Word
+from tests.conftest import TestingSessionLocal
+
+
+@pytest.fixture
+def counting_gemini(monkeypatch):
+    calls = []
+
+    async def fake(word, max_retries=3):
+        calls.append(word)
+        return {
+            "candidates": [{
+                "content": {"parts": [{
+                    "text": '{"translation": "kai reka", "ipa": "kai ˈreka", "phonetic": "kai reh-kah", "type": "phrase", "domain": "food", "example": "", "notes": ""}'
+                }]}
+            }]
+        }
+    monkeypatch.setattr("app.ai_integration.get_translation", fake)
+    return calls
+
+
+def test_dictionary_word_skips_ai(client, db_session, counting_gemini):
+    db_session.add(Word(text="Cachedict", translation="papakupu",
+                        normalized="cachedict", level="beginner"))
+    db_session.commit()
+
+    resp = client.post("/translate/", json={"text": "  CacheDict "})
+    assert resp.status_code == 200
+    assert resp.json()["translation"] == "papakupu"
+    assert counting_gemini == []
+
+
+def test_second_translation_is_served_from_cache(client, db_session, counting_gemini):
+    first = client.post("/translate/", json={"text": "Tasty food"})
+    second = client.post("/translate/", json={"text": "tasty food "})
+
+    assert first.json()["translation"] == "kai reka"
+    assert second.json()["translation"] == "kai reka"
+    assert counting_gemini == ["Tasty food"]
+
+    entry = db_session.query(TranslationCacheEntry).filter_by(
+        normalized="tasty food").one()
+    assert entry.payload["ipa"] == "kai ˈreka"
+    # Hits are counted in memory and written in batches
+    assert entry.hit_count == 0
+    crud.flush_translation_cache_hits(db_session)
+    db_session.refresh(entry)
+    assert entry.hit_count == 1
+
+
+def test_expired_entry_is_a_miss(client, db_session, counting_gemini):
+    crud.store_cached_translation(db_session, "old phrase", GEMINI_MODEL, {"translation": "tawhito"})
+    entry = db_session.query(TranslationCacheEntry).filter_by(normalized="old phrase").one()
+    entry.expires_at = datetime.utcnow() - timedelta(minutes=1)
+    db_session.commit()
+
+    resp = client.post("/translate/", json={"text": "old phrase"})
+    assert resp.json()["translation"] == "kai reka"
+    assert counting_gemini == ["old phrase"]
+
+
+def test_storing_the_same_input_twice_updates_one_row(db_session):
+    crud.store_cached_translation(db_session, "twice phrase", GEMINI_MODEL, {"translation": "tahi"})
+    crud.store_cached_translation(db_session, "twice phrase", GEMINI_MODEL, {"translation": "rua"})
+    entries = db_session.query(TranslationCacheEntry).filter_by(normalized="twice phrase").all()
+    assert [e.payload["translation"] for e in entries] == ["rua"]
+
+
+def test_concurrent_store_of_the_same_input(db_session, monkeypatch):
+    # Another worker inserts the row between our lookup and our insert
+    lookup = crud._translation_cache_entry
+    other = TestingSessionLocal()
+
+    def racing_lookup(db, normalized, model):
+        if db is db_session and not lookup(other, normalized, model):
+            crud.store_cached_translation(other, normalized, model, {"translation": "tuatahi"})
+            return None
+        return lookup(db, normalized, model)
+    monkeypatch.setattr(crud, "_translation_cache_entry", racing_lookup)
+
+    try:
+        entry = crud.store_cached_translation(db_session, "race phrase", GEMINI_MODEL, {"translation": "tuarua"})
+    finally:
+        other.close()
+    assert entry.payload["translation"] == "tuarua"
+    assert db_session.query(TranslationCacheEntry).filter_by(normalized="race phrase").count() == 1
+
+
+def test_failed_translation_is_not_cached(client, db_session, monkeypatch):
+    async def broken(word, max_retries=3):
+        return {"candidates": [{"content": {"parts": [{"text": "not json"}]}}]}
+    monkeypatch.setattr("app.ai_integration.get_translation", broken)
+
+    resp = client.post("/translate/", json={"text": "broken phrase"})
+    assert resp.json()["translation"] == "Error parsing translation."
+    assert db_session.query(TranslationCacheEntry).filter_by(
+        normalized="broken phrase").first() is None
+
+
+def test_stats_and_purge_require_admin(client, register_and_login_learner):
+    headers = {"Authorization": f"Bearer {register_and_login_learner}"}
+    assert client.get("/translate/cache/stats", headers=headers).status_code == 403
+    assert client.delete("/translate/cache", headers=headers).status_code == 403
+
+
+def test_admin_stats_and_purge(client, register_and_login_admin, db_session, counting_gemini):
+    headers = {"Authorization": f"Bearer {register_and_login_admin}"}
+    client.post("/translate/", json={"text": "stats phrase"})
+    client.post("/translate/", json={"text": "stats phrase"})
+
+    stats = client.get("/translate/cache/stats", headers=headers).json()
+    assert stats["cache_hits"] >= 1
+    assert stats["misses"] >= 1
+    assert 0 < stats["hit_ratio"] < 1
+    assert stats["cached_entries"] >= 1
+
+    resp = client.delete("/translate/cache", headers=headers)
+    assert resp.status_code == 200
+    assert resp.json()["deleted_entries"] >= 1
+    assert db_session.query(TranslationCacheEntry).count() == 0
+
@@ -0,0 +1,179 @@
+import asyncio
+import os
+import threading
+import uuid
+from unittest.mock import patch
+
+import pytest
+
+from app import crud, models
+from app.router import tts
+from tests.conftest import TestingSessionLocal
+
+
+@pytest.fixture
+def cache(tmp_path, db_session):
+    db_session.query(models.TTSCacheEntry).delete()
+    db_session.query(models.TTSCacheStats).delete()
+    db_session.commit()
+    tts._hit_buffer.clear()
+    with patch('app.router.tts.AUDIO_CACHE_DIR', str(tmp_path)), \
+            patch('app.router.tts.SessionLocal', TestingSessionLocal):
+        yield tmp_path
+
+
+def write_cached(cache_dir, cache_key, size, sharded=True):
+    relpath = tts.cache_relpath(cache_key) if sharded else f"tts_{cache_key}.mp3"
+    path = os.path.join(cache_dir, relpath)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    return relpath
+
+
+def test_legacy_flat_files_are_still_found(cache):
+    write_cached(cache, "abcdef", 10, sharded=False)
+    assert tts.get_cached_audio_path("abcdef") == os.path.join(str(cache), "tts_abcdef.mp3")
+    assert tts.cache_audio_url("abcdef", tts.get_cached_audio_path("abcdef")) == \
+        "/static/audio/tts_cache/tts_abcdef.mp3"
+
+
+def test_sharded_url(cache):
+    write_cached(cache, "abcdef", 10)
+    path = tts.get_cached_audio_path("abcdef")
+    assert tts.cache_audio_url("abcdef", path) == "/static/audio/tts_cache/ab/cd/tts_abcdef.mp3"
+
+
+def test_hits_are_buffered_then_flushed(cache, db_session):
+    crud.register_tts_cache_entry(db_session, "abcdef", "Aria", write_cached(cache, "abcdef", 10), 10)
+    for _ in range(3):
+        tts.record_cache_hit("abcdef")
+    entry = db_session.query(models.TTSCacheEntry).filter_by(cache_key="abcdef").one()
+    assert entry.hit_count == 0
+
+    tts.flush_cache_hits(db_session)
+    db_session.refresh(entry)
+    assert entry.hit_count == 3
+    assert crud.get_tts_cache_stats_row(db_session).total_hits == 3
+
+
+def test_only_served_files_count_as_hits(cache, client):
+    served, missing = "ab" * 16, "cd" * 16
+    write_cached(cache, served, 10)
+    assert client.get(f"/tts/tts/audio/{served}").status_code == 200
+    assert client.get(f"/tts/tts/audio/{missing}").status_code == 404
+    assert set(tts._hit_buffer) == {served}
+
+
+@pytest.mark.asyncio
+async def test_full_buffer_is_flushed_off_the_event_loop(cache, db_session):
+    crud.register_tts_cache_entry(db_session, "aaaa01", "Aria", write_cached(cache, "aaaa01", 10), 10)
+    flushed = threading.Event()
+    threads = []
+
+    def fake_flush(db):
+        threads.append(threading.current_thread())
+        tts._hit_buffer.clear()
+        flushed.set()
+
+    with patch('app.router.tts.TTS_CACHE_HIT_FLUSH', 1), \
+            patch('app.router.tts.flush_cache_hits', side_effect=fake_flush):
+        tts.record_cache_hit("aaaa01")
+        assert await asyncio.to_thread(flushed.wait, 5)
+    assert threads[0] is not threading.main_thread()
+
+
+def test_flush_indexes_unknown_files(cache, db_session):
+    write_cached(cache, "ffeedd", 25, sharded=False)
+    tts.record_cache_hit("ffeedd")
+    tts.flush_cache_hits(db_session)
+    stats = crud.get_tts_cache_stats_row(db_session)
+    assert (stats.total_files, stats.total_bytes) == (1, 25)
+
+
+def test_stats_row_created_concurrently(cache, db_session):
+    # Another worker inserts the row between our lookup and our insert
+    other = TestingSessionLocal()
+    real_get = db_session.get
+
+    def racing_get(model, ident):
+        if not other.get(models.TTSCacheStats, 1):
+            other.add(models.TTSCacheStats(id=1, total_files=0, total_bytes=7, total_hits=0,
+                                           evicted_files=0, evicted_bytes=0))
+            other.commit()
+            return None
+        return real_get(model, ident)
+
+    try:
+        with patch.object(db_session, "get", side_effect=racing_get):
+            assert crud.get_tts_cache_stats_row(db_session).total_bytes == 7
+    finally:
+        other.close()
+
+
+def test_totals_are_not_lost_between_workers(cache, db_session):
+    # Both sessions hold the stats row; neither write may overwrite the other
+    stats = crud.get_tts_cache_stats_row(db_session)
+    assert stats.total_files == 0
+    other = TestingSessionLocal()
+    try:
+        crud.get_tts_cache_stats_row(other)
+        crud.register_tts_cache_entry(other, "aaaa01", "Aria", write_cached(cache, "aaaa01", 100), 100)
+    finally:
+        other.close()
+    crud.register_tts_cache_entry(db_session, "bbbb02", "Aria", write_cached(cache, "bbbb02", 50), 50)
+    stats = crud.get_tts_cache_stats_row(db_session)
+    assert (stats.total_files, stats.total_bytes) == (2, 150)
+
+
+def test_eviction_removes_least_recently_used(cache, db_session):
+    for key in ["aaaa01", "bbbb02", "cccc03", "dddd04"]:
+        crud.register_tts_cache_entry(db_session, key, "Aria", write_cached(cache, key, 100), 100)
+    tts.record_cache_hit("aaaa01")  # most recently used now
+
+    with patch('app.router.tts.TTS_CACHE_LOW_WATERMARK', 0.5):
+        result = tts.enforce_tts_cache_budget(db_session, max_bytes=300)
+
+    # Trimmed to the low watermark (150 bytes): three files go, the hot one stays
+    assert result == {"evicted_files": 3, "freed_bytes": 300}
+    assert tts.get_cached_audio_path("aaaa01")
+    assert not any(tts.get_cached_audio_path(k) for k in ["bbbb02", "cccc03", "dddd04"])
+    stats = crud.get_tts_cache_stats_row(db_session)
+    assert (stats.total_files, stats.total_bytes, stats.evicted_files) == (1, 100, 3)
+
+
+def test_eviction_unlinks_words(cache, db_session):
+    word = crud.create_word(db_session, f"evicted {uuid.uuid4().hex[:8]}", {"translation": "kupu pana", "example": ""}, "beginner")
+    word.audio_cache_key = "aaaa01"
+    db_session.commit()
+    crud.register_tts_cache_entry(db_session, "aaaa01", "Aria", write_cached(cache, "aaaa01", 100), 100)
+
+    tts.enforce_tts_cache_budget(db_session, max_bytes=50)
+    db_session.refresh(word)
+    assert word.audio_url is None
+    assert word in crud.words_missing_audio(db_session)
+
+
+def test_eviction_is_a_noop_under_budget(cache, db_session):
+    crud.register_tts_cache_entry(db_session, "aaaa01", "Aria", write_cached(cache, "aaaa01", 100), 100)
+    assert tts.enforce_tts_cache_budget(db_session, max_bytes=1000) == {"evicted_files": 0, "freed_bytes": 0}
+
+
+def test_info_reindex_and_clear_endpoints(cache, client, register_and_login_admin):
+    headers = {"Authorization": f"Bearer {register_and_login_admin}"}
+    write_cached(cache, "abcdef", 1024, sharded=False)
+    write_cached(cache, "123456", 1024)
+
+    assert client.get("/tts/tts/cache/info").json()["total_cached_files"] == 0
+    assert client.post("/tts/tts/cache/reindex", headers=headers).json() == {"indexed_files": 2}
+    info = client.get("/tts/tts/cache/info").json()
+    assert info["total_cached_files"] == 2
+    assert info["eviction_policy"] == tts.TTS_CACHE_EVICTION_POLICY
+
+    assert client.delete("/tts/tts/cache", headers=headers).json()["deleted_files"] == 2
+    assert client.get("/tts/tts/cache/info").json()["total_cached_files"] == 0
+
+
+def test_evict_endpoint_requires_admin(cache, client, register_and_login_learner):
+    headers = {"Authorization": f"Bearer {register_and_login_learner}"}
+    assert client.post("/tts/tts/cache/evict", headers=headers).status_code == 403